@@ -1,61 +1,151 @@
 # Importing necessary modules from Flask to create the web application
-from flask import Flask, request, render_template
-
-# Importing additional libraries
-import numpy as np  # Used for handling numerical data (e.g., calculations)
-import pandas as pd  # Used for managing and structuring data in tables
+from flask import Flask, request, render_template, jsonify, Response
+import os  # Used to read settings from environment variables
+import time  # Used to time each phase of a request
 
 # Importing custom classes: CustomData and PredictPipeline from the custom module 'src.pipeline.predict_pipeline'
-from src.pipeline.predict_pipeline import CustomData, PredictPipeline
+from src.pipeline.predict_pipeline import CustomData, PredictPipeline, FEATURE_COLUMNS, get_records_from_json
+from src.pipeline.input_schema import records_to_columns  # Turns records into columns without failing on bad ones
+from src.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig  # Groups requests that arrive together
+from src.instrumentation import metrics, log_sampled, log_error  # Timing histograms and sampled background logging
+from src.tracing import tracer, traced_request  # Opt-in request tracing and slow-request profiling
 
 # Initializing a new Flask application instance
 app = Flask(__name__)
 
+# Create the prediction pipeline once; the model and preprocessor are loaded on first use and shared by all requests
+predict_pipeline = PredictPipeline()
+metrics.add_collector(predict_pipeline.collect_metrics)  # Report its cache and registry counters on /metrics
+
+# Group single-row requests that arrive within a short time window into one prediction call
+micro_batcher = MicroBatcher(
+    predict_pipeline,
+    MicroBatcherConfig(
+        max_wait=float(os.environ.get("PREDICT_BATCH_WINDOW_MS", "5")) / 1000,  # Time window in milliseconds
+        max_batch_size=int(os.environ.get("PREDICT_MAX_BATCH_SIZE", "256")),  # Most rows scored in one call
+    ),
+)
+
 # Defining the route for the homepage of the web application
 @app.route('/')
 def index():
     # This function loads and displays the 'home.html' file when users visit the homepage
     return render_template('home.html')
 
+# Render the home page (timed as its own span when tracing is on)
+def render_home(**context):
+    with tracer.span("render_template", template="home.html"):
+        return render_template('home.html', **context)
+
 # Defining the route for the prediction page, allowing both GET and POST requests
 @app.route('/predictdata', methods=['GET', 'POST'])
+@traced_request('/predictdata')
 def predict_datapoint():
     # If the user is just opening the page, show the home page
     if request.method == 'GET':
-        return render_template('home.html')
+        return render_home()
     else:
         # When the user submits the form, we handle the input data here
+        start = time.perf_counter()
         try:
-            # Capture and organize the form data into a structure
-            data = CustomData(
-                gender=request.form.get('gender'),  # Fetches 'gender' data
-                race_ethnicity=request.form.get('ethnicity'),  # Fetches 'ethnicity' data
-                parental_level_of_education=request.form.get('parental_level_of_education'),  # Fetches parent's education level
-                lunch=request.form.get('lunch'),  # Fetches 'lunch' data
-                test_preparation_course=request.form.get('test_preparation_course'),  # Fetches 'test preparation' data
-                reading_score=float(request.form.get('reading_score')),  # Ensures 'reading_score' is a number
-                writing_score=float(request.form.get('writing_score'))  # Ensures 'writing_score' is a number
-            )
-
-            # Convert the collected form data into a pandas DataFrame, which the prediction pipeline can use
-            pred_df = data.get_data_as_data_frame()
-            print(f"Input DataFrame: \n{pred_df}")
-
-            # Initialize the prediction pipeline (pre-trained model is loaded here)
-            predict_pipeline = PredictPipeline()
-
-            # Use the pipeline to predict based on the input data
-            results = predict_pipeline.predict(pred_df)
-            print(f"Prediction Result: {results}")
+            # Capture the form data exactly as typed; the input schema checks it before scoring
+            with tracer.span("parse_form"):
+                record = CustomData.get_form_as_record(request.form)
+            parsed = time.perf_counter()
+
+            # Convert the collected form data into plain columns (no DataFrame needed by the compiled scorer)
+            with tracer.span("build_columns"):
+                pred_columns = records_to_columns([record], FEATURE_COLUMNS)
+            built = time.perf_counter()
+
+            # Check the input against what the model was trained on, then predict
+            with tracer.span("score"):
+                results, errors = predict_pipeline.predict_with_report(pred_columns, score=micro_batcher.predict)
+            finished = time.perf_counter()
+
+            # Tell the user which field is wrong instead of failing deep inside the model
+            rejected = [entry for entry in errors if entry["severity"] == "error"]
+            if rejected:
+                metrics.inc("requests_total", endpoint="/predictdata", status="422")
+                message = "; ".join(f"{entry['column']}: {entry['error']} ({entry['value']})" for entry in rejected)
+                return render_home(error=f"Please check your input: {message}")
+
+            # Record how long each phase took, and log the details of a sample of requests
+            metrics.observe("request_phase_seconds", parsed - start, endpoint="/predictdata", phase="parse")
+            metrics.observe("request_phase_seconds", built - parsed, endpoint="/predictdata", phase="build")
+            metrics.observe("request_phase_seconds", finished - built, endpoint="/predictdata", phase="score")
+            metrics.observe("request_duration_seconds", finished - start, endpoint="/predictdata")
+            metrics.inc("requests_total", endpoint="/predictdata", status="200")
+            log_sampled("Prediction %s for %s", results[0], record)
 
             # Display the prediction result on the same 'home.html' page
-            return render_template('home.html', results=results[0])
+            return render_home(results=results[0])
 
         except Exception as e:
-            # If there’s any error during prediction, print it for debugging
-            print(f"Error during prediction: {e}")
+            # If there’s any error during prediction, log it for debugging
+            metrics.inc("requests_total", endpoint="/predictdata", status="error")
+            log_error("Error during prediction: %s", e)
             # Show an error message on the homepage if there's an issue
-            return render_template('home.html', error="An error occurred during prediction. Please check your input.")
+            return render_home(error="An error occurred during prediction. Please check your input.")
+
+# Defining the route for JSON predictions, which accepts one student record or a list of them.
+# Every record is checked against the input schema: bad records get a null prediction and an entry in
+# "errors" (row number, field, value and problem), and the other records are still scored.
+@app.route('/predict_batch', methods=['POST'])
+@traced_request('/predict_batch')
+def predict_batch():
+    start = time.perf_counter()
+    try:
+        # Accept a list of records, {"records": [...]}, or a single record
+        with tracer.span("parse_json"):
+            records = get_records_from_json(request.get_json(silent=True))
+        parsed = time.perf_counter()
+        with tracer.span("build_columns", rows=len(records)):
+            pred_columns = records_to_columns(records, FEATURE_COLUMNS)
+        built = time.perf_counter()
+    except Exception as e:
+        metrics.inc("requests_total", endpoint="/predict_batch", status="400")
+        return jsonify(error=str(e)), 400
+
+    try:
+        # Small requests share a batch with other requests; large ones are already a batch
+        score = micro_batcher.predict if len(records) < micro_batcher.config.max_batch_size else None
+        with tracer.span("score"):
+            results, errors = predict_pipeline.predict_with_report(pred_columns, score=score)
+    except Exception as e:
+        metrics.inc("requests_total", endpoint="/predict_batch", status="500")
+        log_error("Error during prediction: %s", e)
+        return jsonify(error="An error occurred during prediction."), 500
+
+    # Record how long each phase took, and log a sample of requests
+    finished = time.perf_counter()
+    rejected = len({entry["row"] for entry in errors if entry["severity"] == "error"})
+    metrics.observe("request_phase_seconds", parsed - start, endpoint="/predict_batch", phase="parse")
+    metrics.observe("request_phase_seconds", built - parsed, endpoint="/predict_batch", phase="build")
+    metrics.observe("request_phase_seconds", finished - built, endpoint="/predict_batch", phase="score")
+    metrics.observe("request_duration_seconds", finished - start, endpoint="/predict_batch")
+    metrics.inc("requests_total", endpoint="/predict_batch", status="200")
+    metrics.inc("request_rows_total", len(records), endpoint="/predict_batch")
+    if rejected:
+        metrics.inc("request_rows_rejected_total", rejected, endpoint="/predict_batch")
+    log_sampled("Batch prediction for %d records (%d rejected)", len(records), rejected)
+
+    with tracer.span("serialize"):
+        return jsonify(
+            predictions=[None if value != value else float(value) for value in results.tolist()],
+            errors=errors,
+        )
+
+# Defining the route a load balancer (or the serving benchmark) polls to see the app is up.
+# The model loads on the first prediction, so this only says the server answers requests.
+@app.route('/health')
+def health():
+    return jsonify(status="ready")
+
+# Defining the route that shows the request timings and counters in the Prometheus text format
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 # Run the Flask web application
 if __name__ == "__main__":
@@ -0,0 +1,308 @@
+# ASGI version of the web application, for running with uvicorn (see the Dockerfile):
+#   uvicorn asgi:app --host 0.0.0.0 --port 7860 --workers 4 --timeout-keep-alive 5
+# The event loop only parses requests and renders pages; model work runs in a bounded thread pool
+# (or in the micro-batcher's thread), so one slow prediction never blocks other requests.
+import os  # Used to read settings from environment variables
+import json  # Used to read and write JSON request and response bodies
+import time  # Used to time each phase of a request
+import asyncio  # Runs the event loop and waits for work done in other threads
+import contextvars  # Carries the current trace span into the model threads
+from concurrent.futures import ThreadPoolExecutor  # A fixed number of threads for the model work
+from urllib.parse import parse_qs  # Reads the fields of a submitted HTML form
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape  # Renders the HTML templates
+
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+import numpy as np  # Holds the predictions of a batch, with NaN for rejected rows
+
+from src.pipeline.predict_pipeline import CustomData, PredictPipeline, FEATURE_COLUMNS, get_records_from_json
+from src.pipeline.input_schema import records_to_columns  # Turns records into columns without failing on bad ones
+from src.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig  # Groups requests that arrive together
+from src.pipeline.records import count_rows, take_rows  # Work with dictionaries of columns
+from src.instrumentation import metrics, log_sampled, log_error  # Timing histograms and sampled background logging
+from src.tracing import tracer, traced_request  # Opt-in request tracing and slow-request profiling
+
+# Settings, read from environment variables
+PREDICT_THREADS = int(os.environ.get("PREDICT_THREADS", "4"))  # Threads that run model work
+MAX_PENDING = int(os.environ.get("PREDICT_MAX_PENDING", "64"))  # Requests allowed to wait for a thread
+MAX_BODY_BYTES = int(os.environ.get("PREDICT_MAX_BODY_BYTES", str(10 * 1024 * 1024)))  # Largest request body
+
+# Create the prediction pipeline once; the model and preprocessor are shared by all requests
+predict_pipeline = PredictPipeline()
+metrics.add_collector(predict_pipeline.collect_metrics)  # Report its cache and registry counters on /metrics
+
+# Group single-row requests that arrive within a short time window into one prediction call
+micro_batcher = MicroBatcher(
+    predict_pipeline,
+    MicroBatcherConfig(
+        max_wait=float(os.environ.get("PREDICT_BATCH_WINDOW_MS", "5")) / 1000,  # Time window in milliseconds
+        max_batch_size=int(os.environ.get("PREDICT_MAX_BATCH_SIZE", "256")),  # Most rows scored in one call
+    ),
+)
+
+# Threads for model work, and a limit on how many requests may wait for them
+executor = ThreadPoolExecutor(max_workers=PREDICT_THREADS, thread_name_prefix="predict")
+_pending = None  # asyncio.Semaphore, created inside the running event loop
+_ready = False  # True once the artifacts are loaded and a warm-up prediction has run
+_warm_up_task = None  # The warm-up in progress, shared by every request that arrives before the app is ready
+
+# The same templates as the Flask app; url_for maps the Flask endpoint names to paths
+_routes = {"index": "/", "predict_datapoint": "/predictdata", "predict_batch": "/predict_batch"}
+templates = Environment(loader=FileSystemLoader("templates"), autoescape=select_autoescape(["html"]))
+templates.globals["url_for"] = lambda endpoint, **_: _routes[endpoint]
+
+# A typical student, used to warm up the pipeline before the server reports it is ready
+WARMUP_RECORD = {
+    "gender": "female",
+    "race_ethnicity": "group B",
+    "parental_level_of_education": "bachelor's degree",
+    "lunch": "standard",
+    "test_preparation_course": "none",
+    "reading_score": 72.0,
+    "writing_score": 74.0,
+}
+
+
+# Load the artifacts and run one prediction so the first real request is not slow
+def warm_up():
+    global _ready
+    predict_pipeline.predict(CustomData.get_records_as_columns([WARMUP_RECORD]), use_cache=False)
+    predict_pipeline.validate(records_to_columns([WARMUP_RECORD], FEATURE_COLUMNS))  # Loads the input schema
+    _ready = True
+    logging.info("ASGI app warmed up and ready")
+
+
+# Run a blocking function in the model threads without blocking the event loop
+# (in a copy of the request's context, so its trace spans are part of the request's trace)
+async def run_blocking(function, *args):
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(PREDICT_THREADS + MAX_PENDING)
+    async with _pending:
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(executor, context.run, function, *args)
+
+
+# Warm up once, however many requests arrive before the app is ready: they all wait for the same warm-up.
+# If it fails, the next request tries again.
+async def ensure_warm():
+    global _warm_up_task
+    if _warm_up_task is None:
+        _warm_up_task = asyncio.ensure_future(run_blocking(warm_up))
+    task = _warm_up_task
+    try:
+        await asyncio.shield(task)  # A request that is cancelled does not cancel the others' warm-up
+    except Exception:
+        if _warm_up_task is task:
+            _warm_up_task = None
+        raise
+
+
+# Score rows given as plain columns: small requests share a micro-batch with other requests,
+# big ones go to a model thread
+async def score(pred_columns):
+    if count_rows(pred_columns) < micro_batcher.config.max_batch_size:
+        return await asyncio.wrap_future(micro_batcher.submit(pred_columns))
+    return await run_blocking(predict_pipeline.predict, pred_columns)
+
+
+# Check rows against the input schema and score only the ones that pass (see PredictPipeline.predict_with_report).
+# A few rows are checked right here, as that is quicker than handing them to a thread.
+async def score_with_report(pred_columns):
+    if count_rows(pred_columns) >= micro_batcher.config.max_batch_size:
+        return await run_blocking(predict_pipeline.predict_with_report, pred_columns)
+
+    result = predict_pipeline.validate(pred_columns)
+    preds = np.full(len(result.valid), np.nan)
+    rows = np.flatnonzero(result.valid)
+    if len(rows):
+        preds[rows] = await score(result.columns if len(rows) == len(preds) else take_rows(result.columns, rows))
+    return preds, result.errors
+
+
+# Send a complete HTTP response
+async def respond(send, status, body, content_type):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# Send a JSON response
+async def respond_json(send, status, data):
+    with tracer.span("serialize"):
+        body = json.dumps(data)
+    await respond(send, status, body, "application/json")
+
+
+# Send an HTML page rendered from a template
+async def respond_html(send, status, template_name, **context):
+    with tracer.span("render_template", template=template_name):
+        body = templates.get_template(template_name).render(**context)
+    await respond(send, status, body, "text/html; charset=utf-8")
+
+
+# Read the whole request body (refusing bodies that are too large)
+async def read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        if size > MAX_BODY_BYTES:
+            raise ValueError("Request body is too large.")
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+# Handle the HTML form: the same behaviour as the Flask /predictdata route
+@traced_request("/predictdata")
+async def predict_datapoint(receive, send):
+    start = time.perf_counter()
+    try:
+        body = await read_body(receive)
+        with tracer.span("parse_form"):
+            form = {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+            record = CustomData.get_form_as_record(form)
+        parsed = time.perf_counter()
+        with tracer.span("build_columns"):
+            pred_columns = records_to_columns([record], FEATURE_COLUMNS)
+        built = time.perf_counter()
+        with tracer.span("score"):
+            results, errors = await score_with_report(pred_columns)
+        finished = time.perf_counter()
+    except Exception as e:
+        metrics.inc("requests_total", endpoint="/predictdata", status="error")
+        log_error("Error during prediction: %s", e)
+        await respond_html(send, 200, "home.html", error="An error occurred during prediction. Please check your input.")
+        return
+
+    # Tell the user which field is wrong instead of failing deep inside the model
+    rejected = [entry for entry in errors if entry["severity"] == "error"]
+    if rejected:
+        metrics.inc("requests_total", endpoint="/predictdata", status="422")
+        message = "; ".join(f"{entry['column']}: {entry['error']} ({entry['value']})" for entry in rejected)
+        await respond_html(send, 200, "home.html", error=f"Please check your input: {message}")
+        return
+
+    # Record how long each phase took, and log the details of a sample of requests
+    metrics.observe("request_phase_seconds", parsed - start, endpoint="/predictdata", phase="parse")
+    metrics.observe("request_phase_seconds", built - parsed, endpoint="/predictdata", phase="build")
+    metrics.observe("request_phase_seconds", finished - built, endpoint="/predictdata", phase="score")
+    metrics.observe("request_duration_seconds", finished - start, endpoint="/predictdata")
+    metrics.inc("requests_total", endpoint="/predictdata", status="200")
+    log_sampled("Prediction %s for %s", results[0], form)
+    await respond_html(send, 200, "home.html", results=results[0])
+
+
+# Handle the JSON batch endpoint: the same behaviour as the Flask /predict_batch route
+@traced_request("/predict_batch")
+async def predict_batch(receive, send):
+    start = time.perf_counter()
+    try:
+        body = await read_body(receive)
+        with tracer.span("parse_json"):
+            records = get_records_from_json(json.loads(body or b"null"))
+        parsed = time.perf_counter()
+        with tracer.span("build_columns", rows=len(records)):
+            pred_columns = await run_blocking(records_to_columns, records, FEATURE_COLUMNS)
+        built = time.perf_counter()
+    except Exception as e:
+        metrics.inc("requests_total", endpoint="/predict_batch", status="400")
+        await respond_json(send, 400, {"error": str(e)})
+        return
+
+    try:
+        with tracer.span("score"):
+            results, errors = await score_with_report(pred_columns)
+    except Exception as e:
+        metrics.inc("requests_total", endpoint="/predict_batch", status="500")
+        log_error("Error during prediction: %s", e)
+        await respond_json(send, 500, {"error": "An error occurred during prediction."})
+        return
+
+    # Record how long each phase took, and log a sample of requests
+    finished = time.perf_counter()
+    rejected = len({entry["row"] for entry in errors if entry["severity"] == "error"})
+    metrics.observe("request_phase_seconds", parsed - start, endpoint="/predict_batch", phase="parse")
+    metrics.observe("request_phase_seconds", built - parsed, endpoint="/predict_batch", phase="build")
+    metrics.observe("request_phase_seconds", finished - built, endpoint="/predict_batch", phase="score")
+    metrics.observe("request_duration_seconds", finished - start, endpoint="/predict_batch")
+    metrics.inc("requests_total", endpoint="/predict_batch", status="200")
+    metrics.inc("request_rows_total", len(records), endpoint="/predict_batch")
+    if rejected:
+        metrics.inc("request_rows_rejected_total", rejected, endpoint="/predict_batch")
+    log_sampled("Batch prediction for %d records (%d rejected)", len(records), rejected)
+    await respond_json(send, 200, {
+        "predictions": [None if value != value else float(value) for value in results.tolist()],
+        "errors": errors,
+    })
+
+
+# Handle the ASGI startup and shutdown messages
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                # Load everything before the server starts accepting requests
+                await ensure_warm()
+                await send({"type": "lifespan.startup.complete"})
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+# The ASGI application
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    # Health and metrics answer straight away, so a load balancer sees "starting" during the warm-up
+    path, method = scope["path"], scope["method"]
+    if path == "/health":
+        await respond_json(send, 200 if _ready else 503, {"status": "ready" if _ready else "starting"})
+        return
+    if path == "/metrics" and method == "GET":
+        await respond(send, 200, metrics.render_prometheus(), "text/plain; version=0.0.4")
+        return
+
+    # Servers started without lifespan support warm up on the first request instead
+    if not _ready:
+        await ensure_warm()
+
+    if path == "/" and method == "GET":
+        await respond_html(send, 200, "home.html")
+    elif path == "/predictdata" and method == "GET":
+        await respond_html(send, 200, "home.html")
+    elif path == "/predictdata" and method == "POST":
+        await predict_datapoint(receive, send)
+    elif path == "/predict_batch" and method == "POST":
+        await predict_batch(receive, send)
+    elif path in ("/", "/predictdata", "/predict_batch"):
+        await respond_json(send, 405, {"error": "Method not allowed."})
+    else:
+        await respond_json(send, 404, {"error": "Not found."})
+
+
+# Run the ASGI app with uvicorn, using WEB_CONCURRENCY worker processes
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "asgi:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", "7860")),
+        workers=int(os.environ.get("WEB_CONCURRENCY", "1")),
+        timeout_keep_alive=int(os.environ.get("UVICORN_TIMEOUT_KEEP_ALIVE", "5")),
+    )
@@ -0,0 +1,83 @@
+# Import-time budget check for the web app entry points.
+#
+# Runs `python -X importtime -c "import app"` in a fresh process (from an empty folder, so any file the import
+# creates is noticed) and fails (exit code 1) if:
+#   - the import takes longer than the budget (median of several runs),
+#   - a training-only library (scikit-learn, SciPy, pandas, XGBoost, CatBoost, dill) is loaded, or
+#   - the import writes anything to disk (for example a logs/ folder).
+#
+#   python -m benchmarks.import_budget --module app asgi --budget-ms 600
+import os  # Helps with file and directory paths
+import sys  # Used to start Python and to set the exit code
+import json  # Reads the list of loaded modules from the child process
+import argparse  # Reads the options given on the command line
+import tempfile  # An empty folder to run the import from
+import subprocess  # Runs the import in a fresh Python process
+
+# Libraries only the training code needs; the serving entry points must not import them
+TRAINING_ONLY = ("sklearn", "scipy", "pandas", "xgboost", "catboost", "dill")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Import a module in a fresh process and return the -X importtime lines and the loaded module names
+def run_import(module, cwd):
+    code = f"import sys, json; import {module}; print(json.dumps(sorted(sys.modules)))"
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return result.stderr.splitlines(), json.loads(result.stdout.splitlines()[-1])
+
+
+# Parse "import time: self [us] | cumulative | name" lines into (cumulative seconds, self seconds, name)
+def parse_importtime(lines):
+    rows = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name.rstrip()))
+    return rows
+
+
+# Check one module against the budget and return (passed, report)
+def check(module, budget_ms, runs):
+    totals, forbidden, created, slowest = [], set(), set(), []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cwd:
+            lines, modules = run_import(module, cwd)
+            created.update(os.listdir(cwd))
+        rows = parse_importtime(lines)
+        totals.append(next(total for total, _, name in rows if name.strip() == module))
+        forbidden.update(name.split(".")[0] for name in modules if name.split(".")[0] in TRAINING_ONLY)
+        slowest = sorted(rows, reverse=True)[:10]
+
+    totals.sort()
+    median_ms = totals[len(totals) // 2] * 1000
+    report = {
+        "module": module,
+        "median_ms": median_ms,
+        "budget_ms": budget_ms,
+        "training_only_imports": sorted(forbidden),
+        "files_created": sorted(created),
+        "slowest_imports_ms": {name.strip(): round(total * 1000, 1) for total, _, name in slowest},
+    }
+    passed = median_ms <= budget_ms and not forbidden and not created
+    return passed, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import time of the web app entry points.")
+    parser.add_argument("--module", nargs="+", default=["app", "asgi"], help="Modules to import")
+    parser.add_argument("--budget-ms", type=float, default=600, help="Largest allowed import time")
+    parser.add_argument("--runs", type=int, default=3, help="Imports to run (the median is used)")
+    args = parser.parse_args()
+
+    all_passed = True
+    for module in args.module:
+        passed, report = check(module, args.budget_ms, args.runs)
+        all_passed &= passed
+        print(json.dumps(dict(report, passed=passed), indent=2))
+    sys.exit(0 if all_passed else 1)
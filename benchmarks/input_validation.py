@@ -0,0 +1,100 @@
+# Benchmark: how fast the input schema checks a large batch, and a check that it reports exactly the bad rows.
+#
+# Builds a batch by repeating the student records, spoils a known set of rows (unknown category, text in a
+# score, missing field, out-of-range score), then times InputSchema.validate and PredictPipeline.predict_with_report.
+# Fails (exit code 1) if a spoiled row is not reported (out-of-range scores only when the loaded schema has
+# training ranges), a good row is rejected or reported without reason, or the good rows' predictions differ
+# from scoring them without the checks.
+#
+#   python -m benchmarks.input_validation --rows 1000000
+import sys  # Sets the exit code
+import json  # Prints the results
+import time  # Measures how long each step takes
+import argparse  # Reads the options given on the command line
+
+import numpy as np  # Picks the rows to spoil
+import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+
+from src.pipeline.predict_pipeline import FEATURE_COLUMNS, PredictPipeline
+from src.pipeline.input_schema import MISSING_FIELD
+
+# The ways a row is spoiled: column, bad value, and whether the row must be rejected (or only flagged)
+SPOILERS = [
+    ("gender", "robot", True),
+    ("reading_score", "abc", True),
+    ("lunch", MISSING_FIELD, True),
+    ("writing_score", 1000.0, False),
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the input schema on a large batch.")
+    parser.add_argument("--data", default="artifacts/data.csv", help="CSV of student records")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the batch")
+    parser.add_argument("--bad-share", type=float, default=0.001, help="Share of rows to spoil")
+    args = parser.parse_args()
+
+    # A large batch as plain columns (lists, as a JSON request would give them)
+    data = pd.read_csv(args.data)[FEATURE_COLUMNS]
+    data = data.iloc[np.arange(args.rows) % len(data)].reset_index(drop=True)
+    columns = {column: data[column].tolist() for column in FEATURE_COLUMNS}
+
+    # Rows the schema already flags before spoiling (test records outside the training range get a warning)
+    pipeline = PredictPipeline()
+    already_flagged = {entry["row"] for entry in pipeline.validate(columns).errors}
+
+    # An out-of-range score is only reported when the loaded schema knows the column's training range
+    # (a schema built from the preprocessor alone, without input_schema.json, has no ranges)
+    schema = pipeline.get_input_schema()
+
+    def is_reported(column, value, reject):
+        value_range = schema.numerical.get(column)
+        return reject or (value_range is not None and not value_range[0] <= value <= value_range[1])
+
+    # Spoil a known set of rows, one kind of problem each
+    rng = np.random.default_rng(0)
+    bad_rows = np.sort(rng.choice(args.rows, size=max(len(SPOILERS), int(args.rows * args.bad_share)), replace=False))
+    must_reject, must_report = set(), set()
+    for i, row in enumerate(bad_rows.tolist()):
+        column, value, reject = SPOILERS[i % len(SPOILERS)]
+        columns[column][row] = value
+        if is_reported(column, value, reject):
+            must_report.add(row)
+        if reject:
+            must_reject.add(row)
+        else:
+            data.loc[row, column] = value  # Flagged rows are still scored, with the spoiled value
+
+    pipeline.validate({column: values[:1] for column, values in columns.items()})  # Warm up (load the artifacts)
+
+    start = time.perf_counter()
+    result = pipeline.validate(columns)
+    validate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    preds, errors = pipeline.predict_with_report(columns)
+    report_seconds = time.perf_counter() - start
+
+    # The good rows must get the same predictions as scoring them directly
+    rejected = set(np.flatnonzero(~result.valid).tolist())
+    flagged = {entry["row"] for entry in errors}
+    good = np.flatnonzero(result.valid)
+    direct = pipeline.predict(data.iloc[good], use_cache=False)
+    correct = (
+        rejected == must_reject
+        and flagged == must_report | already_flagged
+        and np.allclose(preds[good], direct)
+        and np.isnan(preds[sorted(rejected)]).all()
+    )
+
+    print(json.dumps({
+        "rows": args.rows,
+        "rejected_rows": len(rejected),
+        "problems_reported": len(errors),
+        "validate_seconds": validate_seconds,
+        "validate_rows_per_second": args.rows / validate_seconds,
+        "predict_with_report_seconds": report_seconds,
+        "predict_with_report_rows_per_second": args.rows / report_seconds,
+        "correct": bool(correct),
+    }, indent=2))
+    sys.exit(0 if correct else 1)
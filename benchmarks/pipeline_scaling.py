@@ -0,0 +1,123 @@
+# Benchmark: how the whole pipeline scales with the number of records.
+#
+# For each size, writes a synthetic dataset learned from stud.csv (src/components/data_generator.py), then runs
+# ingestion, transformation, training and bulk scoring on it, and records the time and peak memory of every stage.
+# Each stage runs in its own Python process (in a separate working folder per size, so the real artifacts are
+# never touched), so the peak memory of one stage does not hide the next one's. The peak memory is that of the
+# stage's own process: joblib worker processes started by the model search are not included.
+#
+#   python -m benchmarks.pipeline_scaling --rows 1000 10000 100000 1000000 --output benchmarks/results/scaling.json
+#   python -m benchmarks.pipeline_scaling --rows 100000000 --stages generate ingestion transformation
+import os  # Helps with file and directory management
+import sys  # Helps in handling errors and system-related operations
+import json  # Saves the results
+import time  # Measures how long each stage takes
+import shutil  # Removes the working folders afterwards
+import argparse  # Reads the options given on the command line
+import subprocess  # Runs every stage in a fresh Python process
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ["generate", "ingestion", "transformation", "training", "scoring"]
+DATA_FILE = "students.csv"  # The synthetic dataset, inside each size's working folder
+
+
+# Run one stage in the current folder and return what it produced
+def run_stage(stage, args):
+    if stage == "generate":
+        from src.components.data_generator import DataGeneratorConfig, StudentDataGenerator
+
+        return StudentDataGenerator(DataGeneratorConfig(
+            source_data_path=os.path.join(REPO_DIR, "notebook", "data", "stud.csv"),
+            output_path=DATA_FILE, n_rows=args.rows[0], seed=args.seed,
+        )).run()
+
+    if stage == "ingestion":
+        from src.components.data_ingestion import DataIngestion, DataIngestionConfig
+
+        # The CSV copies of the splits are skipped: the next stages read the binary tables
+        return list(DataIngestion(DataIngestionConfig(source_data_path=DATA_FILE, write_csv=False)).initiate_data_ingestion())
+
+    if stage == "transformation":
+        from src.components.data_ingestion import DataIngestionConfig
+        from src.components.data_transformation import DataTransformation
+
+        config = DataIngestionConfig()
+        return DataTransformation().initiate_data_transformation(config.train_table_path, config.test_table_path)[2]
+
+    if stage == "training":
+        from src.components.data_transformation import DataTransformationConfig
+        from src.components.model_trainer import ModelTrainer, ModelTrainerConfig
+
+        config = DataTransformationConfig()
+        trainer = ModelTrainer(ModelTrainerConfig(
+            search_strategy=args.strategy, time_budget=args.time_budget, n_jobs=args.n_jobs,
+        ))
+        return float(trainer.initiate_model_trainer_from_files(config.train_matrix_path, config.test_matrix_path))
+
+    if stage == "scoring":
+        from src.pipeline.batch_predict import BatchPredictConfig, BatchPredictor
+
+        predictor = BatchPredictor(BatchPredictConfig(keep_columns=False, workers=args.workers))
+        return predictor.run(DATA_FILE, "predictions.csv")
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+# Run one stage of one size in a fresh process and return its time and peak memory
+def measure_stage(stage, n_rows, work_dir, args):
+    command = [
+        sys.executable, "-W", "ignore", "-m", "benchmarks.pipeline_scaling", "--stage", stage,
+        "--rows", str(n_rows), "--strategy", args.strategy, "--n-jobs", str(args.n_jobs),
+        "--workers", str(args.workers), "--seed", str(args.seed),
+    ]
+    if args.time_budget is not None:
+        command += ["--time-budget", str(args.time_budget)]
+    env = {**os.environ, "PYTHONPATH": REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    result = subprocess.run(command, cwd=work_dir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"stage": stage, "rows": n_rows, "error": result.stderr.strip().splitlines()[-1:]}
+    return {"stage": stage, "rows": n_rows, **json.loads(result.stdout.strip().splitlines()[-1])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic datasets of growing size.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="Dataset sizes")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES, help="Stages to run, in order")
+    parser.add_argument("--strategy", default="random", choices=["grid", "halving", "random"], help="Model search")
+    parser.add_argument("--time-budget", type=float, default=60.0, help="Seconds for the random search")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="CPU cores for the model search")
+    parser.add_argument("--workers", type=int, default=0, help="Extra processes for bulk scoring")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic data")
+    parser.add_argument("--work-dir", default=os.path.join("artifacts", "scaling"), help="Folder for the working files")
+    parser.add_argument("--keep", action="store_true", help="Keep the working files")
+    parser.add_argument("--output", default=None, help="JSON file to save the results to")
+    parser.add_argument("--stage", default=None, help=argparse.SUPPRESS)  # Used by the stage processes
+    args = parser.parse_args()
+
+    # Inside a stage process: run the stage and print its time and peak memory as the last line
+    if args.stage:
+        from src.utils import peak_memory_mb
+
+        start = time.perf_counter()
+        result = run_stage(args.stage, args)
+        print(json.dumps({"seconds": time.perf_counter() - start, "peak_memory_mb": peak_memory_mb(), "result": result}))
+        sys.exit(0)
+
+    # Every stage of every size, each in a fresh process; a failed stage skips the rest of that size
+    results = []
+    for n_rows in args.rows:
+        work_dir = os.path.join(os.path.abspath(args.work_dir), f"rows_{n_rows}")
+        os.makedirs(work_dir, exist_ok=True)
+        for stage in args.stages:
+            results.append(measure_stage(stage, n_rows, work_dir, args))
+            print(json.dumps(results[-1]), flush=True)
+            if "error" in results[-1]:
+                break
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as file_obj:
+            json.dump(results, file_obj, indent=2)
+    sys.exit(1 if any("error" in result for result in results) else 0)
@@ -0,0 +1,93 @@
+# Benchmark: single-record latency of the DataFrame path versus the plain-columns path
+# (CustomData.get_records_as_columns), checked against the original sklearn pipeline on a DataFrame
+# (preprocessor.transform, then model.predict), which is what every request used before.
+#
+# With the sklearn pipeline the plain-columns path must give byte-identical predictions. The compiled scorer
+# adds up the linear weights in a different order (and in extended precision), so it is not byte-identical:
+# it is accepted when it is within the export's parity tolerance of the original path (check_parity's allowed
+# difference on the same rows, which is 1e-3 plus sklearn's own rounding for an ill-conditioned linear model).
+#
+#   python -m benchmarks.record_path --records 2000
+import sys  # Helps in handling errors and system-related operations
+import json  # Prints the results
+import time  # Measures how long each call takes
+import argparse  # Reads the options given on the command line
+
+import numpy as np  # Computes the latency percentiles
+import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+
+from src.pipeline.predict_pipeline import FEATURE_COLUMNS, CustomData, PredictPipeline
+from src.pipeline.compiled_scorer import CompiledScorerConfig, check_parity
+
+
+# Time a function once per record and return the predictions and the median time in microseconds
+def time_per_record(function, records):
+    preds, times = [], []
+    for record in records:
+        start = time.perf_counter()
+        preds.append(function(record))
+        times.append(time.perf_counter() - start)
+    return np.concatenate(preds), float(np.median(times) * 1e6)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the DataFrame and plain-columns prediction paths.")
+    parser.add_argument("--data", default="artifacts/data.csv", help="CSV of student records")
+    parser.add_argument("--records", type=int, default=1000, help="Number of records to score")
+    args = parser.parse_args()
+
+    rows = pd.read_csv(args.data)[FEATURE_COLUMNS].head(args.records).to_dict("records")
+    records = [CustomData(**row) for row in rows]
+    results = {}
+    correct = True
+
+    # The original path: one DataFrame per record through preprocessor.transform and model.predict
+    reference = PredictPipeline(use_compiled_scorer=False)
+    reference.predict([records[0]], use_cache=False)  # Warm up (load the artifacts)
+    original_preds, original_us = time_per_record(
+        lambda record: reference.predict(record.get_data_as_data_frame(), use_cache=False), records
+    )
+    # ...and the whole batch as one DataFrame (sklearn adds up a batch in a different order than a single row,
+    # so a batch is compared with the original path on the same batch)
+    original_batch = reference.predict(CustomData.get_records_as_data_frame(rows), use_cache=False)
+
+    for name, use_compiled in [("compiled", True), ("sklearn", False)]:
+        pipeline = PredictPipeline(use_compiled_scorer=use_compiled)
+        pipeline.predict([records[0]], use_cache=False)  # Warm up (load the artifacts)
+
+        # The sklearn path must not change a single bit; the compiled scorer may differ by the parity tolerance
+        tolerance = 0.0
+        scorer = pipeline.get_compiled_scorer(pipeline.registry.get_model(), pipeline.registry.get_preprocessor())
+        if use_compiled and scorer is not None:
+            _, tolerance = check_parity(
+                scorer, pipeline.registry.get_preprocessor(), pipeline.registry.get_model(),
+                pd.DataFrame(rows, columns=FEATURE_COLUMNS), CompiledScorerConfig().tolerance,
+            )
+
+        # One record at a time: from a DataFrame, then from plain columns without a DataFrame
+        frame_preds, frame_us = time_per_record(
+            lambda record: pipeline.predict(record.get_data_as_data_frame(), use_cache=False), records
+        )
+        column_preds, column_us = time_per_record(lambda record: pipeline.predict([record], use_cache=False), records)
+
+        # The whole batch at once, from dictionaries (as the JSON endpoint receives them)
+        batch_columns = pipeline.predict(CustomData.get_records_as_columns(rows), use_cache=False)
+
+        paths = [(frame_preds, original_preds), (column_preds, original_preds), (batch_columns, original_batch)]
+        max_diff = max(float(np.max(np.abs(preds - original))) for preds, original in paths)
+        identical = all(preds.tobytes() == original.tobytes() for preds, original in paths)
+        within = identical if tolerance == 0.0 else bool(max_diff <= tolerance)
+        correct &= within
+        results[name] = {
+            "original_dataframe_median_us": original_us,
+            "dataframe_median_us": frame_us,
+            "columns_median_us": column_us,
+            "speedup_vs_original": original_us / column_us,
+            "byte_identical_to_original": identical,
+            "max_abs_diff_from_original": max_diff,
+            "accepted_tolerance": float(tolerance),
+            "within_tolerance": within,
+        }
+
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if correct else 1)
@@ -0,0 +1,256 @@
+# Benchmark: latency, throughput and memory of the prediction service.
+#
+# In-process mode compares the PredictPipeline variants directly (no web server), each in its own process:
+#   python -m benchmarks.serving_load --output benchmarks/results/serving.json
+# HTTP mode drives a running server (Flask on :5000 or uvicorn asgi:app on :7860) with a local load generator:
+#   python -m benchmarks.serving_load --url http://localhost:7860 --concurrency 16 --server-pid 1234
+# Compare two saved runs (for example from two commits):
+#   python -m benchmarks.serving_load --compare old.json new.json
+import os  # Helps with file and directory management
+import sys  # Helps in handling errors and system-related operations
+import json  # Saves and reads the results
+import time  # Measures how long each request takes
+import argparse  # Reads the options given on the command line
+import subprocess  # Starts fresh Python processes to measure cold start, and reads the git commit
+import urllib.parse  # Encodes the form fields for /predictdata
+import urllib.request  # Sends HTTP requests to a running server
+from concurrent.futures import ThreadPoolExecutor  # Sends many requests at the same time
+
+import numpy as np  # Computes the latency percentiles
+import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+
+from src.pipeline.predict_pipeline import FEATURE_COLUMNS  # The input columns the model expects
+
+# The pipeline variants compared in in-process mode: (use the compiled scorer, use the prediction cache)
+VARIANTS = {
+    "sklearn": (False, False),
+    "cached": (False, True),
+    "compiled": (True, False),
+    "compiled+cached": (True, True),
+}
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+
+
+# Resident memory (RSS) of a process in MB, read from /proc (Linux only; None elsewhere)
+def rss_mb(pid="self"):
+    try:
+        with open(f"/proc/{pid}/status") as file_obj:
+            for line in file_obj:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+# Latency percentiles (in milliseconds) and throughput for a list of request timings
+def summarize(latencies, wall_seconds, rows_per_request=1):
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "requests_per_s": len(latencies) / wall_seconds,
+        "rows_per_s": len(latencies) * rows_per_request / wall_seconds,
+    }
+
+
+# Student records to send, repeated to make batches as large as needed
+def load_records(data_path, n_rows):
+    df = pd.read_csv(data_path)[FEATURE_COLUMNS]
+    repeats = int(np.ceil(n_rows / len(df)))
+    return pd.concat([df] * repeats, ignore_index=True).iloc[:n_rows]
+
+
+# Time from starting a fresh Python process to its first prediction, for one variant
+def cold_start_seconds(variant):
+    use_compiled, use_cache = VARIANTS[variant]
+    code = (
+        "import time; start = time.perf_counter()\n"
+        "from src.pipeline.predict_pipeline import PredictPipeline, CustomData\n"
+        f"pipeline = PredictPipeline(use_compiled_scorer={use_compiled})\n"
+        "row = CustomData('female', 'group B', \"bachelor's degree\", 'standard', 'none', 72, 74)\n"
+        f"pipeline.predict(row.get_data_as_data_frame(), use_cache={use_cache})\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True, text=True, check=True)
+    return {"process_s": time.perf_counter() - start, "import_and_first_predict_s": float(output.stdout.split()[-1])}
+
+
+# Benchmark one pipeline variant in this process. Run on its own (see run_in_process), so rss_mb is the memory
+# of this variant alone; rss_mb_added is how much loading and using the pipeline added to the bare process.
+def run_variant(variant, data_path, n_requests, batch_sizes):
+    from src.pipeline.predict_pipeline import PredictPipeline
+
+    use_compiled, use_cache = VARIANTS[variant]
+    records = load_records(data_path, max(batch_sizes + [n_requests]))
+    rss_before = rss_mb()
+    pipeline = PredictPipeline(use_compiled_scorer=use_compiled)
+    pipeline.predict(records.iloc[:1], use_cache=use_cache)  # Warm up (load the artifacts)
+    result = {"cold_start": cold_start_seconds(variant)}
+
+    # Steady state: one row per call, cycling through realistic records
+    rows = [records.iloc[i:i + 1] for i in range(min(n_requests, len(records)))]
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n_requests):
+        call_start = time.perf_counter()
+        pipeline.predict(rows[i % len(rows)], use_cache=use_cache)
+        latencies.append(time.perf_counter() - call_start)
+    result["single_row"] = summarize(latencies, time.perf_counter() - start)
+
+    # Batches of increasing size
+    result["batches"] = {}
+    for batch_size in batch_sizes:
+        batch = records.iloc[:batch_size]
+        repeats = max(3, min(50, 20_000 // batch_size))
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(repeats):
+            call_start = time.perf_counter()
+            pipeline.predict(batch, use_cache=use_cache)
+            latencies.append(time.perf_counter() - call_start)
+        result["batches"][str(batch_size)] = summarize(latencies, time.perf_counter() - start, batch_size)
+
+    if use_cache:
+        result["cache"] = pipeline.cache.stats()
+    result["rss_mb"] = rss_mb()
+    result["rss_mb_added"] = None if rss_before is None else result["rss_mb"] - rss_before
+    return result
+
+
+# Benchmark every pipeline variant, each in a fresh Python process so one variant's memory
+# (and warm caches) does not carry over to the next
+def run_in_process(data_path, n_requests, batch_sizes):
+    results = {}
+    for variant in VARIANTS:
+        command = [
+            sys.executable, "-W", "ignore", "-m", "benchmarks.serving_load", "--variant", variant,
+            "--data", data_path, "--requests", str(n_requests), "--batch-sizes", *map(str, batch_sizes),
+        ]
+        output = subprocess.run(command, capture_output=True, text=True, check=True)
+        results[variant] = json.loads(output.stdout)
+        print(f"{variant}: single-row p50 {results[variant]['single_row']['p50_ms']:.3f} ms", file=sys.stderr)
+    return results
+
+
+# Send one HTTP request and return how long it took
+def timed_request(url, body, content_type):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+# Send requests from several threads at once and summarize the timings
+def drive(url, bodies, content_type, concurrency, rows_per_request=1):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(lambda body: timed_request(url, body, content_type), bodies))
+    return summarize(latencies, time.perf_counter() - start, rows_per_request)
+
+
+# Benchmark a running server over HTTP
+def run_http(base_url, data_path, n_requests, batch_sizes, concurrency, server_pids):
+    records = load_records(data_path, max(batch_sizes + [n_requests]))
+    results = {}
+
+    # Cold start as seen by a client: time until /health answers (0 if the server is already up).
+    # Both app.py (Flask) and asgi.py have a /health route.
+    start = time.perf_counter()
+    while True:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health") as response:
+                if response.status == 200:
+                    break
+        except Exception:
+            time.sleep(0.05)
+            if time.perf_counter() - start > 120:
+                raise TimeoutError("Server did not become ready")
+    results["time_to_ready_s"] = time.perf_counter() - start
+
+    # Steady state through the HTML form, one student per request
+    form_bodies = []
+    for record in records.iloc[:n_requests].to_dict("records"):
+        fields = dict(record, ethnicity=record["race_ethnicity"])
+        form_bodies.append(urllib.parse.urlencode(fields).encode())
+    results["predictdata"] = drive(
+        f"{base_url}/predictdata", form_bodies, "application/x-www-form-urlencoded", concurrency
+    )
+
+    # JSON batches of increasing size
+    results["predict_batch"] = {}
+    for batch_size in batch_sizes:
+        body = json.dumps(records.iloc[:batch_size].to_dict("records")).encode()
+        repeats = max(3, min(200, 20_000 // batch_size))
+        results["predict_batch"][str(batch_size)] = drive(
+            f"{base_url}/predict_batch", [body] * repeats, "application/json", concurrency, batch_size
+        )
+
+    results["rss_mb_per_worker"] = {str(pid): rss_mb(pid) for pid in server_pids}
+    return results
+
+
+# Print the change in p50/p95/p99 between two saved runs
+def compare(old_path, new_path):
+    with open(old_path) as file_obj:
+        old = json.load(file_obj)
+    with open(new_path) as file_obj:
+        new = json.load(file_obj)
+
+    # Walk both result trees and print every latency that exists in both
+    def walk(old_node, new_node, path):
+        for key, new_value in new_node.items():
+            old_value = old_node.get(key) if isinstance(old_node, dict) else None
+            if isinstance(new_value, dict) and isinstance(old_value, dict):
+                walk(old_value, new_value, path + [key])
+            elif key.endswith("_ms") and isinstance(old_value, (int, float)) and old_value:
+                change = (new_value - old_value) / old_value * 100
+                print(f"{'/'.join(path + [key]):60s} {old_value:10.3f} -> {new_value:10.3f} ms ({change:+.1f}%)")
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    walk(old["results"], new["results"], [])
+
+
+# The current git commit, saved with the results so runs can be compared between commits
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure prediction latency, throughput and memory.")
+    parser.add_argument("--url", help="Benchmark a running server at this address instead of in-process")
+    parser.add_argument("--data", default=os.path.join("artifacts", "data.csv"), help="CSV of student records")
+    parser.add_argument("--requests", type=int, default=2_000, help="Single-row requests to send")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel clients in HTTP mode")
+    parser.add_argument("--server-pid", type=int, nargs="*", default=[], help="Worker PIDs to report RSS for")
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    parser.add_argument("--variant", choices=list(VARIANTS), help="Benchmark only this variant and print its results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two saved JSON results")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.data, args.requests, args.batch_sizes)))
+        sys.exit(0)
+
+    if args.url:
+        results = run_http(args.url.rstrip("/"), args.data, args.requests, args.batch_sizes, args.concurrency, args.server_pid)
+    else:
+        results = run_in_process(args.data, args.requests, args.batch_sizes)
+
+    report = {"commit": git_commit(), "mode": "http" if args.url else "in_process", "results": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as file_obj:
+            json.dump(report, file_obj, indent=2)
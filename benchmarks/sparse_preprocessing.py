@@ -0,0 +1,90 @@
+# Benchmark: memory and fit time of the sparse (CSR) feature matrix versus the old dense one,
+# as the number of rows and the number of categories per column grow.
+#
+#   python -m benchmarks.sparse_preprocessing --rows 1000 10000 100000 --levels 5 50 500
+import sys  # Helps in handling errors and system-related operations
+import json  # Saves the results
+import time  # Measures how long each step takes
+import argparse  # Reads the options given on the command line
+import tracemalloc  # Measures the peak memory used by each step
+
+import numpy as np  # Fast math on arrays of numbers
+import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+from sklearn.linear_model import LinearRegression  # A basic model to predict numbers
+from sklearn.tree import DecisionTreeRegressor  # A model that makes decisions step by step
+
+from src.components.data_transformation import DataTransformation  # Builds the preprocessor
+
+
+# Make a random table with the same columns as the student data and the given number of categories per column
+def make_data(n_rows, n_levels, seed=42):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        column: np.char.add(f"{column}_", rng.integers(0, n_levels, n_rows).astype(str)).astype(object)
+        for column in ["gender", "race_ethnicity", "parental_level_of_education", "lunch", "test_preparation_course"]
+    })
+    df["reading_score"] = rng.integers(0, 101, n_rows)
+    df["writing_score"] = rng.integers(0, 101, n_rows)
+    target = 0.8 * df["reading_score"] + rng.normal(0, 5, n_rows)
+    return df, target.to_numpy()
+
+
+# Run a function and return (result, seconds taken, peak memory in bytes)
+def measure(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+# Size in bytes of a dense or sparse matrix
+def matrix_bytes(X):
+    if hasattr(X, "data") and hasattr(X, "indices"):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+# Benchmark one dataset size with the sparse and the dense preprocessor
+def run_case(n_rows, n_levels):
+    df, y = make_data(n_rows, n_levels)
+    rows = []
+    for sparse_output in (True, False):
+        preprocessor = DataTransformation().get_data_transformation_object(sparse_output=sparse_output)
+        X, transform_seconds, transform_peak = measure(lambda: preprocessor.fit_transform(df))
+        row = {
+            "rows": n_rows,
+            "levels": n_levels,
+            "format": "csr" if sparse_output else "dense",
+            "features": X.shape[1],
+            "matrix_mb": matrix_bytes(X) / 1e6,
+            "transform_s": transform_seconds,
+            "transform_peak_mb": transform_peak / 1e6,
+        }
+        for name, model in [("linear", LinearRegression()), ("tree", DecisionTreeRegressor(max_depth=8))]:
+            _, fit_seconds, fit_peak = measure(lambda: model.fit(X, y))
+            row[f"{name}_fit_s"] = fit_seconds
+            row[f"{name}_fit_peak_mb"] = fit_peak / 1e6
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sparse and dense preprocessing output.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--levels", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--output", help="Also save the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for n_rows in args.rows:
+        for n_levels in args.levels:
+            results.extend(run_case(n_rows, n_levels))
+
+    print(pd.DataFrame(results).to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    if args.output:
+        with open(args.output, "w") as file_obj:
+            json.dump(results, file_obj, indent=2)
+        print(f"Saved results to {args.output}", file=sys.stderr)
@@ -0,0 +1,156 @@
+# Production launcher: load everything once in a master process, then fork the uvicorn workers.
+#   python serve.py                      (settings come from the environment variables below)
+#
+# The master imports the app (asgi.py imports only NumPy and the pipeline code), then warms it up *before*
+# forking: the warm-up loads model.pkl, preprocessor.pkl, the compiled scorer and the input schema, and
+# unpickling them imports scikit-learn, SciPy, pandas and joblib (and XGBoost or CatBoost when the saved model
+# is one of theirs). Forked workers share those memory pages with the master (copy-on-write) instead of each
+# importing and loading everything again, and a worker that is recycled is forked again from the master,
+# so it starts instantly without touching the disk.
+#
+# To see the memory saved, run `python serve.py --memory-report` while it is serving (RSS, PSS and shared MB of
+# the master and each worker; PSS splits shared pages fairly between the processes that share them), and compare
+# with `uvicorn asgi:app --workers N` using `python -m benchmarks.serving_load --url ... --server-pid PID ...`.
+import os  # Used to read settings from environment variables and to fork worker processes
+import gc  # Stops the garbage collector from touching (and so copying) the shared objects
+import sys  # Used to exit the worker processes
+import time  # Used to pause between restarting workers that keep failing
+import random  # Spreads out worker recycling so all workers do not restart together
+import signal  # Stops the workers when the launcher is asked to stop
+import socket  # The listening socket shared by all workers
+import argparse  # Reads the options given on the command line
+
+import uvicorn  # The ASGI server each worker runs
+
+# Settings, read from environment variables
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "7860"))
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", "2"))  # Worker processes to fork
+MAX_REQUESTS = int(os.environ.get("MAX_REQUESTS", "10000"))  # Requests before a worker is recycled (0 = never)
+MAX_REQUESTS_JITTER = int(os.environ.get("MAX_REQUESTS_JITTER", "1000"))  # Random extra requests per worker
+KEEP_ALIVE_SECONDS = int(os.environ.get("UVICORN_TIMEOUT_KEEP_ALIVE", "5"))
+
+
+# Read the memory use of a process from /proc (Linux only): resident (RSS), proportional (PSS) and shared
+def memory_mb(pid):
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as file_obj:
+            for line in file_obj:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:", "Shared_Clean:", "Shared_Dirty:"):
+                    values[parts[0].rstrip(":").lower()] = int(parts[1]) / 1024
+    except OSError:
+        pass
+    return values
+
+
+# Load the app, the artifacts and the compiled scorer, and make one prediction (runs once, in the master)
+def preload():
+    import asgi  # Imports the app and the prediction pipeline code
+
+    asgi.warm_up()  # Loads the artifacts, which imports scikit-learn and the libraries they need
+    # Move everything loaded so far out of the garbage collector's view; otherwise the collector writes to
+    # every object it checks, which would copy the shared pages into each worker
+    gc.collect()
+    gc.freeze()
+    return asgi.app
+
+
+# Run one uvicorn worker on the shared socket (runs in the forked child)
+def run_worker(app, sock):
+    # The master's signal handlers are not wanted here; uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    limit = MAX_REQUESTS + random.randint(0, MAX_REQUESTS_JITTER) if MAX_REQUESTS else None
+    config = uvicorn.Config(
+        app,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        limit_max_requests=limit,  # Exit after this many requests; the master forks a fresh copy
+        log_level="warning",
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+# Fork one worker and return its process id
+def spawn(app, sock):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app, sock)
+        finally:
+            os._exit(0)
+    return pid
+
+
+# Fork the workers, keep the right number running, and stop them all on SIGTERM or Ctrl+C
+def main():
+    app = preload()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    workers = {spawn(app, sock) for _ in range(WORKERS)}
+    print(f"Serving on http://{HOST}:{PORT} with {WORKERS} pre-forked workers (master pid {os.getpid()})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Replace every worker that exits (recycled after MAX_REQUESTS, or crashed) until asked to stop
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            if os.waitstatus_to_exitcode(status) != 0:
+                time.sleep(1)  # A crashing worker should not restart in a tight loop
+            workers.add(spawn(app, sock))
+    sys.exit(0)
+
+
+# Print the memory use of the master and its workers
+def memory_report(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as file_obj:
+        children = [int(pid) for pid in file_obj.read().split()]
+    for label, pid in [("master", master_pid)] + [("worker", pid) for pid in children]:
+        values = memory_mb(pid)
+        print(f"{label} {pid}: " + ", ".join(f"{key} {value:.1f} MB" for key, value in values.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the ASGI app with pre-forked, pre-loaded workers.")
+    parser.add_argument("--memory-report", type=int, nargs="?", const=-1, metavar="MASTER_PID",
+                        help="Print the memory use of a running launcher (finds it by itself on Linux)")
+    args = parser.parse_args()
+
+    if args.memory_report is not None:
+        master_pid = args.memory_report
+        if master_pid == -1:
+            import subprocess
+            master_pid = int(subprocess.run(
+                ["pgrep", "-o", "-f", "serve.py$"], capture_output=True, text=True
+            ).stdout.split()[0])
+        memory_report(master_pid)
+    elif not hasattr(os, "fork"):
+        # Windows cannot fork, so fall back to uvicorn's own workers
+        uvicorn.run("asgi:app", host=HOST, port=PORT, workers=WORKERS, timeout_keep_alive=KEEP_ALIVE_SECONDS)
+    else:
+        main()
@@ -0,0 +1,132 @@
+# Import tools needed for file management, reading arguments, number crunching and error tracking
+import os  # Helps with file and directory management
+import sys  # Helps in handling errors and system-related operations
+import argparse  # Reads the options given on the command line
+from dataclasses import dataclass  # A simple way to create classes for storing settings
+
+import numpy as np  # Fast math on arrays of numbers
+import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+
+# The columns of stud.csv, in the same order
+CATEGORICAL_COLUMNS = ["gender", "race_ethnicity", "parental_level_of_education", "lunch", "test_preparation_course"]
+SCORE_COLUMNS = ["math_score", "reading_score", "writing_score"]
+SCORE_RANGE = (0, 100)  # Scores are whole numbers in this range
+
+
+# Settings for making synthetic student records
+@dataclass
+class DataGeneratorConfig:
+    source_data_path: str = os.path.join("notebook", "data", "stud.csv")  # Real records the generator learns from
+    output_path: str = os.path.join("artifacts", "synthetic_students.csv")  # Where the records are written
+    n_rows: int = 100_000  # Number of records to write
+    chunk_size: int = 1_000_000  # Records made and written at a time (memory stays flat at any size)
+    smoothing: float = 0.1  # Extra count given to every mix of categories, so ones unseen in the data can appear
+    seed: int = 42  # Same seed (and chunk_size) -> same records
+
+
+# This class learns how the real records are distributed and makes as many new ones as needed:
+#   - the five categories are drawn together from their joint frequencies in the real data (so, for example,
+#     lunch type and parental education stay related as they are in stud.csv),
+#   - the three scores are the average for that mix of categories (a linear model, one effect per category)
+#     plus correlated noise with the same covariance as the real scores around those averages,
+#     rounded to whole numbers and kept inside 0-100.
+class StudentDataGenerator:
+    def __init__(self, config: DataGeneratorConfig = None):
+        self.config = config or DataGeneratorConfig()
+
+    # Learn the category frequencies and the score model from a table of real records
+    def fit(self, df):
+        try:
+            # Every category of every column, and the share of records with each mix of categories
+            self.levels = [np.array(sorted(df[column].unique()), dtype=object) for column in CATEGORICAL_COLUMNS]
+            codes = [
+                pd.Categorical(df[column], categories=levels).codes
+                for column, levels in zip(CATEGORICAL_COLUMNS, self.levels)
+            ]
+            self.shape = tuple(len(levels) for levels in self.levels)
+            counts = np.bincount(np.ravel_multi_index(codes, self.shape), minlength=int(np.prod(self.shape)))
+            counts = counts + self.config.smoothing
+            self.cell_probabilities = counts / counts.sum()
+
+            # Score averages: an intercept plus one effect per category (the first category of each column is
+            # the baseline), fitted by least squares for the three scores at once
+            design = np.hstack([np.ones((len(df), 1))] + [
+                np.eye(n_levels)[code][:, 1:] for n_levels, code in zip(self.shape, codes)
+            ])
+            scores = df[SCORE_COLUMNS].to_numpy(dtype=float)
+            coefficients, *_ = np.linalg.lstsq(design, scores, rcond=None)
+            self.intercept = coefficients[0]
+            # effects[c][k] = how much category k of column c adds to each score
+            self.effects, start = [], 1
+            for n_levels in self.shape:
+                self.effects.append(np.vstack([np.zeros(len(SCORE_COLUMNS)), coefficients[start:start + n_levels - 1]]))
+                start += n_levels - 1
+
+            # Correlated noise around the averages (reading and writing scores move together)
+            residuals = scores - design @ coefficients
+            self.noise_factor = np.linalg.cholesky(np.cov(residuals, rowvar=False))
+            logging.info(f"Fitted the student data generator on {len(df)} records")
+            return self
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Make n_rows new records as a table with the same columns as stud.csv
+    def sample(self, n_rows, rng):
+        cells = rng.choice(len(self.cell_probabilities), size=n_rows, p=self.cell_probabilities)
+        codes = np.unravel_index(cells, self.shape)
+
+        averages = self.intercept + sum(effects[code] for effects, code in zip(self.effects, codes))
+        scores = averages + rng.standard_normal((n_rows, len(SCORE_COLUMNS))) @ self.noise_factor.T
+        scores = np.clip(np.rint(scores), *SCORE_RANGE).astype(np.int64)
+
+        table = {column: levels[code] for column, levels, code in zip(CATEGORICAL_COLUMNS, self.levels, codes)}
+        table.update({column: scores[:, i] for i, column in enumerate(SCORE_COLUMNS)})
+        return pd.DataFrame(table)
+
+    # Write config.n_rows records to config.output_path, one chunk at a time; returns the path
+    def write(self):
+        try:
+            config = self.config
+            os.makedirs(os.path.dirname(config.output_path) or ".", exist_ok=True)
+            rng = np.random.default_rng(config.seed)
+            logging.info(f"Writing {config.n_rows} synthetic records to {config.output_path}")
+
+            # (at least one chunk is written, so even 0 rows gives a file with the header)
+            for start in range(0, max(config.n_rows, 1), config.chunk_size):
+                n_rows = min(config.chunk_size, config.n_rows - start)
+                self.sample(n_rows, rng).to_csv(
+                    config.output_path, mode="w" if start == 0 else "a", header=start == 0, index=False
+                )
+            return config.output_path
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Learn from the source records and write the synthetic ones
+    def run(self):
+        self.fit(pd.read_csv(self.config.source_data_path))
+        return self.write()
+
+
+# Run this file directly to make a synthetic dataset, for example:
+#   python -m src.components.data_generator --rows 10000000 --output artifacts/students_10m.csv
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic student records learned from stud.csv.")
+    parser.add_argument("--rows", type=int, default=DataGeneratorConfig.n_rows, help="Number of records")
+    parser.add_argument("--output", default=DataGeneratorConfig.output_path, help="CSV file to write")
+    parser.add_argument("--source", default=DataGeneratorConfig.source_data_path, help="Real records to learn from")
+    parser.add_argument("--chunk-size", type=int, default=DataGeneratorConfig.chunk_size, help="Records per chunk")
+    parser.add_argument("--seed", type=int, default=DataGeneratorConfig.seed)
+    args = parser.parse_args()
+
+    generator = StudentDataGenerator(DataGeneratorConfig(
+        source_data_path=args.source, output_path=args.output, n_rows=args.rows,
+        chunk_size=args.chunk_size, seed=args.seed,
+    ))
+    print(generator.run())
@@ -6,12 +6,7 @@ from src.logger import logging  # For logging messages (keeping track of actions
 import pandas as pd  # To work with data in tables (like spreadsheets)
 from sklearn.model_selection import train_test_split  # To split data into training and testing sets
 from dataclasses import dataclass  # A simple way to create classes for storing data
-
-# Import classes for preparing data and training the model
-from src.components.data_transformation import DataTransformation  # Prepares the data for training
-from src.components.data_transformation import DataTransformationConfig  # Configuration for data preparation
-from src.components.model_trainer import ModelTrainerConfig  # Configuration for training the model
-from src.components.model_trainer import ModelTrainer  # Runs the model training process
+from src.utils import save_table, load_table  # Saves and reads tables as binary columns
 
 # This class sets up and stores where to save different data files
 @dataclass
@@ -25,59 +20,98 @@ class DataIngestionConfig:
     # Path to save the original (raw) data file
     raw_data_path: str = os.path.join('artifacts', "data.csv")
 
+    # Path of the dataset to read
+    source_data_path: str = os.path.join('notebook', 'data', 'stud.csv')
+
+    # Every record so far: the dataset above plus each batch added by RetrainPipeline (once there is one,
+    # TrainPipeline reads this file instead, so a full retrain keeps the added records)
+    dataset_path: str = os.path.join('artifacts', "dataset.csv")
+
+    # Folders to save the training and testing data as binary columns (fast to load, keeps categories)
+    train_table_path: str = os.path.join('artifacts', "train_table")
+    test_table_path: str = os.path.join('artifacts', "test_table")
+
+    # Also write the CSV files (easy to open by hand, but slow to read back)
+    write_csv: bool = True
+
 # Class to manage loading and saving data
 class DataIngestion:
-    def __init__(self):
+    def __init__(self, config: DataIngestionConfig = None):
         # Set up file paths to save data
-        self.ingestion_config = DataIngestionConfig()
+        self.ingestion_config = config or DataIngestionConfig()
 
     # Method to load data and split it for training and testing
     def initiate_data_ingestion(self):
         logging.info("Starting the data loading process")
         try:
             # Read data from a CSV file into a table format
-            df = pd.read_csv('notebook/data/stud.csv')  # Update path if needed
+            df = pd.read_csv(self.ingestion_config.source_data_path)  # Update path in the config if needed
             logging.info('Data has been successfully loaded')
 
             # Create folders to save files if they don’t already exist
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok=True)
 
             # Save the raw data to a file for reference
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
+            if self.ingestion_config.write_csv:
+                df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
 
             logging.info("Splitting data into training and testing parts")
             # Split data into training (80%) and testing (20%) sets
             train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)
 
-            # Save the training data to a file
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
-            # Save the testing data to a file
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
+            # Save the training and testing data as binary columns for the next stage
+            save_table(train_set, self.ingestion_config.train_table_path)
+            save_table(test_set, self.ingestion_config.test_table_path)
+
+            if self.ingestion_config.write_csv:
+                # Save the training data to a file
+                train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
+                # Save the testing data to a file
+                test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
 
             logging.info("Data loading and splitting completed")
 
-            # Return paths to the training and testing files
+            # Return paths to the training and testing data (binary column folders)
             return (
-                self.ingestion_config.train_data_path,
-                self.ingestion_config.test_data_path
+                self.ingestion_config.train_table_path,
+                self.ingestion_config.test_table_path
             )
         except Exception as e:
             # If an error occurs, raise a custom error with details
             raise CustomException(e, sys)
 
+    # Method to add newly arrived records to the saved training and testing tables (split the same way).
+    # With save=False the tables are only returned, so the caller can save them once everything else has worked.
+    # Returns (new training rows, new testing rows, training table, testing table).
+    def append_new_data(self, new_df, save=True):
+        logging.info(f"Appending {len(new_df)} new records to the training and testing data")
+        try:
+            # Split the new records 80/20 like the original data (very small batches all go to training)
+            if len(new_df) >= 5:
+                new_train, new_test = train_test_split(new_df, test_size=0.2, random_state=42)
+            else:
+                new_train, new_test = new_df, new_df.iloc[:0]
+
+            # Add the new records to the end of each saved table
+            tables = []
+            for table_path, new_rows in [
+                (self.ingestion_config.train_table_path, new_train),
+                (self.ingestion_config.test_table_path, new_test),
+            ]:
+                table = load_table(table_path, mmap=False)
+                table = pd.concat([table.astype(new_rows.dtypes.to_dict()), new_rows[table.columns]], ignore_index=True)
+                if save:
+                    save_table(table, table_path)
+                tables.append(table)
+
+            return new_train, new_test, tables[0], tables[1]
+
+        except Exception as e:
+            # If an error occurs, raise a custom error with details
+            raise CustomException(e, sys)
+
 # Main part of the code to run the entire data loading and model training process
 if __name__ == "__main__":
-    # Create an instance of DataIngestion
-    obj = DataIngestion()
-    # Run the data loading process and get paths to training and testing data files
-    train_data, test_data = obj.initiate_data_ingestion()
-
-    # Create an instance of DataTransformation to prepare the data
-    data_transformation = DataTransformation()
-    # Transform data for training and testing
-    train_arr, test_arr, _ = data_transformation.initiate_data_transformation(train_data, test_data)
-
-    # Create an instance of ModelTrainer to train the model
-    modeltrainer = ModelTrainer()
-    # Train the model with the prepared data and print the result
-    print(modeltrainer.initiate_model_trainer(train_arr, test_arr))
+    # The training pipeline runs ingestion, transformation and training, skipping stages that are up to date
+    from src.pipeline.train_pipeline import TrainPipeline
+    print(TrainPipeline().run())
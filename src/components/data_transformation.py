@@ -6,6 +6,7 @@ from dataclasses import dataclass  # To help create a simple configuration class
 # Import tools for data processing and machine learning
 import numpy as np  # To handle numbers and data in arrays
 import pandas as pd  # To work with data in tables (like an Excel sheet)
+from scipy import sparse  # To keep mostly-zero data small (sparse matrices)
 from sklearn.compose import ColumnTransformer  # To apply changes to specific columns
 from sklearn.impute import SimpleImputer  # To fill missing values in the data
 from sklearn.pipeline import Pipeline  # To organize the steps we need to take for data
@@ -15,13 +16,17 @@ from sklearn.preprocessing import OneHotEncoder, StandardScaler  # For convertin
 from src.exception import CustomException  # Special error handling
 from src.logger import logging  # To log important messages for tracking
 
-# Utility function to save files (used later)
-from src.utils import save_object
+# Utility functions to save files and read saved data (used later)
+from src.utils import save_object, load_table, save_matrix
+from src.pipeline.input_schema import InputSchemaConfig, export_input_schema  # Describes the inputs serving accepts
 
 # This class holds the file path for saving the preprocessor (transformer)
 @dataclass
 class DataTransformationConfig:
     preprocessor_obj_file_path = os.path.join('artifacts', "preprocessor.pkl")  # Path to save the preprocessor
+    preprocessor_file_format = "joblib"  # File format for the preprocessor (arrays can be memory-mapped)
+    train_matrix_path = os.path.join('artifacts', "train_matrix")  # Folder to save the transformed training data
+    test_matrix_path = os.path.join('artifacts', "test_matrix")  # Folder to save the transformed test data
 
 # Main class that will handle data transformation (preparing the data for machine learning)
 class DataTransformation:
@@ -30,9 +35,10 @@ class DataTransformation:
         self.data_transformation_config = DataTransformationConfig()
 
     # This function creates and returns an object that will do all the data changes (transformations)
-    def get_data_transformation_object(self):
+    def get_data_transformation_object(self, sparse_output=True):
         '''
         This function sets up how to transform the data. It changes numerical and text data in different ways.
+        With sparse_output=True the result is a sparse (CSR) matrix, which only stores the non-zero values.
         '''
         try:
             # These are the columns (or features) we will treat as numbers or text
@@ -62,7 +68,7 @@ class DataTransformation:
             cat_pipeline = Pipeline(
                 steps=[
                     ("imputer", SimpleImputer(strategy="most_frequent")),  # Fill missing text with the most common value
-                    ("one_hot_encoder", OneHotEncoder()),  # Convert text categories to numbers
+                    ("one_hot_encoder", OneHotEncoder(handle_unknown="ignore")),  # Convert text categories to numbers (unseen ones become all zeros)
                     ("scaler", StandardScaler(with_mean=False))  # Scale the data
                 ]
             )
@@ -76,7 +82,8 @@ class DataTransformation:
                 [
                     ("num_pipeline", num_pipeline, numerical_columns),  # Apply the numerical pipeline to numerical columns
                     ("cat_pipeline", cat_pipeline, categorical_columns)  # Apply the categorical pipeline to text columns
-                ]
+                ],
+                sparse_threshold=1.0 if sparse_output else 0.0,  # Keep the one-hot output sparse (or always dense)
             )
 
             # Return the combined transformation object that does all the work
@@ -86,12 +93,57 @@ class DataTransformation:
             # If anything goes wrong, show an error message
             raise CustomException(e, sys)
 
+    # This function updates a fitted preprocessor with newly arrived records instead of fitting it again:
+    # the imputers take the median / most common value of all training data (old and new), and the
+    # scalers add the new rows to their running mean and variance (partial_fit)
+    def update_transformation_object(self, preprocessor, train_df, new_df):
+        try:
+            for name, pipeline, columns in preprocessor.transformers_:
+                if name not in ("num_pipeline", "cat_pipeline"):
+                    continue
+                imputer = pipeline.named_steps["imputer"]
+                all_values = train_df[columns]
+                if imputer.strategy == "median":
+                    imputer.statistics_ = np.nanmedian(all_values.to_numpy(dtype=float), axis=0)
+                else:
+                    imputer.statistics_ = np.array(
+                        [all_values[column].astype(object).mode().iloc[0] for column in columns], dtype=object
+                    )
+
+                # Run the new rows through every step before the scaler, then add them to the scaler's statistics
+                new_values = new_df[columns]
+                for step_name, step in pipeline.steps[:-1]:
+                    new_values = step.transform(new_values)
+                pipeline.named_steps["scaler"].partial_fit(new_values)
+
+            logging.info(f"Preprocessor updated with {len(new_df)} new records")
+            return preprocessor
+
+        except Exception as e:
+            # If something goes wrong, show an error message
+            raise CustomException(e, sys)
+
+    # This function reads a data split saved by DataIngestion: a binary column folder or a CSV file
+    @staticmethod
+    def read_data(path):
+        if os.path.isdir(path):
+            return load_table(path)
+        return pd.read_csv(path)
+
+    # This function adds the target as the last column, keeping a sparse matrix sparse
+    @staticmethod
+    def combine_features_and_target(features, target):
+        target = np.array(target, dtype=float).reshape(-1, 1)
+        if sparse.issparse(features):
+            return sparse.hstack([features, target], format="csr")
+        return np.c_[features, target]
+
     # This function applies the transformations (changes) to both the training and testing data
     def initiate_data_transformation(self, train_path, test_path):
         try:
-            # Read the training and testing data from CSV files (like Excel files)
-            train_df = pd.read_csv(train_path)  # Read the training data
-            test_df = pd.read_csv(test_path)  # Read the testing data
+            # Read the training and testing data (binary column folders, or CSV files like Excel files)
+            train_df = self.read_data(train_path)  # Read the training data
+            test_df = self.read_data(test_path)  # Read the testing data
 
             logging.info("Reading train and test data completed.")
 
@@ -116,16 +168,28 @@ class DataTransformation:
             input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)  # Apply to train data
             input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)  # Apply to test data
 
+            # Save the transformed data so the model trainer can memory-map it instead of transforming again
+            save_matrix(self.data_transformation_config.train_matrix_path, input_feature_train_arr, target_feature_train_df)
+            save_matrix(self.data_transformation_config.test_matrix_path, input_feature_test_arr, target_feature_test_df)
+
             # Combine the transformed features (input data) with the target (math score) for both training and testing
-            train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]  # Combine for train data
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]  # Combine for test data
+            train_arr = self.combine_features_and_target(input_feature_train_arr, target_feature_train_df)  # Combine for train data
+            test_arr = self.combine_features_and_target(input_feature_test_arr, target_feature_test_df)  # Combine for test data
 
             logging.info("Saving preprocessing object.")
 
             # Save the transformation object for later use (so we don't have to create it again)
             save_object(
                 file_path=self.data_transformation_config.preprocessor_obj_file_path,
-                obj=preprocessing_obj
+                obj=preprocessing_obj,
+                file_format=self.data_transformation_config.preprocessor_file_format,
+            )
+
+            # Save the categories and number ranges the preprocessor was fitted on, so serving can check inputs
+            export_input_schema(
+                preprocessing_obj,
+                train_df,
+                InputSchemaConfig(preprocessor_file_path=self.data_transformation_config.preprocessor_obj_file_path),
             )
 
             # Return the transformed data and where we saved the transformation object
@@ -0,0 +1,124 @@
+# Import tools needed for number crunching and error tracking
+import sys  # Helps in handling errors and system-related operations
+
+import numpy as np  # Fast math on arrays of numbers
+from sklearn.base import BaseEstimator, RegressorMixin, clone  # Makes the ensemble behave like any sklearn model
+from sklearn.linear_model import LinearRegression  # The blender: non-negative weights plus an intercept
+from sklearn.metrics import r2_score  # Checks how well the blend predicts
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+
+
+# A weighted blend of already-trained models, saved and served as one model.
+# predict() runs every member once on the whole batch and combines the answers with one dot product,
+# so a micro-batch of requests costs one call per member, not one per request.
+class BlendedEnsemble(RegressorMixin, BaseEstimator):
+    def __init__(self, members=None, weights=None, intercept=0.0):
+        self.members = members  # List of (name, trained model) pairs
+        self.weights = weights  # One weight per member
+        self.intercept = intercept  # Added to every prediction
+
+    # Names of the members, in order
+    @property
+    def member_names(self):
+        return [name for name, _ in self.members]
+
+    # Every member's predictions for the batch, one column per member
+    def member_predictions(self, X):
+        return np.column_stack([np.asarray(model.predict(X), dtype=float).ravel() for _, model in self.members])
+
+    # Predict for a batch: the weighted sum of the members' predictions
+    def predict(self, X):
+        return self.intercept + self.member_predictions(X) @ np.asarray(self.weights, dtype=float)
+
+    # Retrain every member with its own settings on new data, keeping the blend weights
+    def fit(self, X, y):
+        self.members = [(name, clone(model).fit(X, y)) for name, model in self.members]
+        return self
+
+
+# Fit the blender on out-of-fold predictions (one column per member) and return (weights, intercept, r2).
+# The weights cannot be negative, so a member can only help the blend or be switched off (weight 0).
+def fit_blender(oof_matrix, y):
+    blender = LinearRegression(positive=True).fit(oof_matrix, y)
+    return blender.coef_, float(blender.intercept_), float(r2_score(y, blender.predict(oof_matrix)))
+
+
+# Choose the members and weights of the blend from out-of-fold predictions:
+#   1. fit the blender on every candidate and drop the ones it gives no weight to,
+#   2. while the members' single-row latencies add up to more than max_single_row_ms, drop the member that
+#      loses the least r2 for each millisecond it saves,
+#   3. then keep dropping the member that loses the least r2 while that loss is below min_gain.
+# Pruning always stops at one member. Returns (names, weights, intercept, out-of-fold r2, steps), or None if
+# no member gets a weight above zero or no blend fits inside the budget.
+def prune_members(oof_predictions, y, latency_ms, max_single_row_ms=None, min_gain=0.001):
+    names = list(oof_predictions)
+    steps = []
+
+    def blend(members):
+        return fit_blender(np.column_stack([oof_predictions[name] for name in members]), y)
+
+    weights, intercept, score = blend(names)
+    names = [name for name, weight in zip(names, weights) if weight > 0]
+    if not names:
+        # The blender gave every model zero weight (it predicts the average), so there is nothing to blend
+        return None
+    steps.append({"members": list(names), "oof_r2": score, "reason": "blender weight above zero"})
+    weights, intercept, score = blend(names)
+
+    while len(names) > 1:
+        latency = sum(latency_ms[name] for name in names)
+        over_budget = max_single_row_ms is not None and latency > max_single_row_ms
+
+        # r2 lost by dropping each member (scaled by the time it saves when over the latency budget)
+        losses = {}
+        for name in names:
+            loss = score - blend([other for other in names if other != name])[2]
+            losses[name] = loss / max(latency_ms[name], 1e-9) if over_budget else loss
+        drop = min(losses, key=losses.get)
+        if not over_budget and losses[drop] >= min_gain:
+            break
+
+        names.remove(drop)
+        weights, intercept, score = blend(names)
+        steps.append({
+            "dropped": drop, "members": list(names), "oof_r2": score,
+            "reason": "over the latency budget" if over_budget else "gain below min_gain",
+        })
+
+    if max_single_row_ms is not None and sum(latency_ms[name] for name in names) > max_single_row_ms:
+        return None
+    return names, weights, intercept, score, steps
+
+
+# Build the blended ensemble from the trained models and their out-of-fold predictions.
+# Returns (ensemble, report), or (None, report) when no blend can be built (see prune_members).
+def build_ensemble(models, oof_predictions, y_train, latency_ms, max_single_row_ms=None, min_gain=0.001):
+    try:
+        y_train = np.asarray(y_train, dtype=float)
+        result = prune_members(oof_predictions, y_train, latency_ms, max_single_row_ms, min_gain)
+        if result is None:
+            logging.info("No blend of the models has a member with a weight above zero inside the latency budget")
+            return None, {"reason": "no member has a weight above zero, or no blend fits inside the latency budget"}
+
+        names, weights, intercept, oof_r2, steps = result
+        ensemble = BlendedEnsemble(
+            members=[(name, models[name]) for name in names],
+            weights=[float(weight) for weight in weights],
+            intercept=intercept,
+        )
+        report = {
+            "members": names,
+            "weights": dict(zip(names, ensemble.weights)),
+            "intercept": intercept,
+            "oof_r2": oof_r2,
+            "expected_single_row_ms": sum(latency_ms[name] for name in names),
+            "pruning_steps": steps,
+        }
+        logging.info(f"Blended ensemble of {names} (out-of-fold r2 {oof_r2:.4f})")
+        return ensemble, report
+
+    except Exception as e:
+        # Raise a custom error if something goes wrong
+        raise CustomException(e, sys)
@@ -1,40 +1,225 @@
 # Import tools needed for working with files and machine learning
 import os  # Helps us save files
 import sys  # Helps us manage errors
+import json  # Saves the training report
+import time  # Measures how long training takes
 from dataclasses import dataclass  # Helps us set up simple settings
 
-# Import different types of models to test and see which one works best
-from catboost import CatBoostRegressor
-from sklearn.ensemble import (
-    AdaBoostRegressor,
-    GradientBoostingRegressor,
-    RandomForestRegressor,
-)
-from sklearn.linear_model import LinearRegression  # A basic model to predict numbers
-from sklearn.metrics import r2_score  # Checks how well the model predicts
-from sklearn.tree import DecisionTreeRegressor  # A model that makes decisions step by step
-from xgboost import XGBRegressor  # Another model that can work well for many problems
+# The model libraries (CatBoost, XGBoost, scikit-learn) and pandas are imported inside the methods that
+# train, so importing this module (for example to read ModelTrainerConfig) stays fast
 
 # Import custom tools to handle errors and keep track of program actions (logging)
 from src.exception import CustomException  # For handling special errors
 from src.logger import logging  # To keep a record of important actions
 
 # Import helper tools to save models and check how well they work
-from src.utils import save_object, evaluate_models
+from src.utils import save_object, evaluate_models, load_matrix
 
 # This part sets where to save the best model
 @dataclass
 class ModelTrainerConfig:
     trained_model_file_path = os.path.join("artifacts", "model.pkl")  # Folder to save the best model
+    model_file_format: str = "auto"  # File format for the best model ("auto": native for XGBoost/CatBoost, else joblib)
+    search_cache_dir: str = os.path.join("artifacts", "search_cache")  # Folder to keep finished searches
+    n_jobs: int = -1  # Number of CPU cores used by the searches (-1 uses all of them)
+    search_strategy: str = "grid"  # "grid" (try everything), "halving" (successive halving) or "random"
+    n_iter: int = 10  # Most settings tried per model by the "random" strategy
+    time_budget: float = None  # Seconds the "random" strategy may spend on all models together (None = no limit)
+    early_stopping_rounds: int = 10  # Boosting rounds without improvement before a booster stops
+    validation_fraction: float = 0.1  # Part of the training data held back for early stopping
+    training_report_file_path: str = os.path.join("artifacts", "training_report.json")  # Timings, sizes and scores
+    tradeoff_table_file_path: str = os.path.join("artifacts", "model_tradeoffs.csv")  # Score vs. cost of every model
+    oof_predictions_file_path: str = os.path.join("artifacts", "oof_predictions.npz")  # Out-of-fold predictions per model
+    cv_folds: int = 3  # Cross-validation folds, shared by every model's search
+    selection_policy: str = "best_r2"  # "best_r2", or "smallest_within_epsilon" (smallest model close to the best score)
+    r2_epsilon: float = 0.01  # How much r2 "smallest_within_epsilon" may give up for a smaller model
+    max_single_row_ms: float = None  # Models slower than this for one row are not chosen (None = no limit)
+    max_batch_ms_per_row: float = None  # Models slower than this per row in a batch are not chosen
+    max_size_bytes: int = None  # Models bigger than this on disk are not chosen
+    min_r2: float = 0.6  # Models scoring below this are never chosen
+    build_ensemble: bool = False  # Also blend the searched models into one ensemble, chosen like any other model
+    ensemble_max_single_row_ms: float = None  # Latency budget for the ensemble's members (None = max_single_row_ms)
+    ensemble_min_gain: float = 0.001  # Out-of-fold r2 a member must add to stay in the ensemble
 
 # Main class that finds the best model
 class ModelTrainer:
-    def __init__(self):
-        # Set up the path for saving the model
-        self.model_trainer_config = ModelTrainerConfig()
+    def __init__(self, config: ModelTrainerConfig = None):
+        # Set up the path for saving the model (and how to search for it)
+        self.model_trainer_config = config or ModelTrainerConfig()
+
+    # Let the boosting models stop by themselves when a held-back validation set stops improving.
+    # The number of rounds is no longer searched: the largest value is used as the upper limit.
+    def apply_early_stopping(self, models, params, X_val, y_val):
+        rounds = self.model_trainer_config.early_stopping_rounds
+        fit_params = {}
+
+        # XGBoost checks the validation set after every round
+        models["XGBRegressor"].set_params(early_stopping_rounds=rounds)
+        params["XGBRegressor"]["n_estimators"] = [max(params["XGBRegressor"]["n_estimators"])]
+        fit_params["XGBRegressor"] = {"eval_set": [(X_val, y_val)], "verbose": False}
+
+        # CatBoost does the same and keeps the best iteration
+        params["CatBoosting Regressor"]["iterations"] = [max(params["CatBoosting Regressor"]["iterations"])]
+        fit_params["CatBoosting Regressor"] = {"eval_set": (X_val, y_val), "early_stopping_rounds": rounds}
+
+        # Gradient Boosting holds back its own validation part of the data
+        models["Gradient Boosting"].set_params(
+            n_iter_no_change=rounds, validation_fraction=self.model_trainer_config.validation_fraction
+        )
+        params["Gradient Boosting"]["n_estimators"] = [max(params["Gradient Boosting"]["n_estimators"])]
+
+        return fit_params
+
+    # Continue training a saved model on new data instead of searching again from scratch:
+    #   boosting models (XGBoost, CatBoost, Gradient Boosting) add extra_rounds more rounds,
+    #   Random Forest adds extra_rounds more trees, models with partial_fit learn from the new rows only,
+    #   the rest (Linear Regression, Decision Tree, AdaBoost) are refit with the same settings,
+    #   and a blended ensemble updates each of its members this way, keeping the blend weights.
+    # Returns the updated model and the method used.
+    def warm_start_model(self, model, X_train, y_train, X_new, y_new, extra_rounds=20):
+        from sklearn.base import clone  # Makes a fresh, untrained copy of a model
+
+        try:
+            module, name = type(model).__module__, type(model).__name__
+            if name == "BlendedEnsemble":
+                model.members = [
+                    (member_name, self.warm_start_model(member, X_train, y_train, X_new, y_new, extra_rounds)[0])
+                    for member_name, member in model.members
+                ]
+                return model, "members_updated"
+
+            if module.startswith("xgboost"):
+                from xgboost import XGBRegressor
+
+                params = {**model.get_params(), "n_estimators": extra_rounds, "early_stopping_rounds": None}
+                updated = XGBRegressor(**params)
+                updated.fit(X_train, y_train, xgb_model=model.get_booster(), verbose=False)
+                return updated, "extra_boosting_rounds"
+
+            if module.startswith("catboost"):
+                from catboost import CatBoostRegressor
+
+                params = {**model.get_params(), "iterations": extra_rounds, "verbose": False}
+                updated = CatBoostRegressor(**params)
+                updated.fit(X_train, y_train, init_model=model)
+                return updated, "extra_boosting_rounds"
+
+            if name == "GradientBoostingRegressor":
+                model.set_params(warm_start=True, n_iter_no_change=None, n_estimators=model.n_estimators_ + extra_rounds)
+                model.fit(X_train, y_train)
+                return model, "extra_boosting_rounds"
+
+            if name == "RandomForestRegressor":
+                model.set_params(warm_start=True, n_estimators=len(model.estimators_) + extra_rounds)
+                model.fit(X_train, y_train)
+                return model, "extra_trees"
+
+            if hasattr(model, "partial_fit"):
+                model.partial_fit(X_new, y_new)
+                return model, "partial_fit"
+
+            # No way to continue training: refit the same settings (cheap for these models)
+            return clone(model).fit(X_train, y_train), "refit"
+
+        except Exception as e:
+            # If any error happens, raise a custom error message
+            raise CustomException(e, sys)
+
+    # Blend the searched models into one ensemble, using the out-of-fold predictions the searches already made
+    # (no model is trained again). Members are dropped greedily until their summed single-row latency fits the
+    # budget and each remaining one adds at least ensemble_min_gain. Returns the ensemble and its details
+    # (measured like the other models), or (None, None) when no blend fits inside the budget.
+    def build_blended_ensemble(self, models, model_details, oof_predictions, y_train, X_train, X_test, y_test):
+        from sklearn.metrics import r2_score  # Checks how well the ensemble predicts
+        from src.components.model_ensemble import build_ensemble  # The blender and the member pruning
+        from src.utils import measure_predict_latency, model_size_bytes, peak_memory_mb
+
+        config = self.model_trainer_config
+        budget = config.ensemble_max_single_row_ms
+        if budget is None:
+            budget = config.max_single_row_ms
+        latency_ms = {name: details["single_row_ms"] for name, details in model_details.items()}
+        ensemble, report = build_ensemble(
+            models, oof_predictions, y_train, latency_ms, max_single_row_ms=budget, min_gain=config.ensemble_min_gain
+        )
+        if ensemble is None:
+            return None, None
+
+        details = {
+            **report,
+            "train_r2": float(r2_score(y_train, ensemble.predict(X_train))),
+            "test_r2": float(r2_score(y_test, ensemble.predict(X_test))),
+            "cv_r2": report["oof_r2"],
+            **measure_predict_latency(ensemble, X_test),
+            "size_bytes": model_size_bytes(ensemble),
+            "peak_memory_mb": peak_memory_mb(),
+        }
+        return ensemble, details
+
+    # Write the training report (one entry per model) as JSON
+    def save_training_report(self, report):
+        report_path = self.model_trainer_config.training_report_file_path
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, "w") as file_obj:
+            json.dump(report, file_obj, indent=2)
+        logging.info(f"Training report saved to {report_path}")
+
+    # Pick the model to save from the measured scores, speeds and sizes.
+    # Returns its name and a table comparing every model (which ones fit the limits and which was chosen).
+    def select_model(self, model_details):
+        import pandas as pd  # Builds the table comparing the models
+
+        config = self.model_trainer_config
+        table = pd.DataFrame(
+            [
+                {
+                    "model": name,
+                    "test_r2": details["test_r2"],
+                    "cv_r2": details.get("cv_r2"),
+                    "train_r2": details["train_r2"],
+                    "single_row_ms": details["single_row_ms"],
+                    "batch_ms_per_row": details["batch_ms_per_row"],
+                    "size_bytes": details["size_bytes"],
+                }
+                for name, details in model_details.items()
+            ]
+        )
+
+        # Models that are good enough and fit inside the speed and size limits
+        table["within_budget"] = table["test_r2"] >= config.min_r2
+        limits = {
+            "single_row_ms": config.max_single_row_ms,
+            "batch_ms_per_row": config.max_batch_ms_per_row,
+            "size_bytes": config.max_size_bytes,
+        }
+        for column, limit in limits.items():
+            if limit is not None:
+                table["within_budget"] &= table[column] <= limit
+        candidates = table[table["within_budget"]]
+        if candidates.empty:
+            raise ValueError("No suitable model found with the required performance and budget.")
+
+        # Models close enough to the best allowed score
+        best_r2 = candidates["test_r2"].max()
+        epsilon = config.r2_epsilon if config.selection_policy == "smallest_within_epsilon" else 0.0
+        table["within_epsilon"] = table["within_budget"] & (table["test_r2"] >= best_r2 - epsilon)
+
+        if config.selection_policy == "best_r2":
+            chosen = candidates.loc[candidates["test_r2"].idxmax(), "model"]
+        elif config.selection_policy == "smallest_within_epsilon":
+            # The smallest of them; equal sizes are decided by the faster single-row prediction
+            close = table[table["within_epsilon"]].sort_values(["size_bytes", "single_row_ms"])
+            chosen = close.iloc[0]["model"]
+        else:
+            raise ValueError(f"Unknown selection policy: {config.selection_policy}")
+
+        table["selected"] = table["model"] == chosen
+        return chosen, table.sort_values("test_r2", ascending=False)
 
     # This function will train models and find the best one
     def initiate_model_trainer(self, train_array, test_array):
+        from scipy.sparse import issparse  # Checks if the data is a sparse matrix
+
         try:
             # Record that we’re starting to split data into parts
             logging.info("Splitting data into training and testing parts")
@@ -48,6 +233,45 @@ class ModelTrainer:
                 test_array[:, -1]     # Target values for testing
             )
 
+            # A sparse matrix gives the target back as a sparse column, so turn it into a plain array
+            if issparse(y_train):
+                y_train, y_test = y_train.toarray().ravel(), y_test.toarray().ravel()
+            return self.train_models(X_train, y_train, X_test, y_test)
+
+        except Exception as e:
+            # If any error happens, raise a custom error message
+            raise CustomException(e, sys)
+
+    # This function trains on the matrices saved by DataTransformation, memory-mapped instead of copied
+    def initiate_model_trainer_from_files(self, train_matrix_path, test_matrix_path):
+        try:
+            logging.info("Loading the transformed training and testing data")
+            X_train, y_train = load_matrix(train_matrix_path)
+            X_test, y_test = load_matrix(test_matrix_path)
+            return self.train_models(X_train, y_train, X_test, y_test)
+
+        except Exception as e:
+            # If any error happens, raise a custom error message
+            raise CustomException(e, sys)
+
+    # This function searches every model on the given data, saves the best one and returns its test score
+    def train_models(self, X_train, y_train, X_test, y_test):
+        # Import different types of models to test and see which one works best
+        from catboost import CatBoostRegressor
+        from sklearn.ensemble import (
+            AdaBoostRegressor,
+            GradientBoostingRegressor,
+            RandomForestRegressor,
+        )
+        from sklearn.linear_model import LinearRegression  # A basic model to predict numbers
+        from sklearn.metrics import r2_score  # Checks how well the model predicts
+        from sklearn.model_selection import train_test_split  # Holds back a validation set for early stopping
+        from sklearn.tree import DecisionTreeRegressor  # A model that makes decisions step by step
+        from xgboost import XGBRegressor  # Another model that can work well for many problems
+        import numpy as np  # Saves the out-of-fold predictions
+
+        try:
+
             # Set up different models to try out
             models = {
                 "Random Forest": RandomForestRegressor(),  # Uses multiple trees to make decisions
@@ -88,31 +312,76 @@ class ModelTrainer:
                 }
             }
 
-            # This function tries each model and returns their scores (how well they work)
+            # The faster strategies use early stopping, which needs a validation set held back from training
+            config = self.model_trainer_config
+            fit_params = {}
+            if config.search_strategy != "grid":
+                X_train, X_val, y_train, y_val = train_test_split(
+                    X_train, y_train, test_size=config.validation_fraction, random_state=42
+                )
+                fit_params = self.apply_early_stopping(models, params, X_val, y_val)
+            logging.info(f"Searching models with the {config.search_strategy} strategy")
+
+            # This function tries each model and returns their scores (how well they work),
+            # filling model_details with the timings, sizes and scores of each one
+            training_start = time.monotonic()
+            model_details = {}
+            oof_predictions = {}
             model_report: dict = evaluate_models(
                 X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test,
-                models=models, param=params
+                models=models, param=params,
+                n_jobs=config.n_jobs,
+                cache_dir=config.search_cache_dir,
+                cv=config.cv_folds,
+                search=config.search_strategy,
+                n_iter=config.n_iter,
+                time_budget=config.time_budget,
+                fit_params=fit_params,
+                details=model_details,
+                oof_predictions=oof_predictions,
             )
 
-            # Find the highest score and the model name for that score
-            best_model_score = max(model_report.values())  # Best score
-            best_model_name = list(model_report.keys())[list(model_report.values()).index(best_model_score)]  # Model name
-            best_model = models[best_model_name]  # Best model itself
+            # Keep every model's out-of-fold predictions (all made on the same folds) with the targets they predict
+            np.savez(config.oof_predictions_file_path, y_train=np.asarray(y_train, dtype=float), **oof_predictions)
+
+            # Optionally blend the models into one more candidate, compared with the single models on the test data
+            if config.build_ensemble:
+                ensemble, ensemble_details = self.build_blended_ensemble(
+                    models, model_details, oof_predictions, y_train, X_train, X_test, y_test
+                )
+                if ensemble is not None:
+                    models["Blended Ensemble"] = ensemble
+                    model_details["Blended Ensemble"] = ensemble_details
 
-            # If no model has a score over 0.6, show an error
-            if best_model_score < 0.6:
-                raise CustomException("No suitable model found with the required performance.")
-            logging.info("Best model chosen based on training and testing data")
+            # Choose the model using the selection policy (test score, speed and size)
+            best_model_name, tradeoffs = self.select_model(model_details)
+            best_model = models[best_model_name]  # Best model itself (already trained by evaluate_models)
+            tradeoffs.to_csv(config.tradeoff_table_file_path, index=False)
+            logging.info(f"Chose {best_model_name} with the {config.selection_policy} policy")
 
             # Save the best model to a file so it can be reused later
             save_object(
                 file_path=self.model_trainer_config.trained_model_file_path,
-                obj=best_model
+                obj=best_model,
+                file_format=self.model_trainer_config.model_file_format,
             )
 
             # Use the best model to make predictions on test data and calculate the accuracy score (R²)
             predicted = best_model.predict(X_test)  # Predictions on test data
             r2_square = r2_score(y_test, predicted)  # Check how close predictions are to real answers
+
+            # Save what every model cost to train and serve, so the choice can be reviewed later
+            self.save_training_report({
+                "search_strategy": config.search_strategy,
+                "training_time_s": time.monotonic() - training_start,
+                "n_train_rows": int(X_train.shape[0]),
+                "n_test_rows": int(X_test.shape[0]),
+                "n_features": int(X_train.shape[1]),
+                "best_model": best_model_name,
+                "selection_policy": config.selection_policy,
+                "best_test_r2": float(r2_square),
+                "models": model_details,
+            })
             return r2_square  # Return the accuracy score for the best model
 
         except Exception as e:
@@ -0,0 +1,178 @@
+# Import tools needed for timing, number crunching and error tracking.
+# scikit-learn and joblib are imported inside the functions that use them, like in src/utils.py.
+import sys  # Helps in handling errors and system-related operations
+import time  # Measures how long each fit takes
+
+import numpy as np  # Fast math on arrays of numbers
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+
+
+# Rows start..stop of a dense array or a CSR matrix, without copying the values.
+# (Slicing a CSR matrix with scipy copies its arrays, and so does building one from a small part of a big
+# array, so the parts are set on an empty matrix; only the small row-pointer array is rebuilt.)
+def _rows(X, start, stop):
+    if hasattr(X, "indptr"):
+        from scipy.sparse import csr_matrix  # Only needed for sparse matrices
+
+        first, last = X.indptr[start], X.indptr[stop]
+        view = csr_matrix((stop - start, X.shape[1]), dtype=X.dtype)
+        view.data, view.indices = X.data[first:last], X.indices[first:last]
+        view.indptr = X.indptr[start:stop + 1] - first
+        return view
+    return X[start:stop]
+
+
+# All rows except start..stop: the training rows of a fold. The first and last folds' training rows are one
+# unbroken slice, so they are views; for the folds in between the two parts are joined into one new matrix
+# inside the worker (the same copy GridSearchCV makes), which is freed once the fit is done.
+def _rows_except(X, start, stop):
+    n_rows = X.shape[0]
+    if start == 0 or stop == n_rows:
+        return _rows(X, stop, n_rows) if start == 0 else _rows(X, 0, start)
+    if hasattr(X, "indptr"):
+        from scipy.sparse import csr_matrix  # Only needed for sparse matrices
+
+        first, last = X.indptr[start], X.indptr[stop]
+        indptr = np.concatenate([X.indptr[:start + 1], X.indptr[stop + 1:] - (last - first)])
+        data = np.concatenate([X.data[:first], X.data[last:]])
+        indices = np.concatenate([X.indices[:first], X.indices[last:]])
+        return csr_matrix((data, indices, indptr), shape=(n_rows - (stop - start), X.shape[1]))
+    return np.concatenate([X[:start], X[stop:]])
+
+
+# Train one setting on one fold and score it on the fold's validation rows (runs in a joblib worker).
+# Returns (score, fit time, predictions, error): a setting that cannot be trained gets no score and the
+# error message instead, like GridSearchCV, and the search logs it.
+def _fit_and_score(model, params, X, y, start, stop, fit_params):
+    from sklearn.base import clone  # Makes a fresh, untrained copy of a model
+    from sklearn.metrics import r2_score  # The same score GridSearchCV uses for regressors
+
+    candidate = clone(model).set_params(**params)
+    fit_start = time.perf_counter()
+    try:
+        y_train = np.concatenate([y[:start], y[stop:]])
+        candidate.fit(_rows_except(X, start, stop), y_train, **fit_params)
+    except Exception as e:
+        return float("nan"), time.perf_counter() - fit_start, None, f"{type(e).__name__}: {e}"
+    fit_time = time.perf_counter() - fit_start
+    preds = np.asarray(candidate.predict(_rows(X, start, stop)), dtype=float).ravel()
+    return float(r2_score(y[start:stop], preds)), fit_time, preds, None
+
+
+# This class splits the training data into cross-validation folds once, and gives every model family
+# the same folds, so their scores can be compared directly.
+#
+# The folds are the same as sklearn's KFold(n_splits) without shuffling (the train/test split already shuffled
+# the rows): fold k's validation rows are rows start..stop and its training rows are all the others. The data
+# is kept once, as given, and every fit gets row ranges of it. With several processes joblib shares one
+# memory-mapped copy of the data instead of sending each fit its own copy of the rows. The memory map is
+# opened copy-on-write, because some models (CatBoost) write to the arrays they are given and fail on a
+# read-only buffer; a write only copies the pages it touches, in that worker.
+class FoldManager:
+    def __init__(self, X, y, n_splits=3):
+        try:
+            self.n_rows = X.shape[0]
+            self.n_splits = n_splits
+            if not 2 <= n_splits <= self.n_rows:
+                raise ValueError(f"Cannot make {n_splits} folds from {self.n_rows} rows")
+
+            # Same fold sizes as KFold: the first n_rows % n_splits folds get one extra row
+            sizes = np.full(n_splits, self.n_rows // n_splits)
+            sizes[: self.n_rows % n_splits] += 1
+            stops = np.cumsum(sizes)
+            self.bounds = [(int(stop - size), int(stop)) for size, stop in zip(sizes, stops)]
+
+            self.X = X.tocsr() if hasattr(X, "tocsr") else X  # (no copy when X is already CSR)
+            self.y = np.asarray(y, dtype=float)
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Short description of how the folds were made (part of the search cache key)
+    @property
+    def description(self):
+        return ("kfold_views", self.n_splits, self.n_rows)
+
+    # Fold k: (X_train, y_train, X_val, y_val); the validation rows are views
+    def fold(self, k):
+        start, stop = self.bounds[k]
+        y_train = np.concatenate([self.y[:start], self.y[stop:]])
+        return _rows_except(self.X, start, stop), y_train, _rows(self.X, start, stop), self.y[start:stop]
+
+    # The folds as (train row numbers, validation row numbers), in the form sklearn's cv= accepts
+    def splits(self):
+        return [
+            (np.r_[stop:self.n_rows, 0:start], np.arange(start, stop)) for start, stop in self.bounds
+        ]
+
+    # Train every setting on every fold and return the best setting, its mean score and a report.
+    # Settings are tried in order; with a deadline, they are tried one at a time and the search stops
+    # when the time is up (always after at least one). With keep_oof=True the report also holds the best
+    # setting's out-of-fold predictions (each row predicted by the model that did not see it), at no extra cost.
+    def search(self, model, candidates, fit_params=None, n_jobs=None, deadline=None, keep_oof=False):
+        from joblib import Parallel, delayed  # Runs the fits on several CPU cores
+
+        try:
+            fit_params = fit_params or {}
+            candidates = list(candidates) or [{}]
+            batches = [candidates] if deadline is None else [[params] for params in candidates]
+            best_score, best_params, best_fold_scores, oof = None, None, None, None
+            fit_times, n_tried, last_error = [], 0, None
+
+            for batch in batches:
+                results = Parallel(n_jobs=n_jobs, return_as="generator", mmap_mode="c")(
+                    delayed(_fit_and_score)(model, params, self.X, self.y, start, stop, fit_params)
+                    for params in batch
+                    for start, stop in self.bounds
+                )
+                # Results come back in order, so only one setting's predictions are held at a time
+                for params in batch:
+                    fold_results = [next(results) for _ in self.bounds]
+                    fold_scores = [score for score, _, _, _ in fold_results]
+                    fit_times.extend(fit_time for _, fit_time, _, _ in fold_results)
+                    n_tried += 1
+                    errors = [error for _, _, _, error in fold_results if error is not None]
+                    if errors:
+                        last_error = errors[0]
+                        logging.warning(f"Fit failed for {type(model).__name__} with {params}: {last_error}")
+                    score = float(np.mean(fold_scores))
+                    if not np.isnan(score) and (best_score is None or score > best_score):
+                        best_score, best_params, best_fold_scores = score, params, fold_scores
+                        if keep_oof:
+                            oof = np.concatenate([preds for _, _, preds, _ in fold_results])
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+
+            if best_params is None:
+                raise ValueError(f"Every setting failed to train for {type(model).__name__}, last error: {last_error}")
+
+            report = {
+                "n_candidates": n_tried,
+                "n_fits": len(fit_times),
+                "mean_fit_time_s": float(np.mean(fit_times)),
+                "cv_r2": best_score,
+                "cv_r2_per_fold": best_fold_scores,
+            }
+            if keep_oof:
+                report["oof_predictions"] = oof
+            return best_params, report
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Out-of-fold predictions of one model with fixed settings: each row is predicted by the copy of the model
+    # trained on the other folds (used to compare or combine models without touching the test data)
+    def out_of_fold_predict(self, model, fit_params=None, n_jobs=None):
+        try:
+            params = model.get_params(deep=False)
+            _, report = self.search(model, [params], fit_params=fit_params, n_jobs=n_jobs, keep_oof=True)
+            logging.info(f"Out-of-fold r2 of {type(model).__name__}: {report['cv_r2']:.4f}")
+            return report["oof_predictions"]
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
@@ -0,0 +1,194 @@
+# Import tools needed for timing, thread safety and background logging
+import os  # Used to read settings from environment variables
+import time  # Measures how long each phase of a request takes
+import queue  # Hands log records to a background thread
+import atexit  # Writes the remaining log records when the program ends
+import random  # Decides which requests get logged (sampling)
+import bisect  # Finds the histogram bucket for a timing quickly
+import threading  # Lets many requests update the metrics safely at the same time
+from contextlib import contextmanager  # Lets us time a block of code with "with"
+from logging.handlers import QueueHandler, QueueListener  # Logging that does not wait for the disk
+
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+
+# Upper edges (in seconds) of the latency histogram buckets, from 50 microseconds to 10 seconds
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Part of requests whose details are written to the log (errors are always written)
+LOG_SAMPLE_RATE = float(os.environ.get("REQUEST_LOG_SAMPLE_RATE", "0.01"))
+
+
+# Counts how many timings fall into each bucket, plus their total, like a Prometheus histogram
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last bucket holds timings above the largest edge
+        self.count = 0
+        self.sum = 0.0
+
+    # Add one timing (the caller holds the lock)
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Estimate a percentile (0-100) from the buckets, returning the upper edge of the bucket it falls in
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        target, seen = self.count * q / 100, 0
+        for edge, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return edge
+        return float("inf")
+
+
+# Keeps every counter and histogram of this process in memory
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}  # (name, labels) -> number
+        self._collectors = []  # Functions that report values kept elsewhere (see add_collector)
+
+    # Record a timing in seconds, for example observe("prediction_phase_seconds", 0.002, phase="transform")
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    # Add to a counter, for example inc("prediction_requests_total", endpoint="/predictdata", status="200")
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    # Time the code inside a "with" block and record it in a histogram
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # Add a function whose values are read each time the metrics are rendered, for counters kept elsewhere
+    # (for example by the prediction cache). It returns a list of (name, type, labels, value), where type is
+    # "counter" or "gauge" and labels is a dictionary.
+    def add_collector(self, collect):
+        with self._lock:
+            self._collectors.append(collect)
+
+    # Forget every metric (used by benchmarks between runs)
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # A short summary (count, mean and estimated p50/p95/p99 in milliseconds) of every histogram
+    def summary(self):
+        with self._lock:
+            return {
+                _format_name(name, labels): {
+                    "count": histogram.count,
+                    "mean_ms": histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                    "p50_ms": histogram.percentile(50) * 1000,
+                    "p95_ms": histogram.percentile(95) * 1000,
+                    "p99_ms": histogram.percentile(99) * 1000,
+                }
+                for (name, labels), histogram in self._histograms.items()
+            }
+
+    # Every metric in the Prometheus text format, for the /metrics endpoint.
+    # Each worker process has its own metrics, so Prometheus should scrape every worker.
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            collected = [value for collect in self._collectors for value in collect()]
+            for name in sorted({name for name, _, _, _ in collected}):
+                values = [(kind, tuple(sorted(labels.items())), value) for n, kind, labels, value in collected if n == name]
+                lines.append(f"# TYPE {name} {values[0][0]}")
+                for _, labels, value in sorted(values):
+                    lines.append(f"{_format_name(name, labels)} {value}")
+
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (counter_name, labels), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{_format_name(name, labels)} {value}")
+
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (histogram_name, labels), histogram in sorted(self._histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for edge, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{_format_name(name + '_bucket', labels + (('le', repr(edge)),))} {cumulative}")
+                    lines.append(f"{_format_name(name + '_bucket', labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{_format_name(name + '_sum', labels)} {histogram.sum}")
+                    lines.append(f"{_format_name(name + '_count', labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Write a metric name with its labels, for example prediction_phase_seconds{phase="transform"}
+def _format_name(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+# The metrics shared by the whole process
+metrics = Metrics()
+
+# Request logs go through a queue to a background thread, so a request never waits for the log file
+request_logger = logging.getLogger("src.requests")
+request_logger.propagate = False
+_log_handler = QueueHandler(queue.SimpleQueue())
+request_logger.addHandler(_log_handler)
+_log_listener = None
+
+
+# Run a function in every child process right after fork(). Only the thread that called fork() exists in the
+# child, so whatever owns a background thread (the log listener here, the span exporter and the slow-request
+# profiler in src/tracing.py) restarts or resets it with this in each pre-forked worker.
+def after_fork(function):
+    if hasattr(os, "register_at_fork"):  # Not on Windows, which has no fork()
+        os.register_at_fork(after_in_child=function)
+
+
+# Start the background thread that writes the queued log records to the normal log handlers
+def _start_log_listener():
+    global _log_listener
+    _log_handler.queue = queue.SimpleQueue()
+    _log_listener = QueueListener(_log_handler.queue, *logging.getLogger().handlers, respect_handler_level=True)
+    _log_listener.start()
+
+
+# Write the records still in the queue and stop the background thread
+def _stop_log_listener():
+    if _log_listener is not None and _log_listener._thread is not None:
+        _log_listener.stop()
+
+
+_start_log_listener()
+atexit.register(_stop_log_listener)
+after_fork(_start_log_listener)  # Each worker writes its own request logs
+
+
+# Log a message for a sample of requests only (set REQUEST_LOG_SAMPLE_RATE=1 to log every request)
+def log_sampled(message, *args):
+    if LOG_SAMPLE_RATE >= 1 or random.random() < LOG_SAMPLE_RATE:
+        request_logger.info(message, *args)
+
+
+# Log an error; errors are never skipped by the sampling
+def log_error(message, *args):
+    request_logger.error(message, *args)
@@ -8,18 +8,24 @@ LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 # Create a path for the "logs" folder in the current working directory
 logs_dir = os.path.join(os.getcwd(), "logs")
 
-# Create the "logs" directory if it doesn't exist already (exist_ok=True avoids errors if it exists)
-os.makedirs(logs_dir, exist_ok=True)
-
 # Define the full path where the log file will be saved
 LOG_FILE_PATH = os.path.join(logs_dir, LOG_FILE)
 
+
+# A file handler that creates the "logs" folder and the log file only when the first message is written,
+# so importing this module (for example in the web app) has no side effects on the disk
+class LazyFileHandler(logging.FileHandler):
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)  # delay=True: do not open the file yet
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 # Configure the logging settings
 logging.basicConfig(
-    filename=LOG_FILE_PATH,  # Set the log file path
+    handlers=[LazyFileHandler(LOG_FILE_PATH)],  # Write to the log file (created on first use)
     format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",  # Define the log message format
     level=logging.INFO,  # Set the logging level to INFO (log INFO and above)
 )
-
-# Log a message to verify that logging is working
-logging.info("Logging has been configured successfully.")
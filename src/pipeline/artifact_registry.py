@@ -0,0 +1,163 @@
+# Import tools needed for file management, thread safety, timing and error tracking
+import os  # Helps with file paths and file information (like modification time)
+import sys  # Helps in handling errors and system-related operations
+import threading  # Lets many requests share the registry safely at the same time
+import time  # Measures how long loading takes
+from dataclasses import dataclass  # A simple way to create classes for storing settings
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.utils import load_object, hash_file  # Helpers to load saved objects and fingerprint files
+
+
+# This class holds the settings for where the artifacts live and how often to check them for changes
+@dataclass
+class ArtifactRegistryConfig:
+    model_file_path: str = os.path.join("artifacts", "model.pkl")  # Path to the trained model
+    preprocessor_file_path: str = os.path.join("artifacts", "preprocessor.pkl")  # Path to the preprocessor
+    compiled_scorer_file_path: str = os.path.join("artifacts", "compiled_scorer.pkl")  # Path to the compiled scorer
+    check_interval: float = 1.0  # Seconds between checks of the files on disk (0 checks on every call)
+
+
+# Stores one loaded artifact together with the file details it was loaded from
+@dataclass
+class _LoadedArtifact:
+    obj: object  # The loaded object (model or preprocessor)
+    mtime: float  # File modification time when it was loaded
+    size: int  # File size in bytes when it was loaded
+    digest: str  # SHA-256 fingerprint of the file contents
+
+
+# This class loads the model and preprocessor once and shares them across requests and threads
+class ArtifactRegistry:
+    def __init__(self, config: ArtifactRegistryConfig = None):
+        # Use the default settings if none are given
+        self.config = config or ArtifactRegistryConfig()
+        self._lock = threading.Lock()  # Makes sure only one thread loads a file at a time
+        self._artifacts = {}  # Loaded artifacts, keyed by file path
+        self._last_check = {}  # When each file was last checked on disk
+        self._version = 0  # Goes up by one every time an artifact is (re)loaded
+
+        # Counters that show how well the registry is working
+        self.cache_hits = 0  # Times an already-loaded artifact was reused
+        self.cache_misses = 0  # Times an artifact had to be read from disk
+        self.reloads = 0  # Times an artifact was reloaded because the file changed
+        self.load_time = 0.0  # Total seconds spent loading artifacts
+        self.last_load_time = {}  # Seconds spent on the latest load of each file
+
+    # Create a fingerprint (SHA-256 hash) of a file's contents
+    @staticmethod
+    def _file_digest(file_path):
+        return hash_file(file_path)
+
+    # Read an artifact from disk and remember the file details it came from
+    def _load(self, file_path, stat):
+        start = time.perf_counter()
+        digest = self._file_digest(file_path)
+        obj = load_object(file_path=file_path)
+        elapsed = time.perf_counter() - start
+
+        self.load_time += elapsed
+        self.last_load_time[file_path] = elapsed
+        self._version += 1
+        logging.info(f"Loaded artifact {file_path} in {elapsed:.4f}s")
+        return _LoadedArtifact(obj=obj, mtime=stat.st_mtime, size=stat.st_size, digest=digest)
+
+    # Return the loaded object for a file, reloading it only when the file has changed
+    def get(self, file_path):
+        try:
+            now = time.monotonic()
+            artifact = self._artifacts.get(file_path)
+
+            # Fast path: the artifact is loaded and was checked recently, so just reuse it
+            if artifact is not None and now - self._last_check.get(file_path, 0.0) < self.config.check_interval:
+                self.cache_hits += 1
+                return artifact.obj
+
+            with self._lock:
+                artifact = self._artifacts.get(file_path)
+                stat = os.stat(file_path)
+                self._last_check[file_path] = now
+
+                if artifact is None:
+                    # First use: load the artifact from disk
+                    self.cache_misses += 1
+                    self._artifacts[file_path] = self._load(file_path, stat)
+                elif stat.st_mtime != artifact.mtime or stat.st_size != artifact.size:
+                    # The file looks different, so compare contents before reloading
+                    if self._file_digest(file_path) != artifact.digest:
+                        self.cache_misses += 1
+                        self.reloads += 1
+                        logging.info(f"Artifact {file_path} changed on disk, reloading")
+                        self._artifacts[file_path] = self._load(file_path, stat)
+                    else:
+                        # Same contents (e.g. the file was touched), keep the loaded object
+                        self.cache_hits += 1
+                        artifact.mtime, artifact.size = stat.st_mtime, stat.st_size
+                else:
+                    self.cache_hits += 1
+
+                return self._artifacts[file_path].obj
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Return the trained model
+    def get_model(self):
+        return self.get(self.config.model_file_path)
+
+    # Return the fitted preprocessor
+    def get_preprocessor(self):
+        return self.get(self.config.preprocessor_file_path)
+
+    # Return the compiled scorer if one has been exported, otherwise None
+    def get_compiled_scorer(self):
+        if not os.path.exists(self.config.compiled_scorer_file_path):
+            return None
+        return self.get(self.config.compiled_scorer_file_path)
+
+    # Return the content fingerprint of a loaded artifact (None if it has not been loaded)
+    def digest(self, file_path):
+        artifact = self._artifacts.get(file_path)
+        return artifact.digest if artifact is not None else None
+
+    # Number that changes every time any artifact is (re)loaded, so callers can tell when to refresh
+    @property
+    def version(self):
+        return self._version
+
+    # Forget all loaded artifacts so the next call loads them from disk again
+    def clear(self):
+        with self._lock:
+            self._artifacts.clear()
+            self._last_check.clear()
+            self._version += 1
+
+    # Return the counters as a dictionary (also shown on /metrics, see PredictPipeline.collect_metrics)
+    def stats(self):
+        total = self.cache_hits + self.cache_misses
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "hit_ratio": self.cache_hits / total if total else 0.0,
+            "reloads": self.reloads,
+            "load_time": self.load_time,
+            "last_load_time": dict(self.last_load_time),
+            "loaded": sorted(self._artifacts),
+        }
+
+
+# One registry shared by the whole process
+_registry = None
+_registry_lock = threading.Lock()
+
+
+# Return the registry shared by the whole process, creating it on first use
+def get_artifact_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ArtifactRegistry()
+    return _registry
@@ -0,0 +1,210 @@
+# Import tools needed for reading arguments, running work in parallel, and error tracking
+import os  # Helps with file and directory management
+import sys  # Helps in handling errors and system-related operations
+import argparse  # Reads the options given on the command line
+from collections import deque  # A simple waiting line for chunks being scored in other processes
+from concurrent.futures import ProcessPoolExecutor  # Runs chunks in several processes at once
+from dataclasses import dataclass  # A simple way to create classes for storing settings
+
+import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.pipeline.predict_pipeline import PredictPipeline, FEATURE_COLUMNS  # The model and its input columns
+
+
+# Settings for scoring a large file
+@dataclass
+class BatchPredictConfig:
+    chunk_size: int = 100_000  # Number of rows read and scored at a time
+    workers: int = 0  # Number of extra processes to use (0 scores in this process)
+    prediction_column: str = "predicted_math_score"  # Name of the column the predictions are written to
+    keep_columns: bool = True  # Also write the input columns next to the predictions
+    validate: bool = True  # Check rows against the input schema; bad rows get no prediction instead of failing the job
+    error_report_path: str = None  # CSV of the problems found, one line per row and field (default: <output>.errors.csv)
+
+
+# Each worker process keeps its own pipeline so artifacts are loaded once per process
+_worker_pipeline = None
+
+
+# Score one chunk of rows and return it with the prediction column added, plus the problems found in it
+# (row numbers count from row_offset, the position of the chunk's first row in the whole file)
+def _score_chunk(chunk, row_offset, prediction_column, keep_columns, validate=True):
+    global _worker_pipeline
+    if _worker_pipeline is None:
+        _worker_pipeline = PredictPipeline()
+
+    if validate:
+        # Rows that fail the checks get an empty prediction; the others are scored as usual
+        preds, errors = _worker_pipeline.predict_with_report(chunk, row_offset=row_offset)
+    else:
+        missing = [column for column in FEATURE_COLUMNS if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing columns: {missing}")
+        preds, errors = _worker_pipeline.predict(chunk[FEATURE_COLUMNS]), []
+
+    result = chunk if keep_columns else pd.DataFrame(index=chunk.index)
+    return result.assign(**{prediction_column: preds}), errors
+
+
+# Import pyarrow, which is only needed for Parquet files, with a clear message if it is not installed
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading or writing Parquet files needs pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+# Read a CSV or Parquet file one chunk at a time
+def _read_chunks(input_path, chunk_size):
+    if input_path.endswith(".parquet"):
+        _, pq = _import_pyarrow()
+        parquet_file = pq.ParquetFile(input_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_size)
+
+
+# Writes chunks to a CSV or Parquet file as they arrive, so the whole output is never held in memory
+class _ChunkWriter:
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self._parquet_writer = None
+        self._first = True
+
+    def write(self, chunk):
+        if self.output_path.endswith(".parquet"):
+            pa, pq = _import_pyarrow()
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            chunk.to_csv(self.output_path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+# Writes the per-row error report as problems are found; the file is only created if there is a problem
+class _ErrorWriter:
+    def __init__(self, report_path):
+        self.report_path = report_path
+        self.n_errors = 0  # Problems written (errors and warnings)
+        self.rejected_rows = 0  # Rows that got no prediction
+        if os.path.exists(report_path):
+            os.remove(report_path)  # Do not mix in the report of an earlier run
+
+    def write(self, errors):
+        if not errors:
+            return
+        pd.DataFrame(errors, columns=["row", "column", "value", "error", "severity"]).to_csv(
+            self.report_path, mode="a", header=self.n_errors == 0, index=False
+        )
+        self.n_errors += len(errors)
+        self.rejected_rows += len({entry["row"] for entry in errors if entry["severity"] == "error"})
+
+
+# This class scores a large CSV/Parquet file in fixed-size chunks and writes the predictions as it goes
+class BatchPredictor:
+    def __init__(self, config: BatchPredictConfig = None):
+        self.config = config or BatchPredictConfig()
+        self.rejected_rows = 0  # Rows of the last run that failed the input checks
+        self.error_report_path = None  # Where the last run's problems were written
+
+    # Score every row of input_path and write the results to output_path; returns the number of rows scored
+    def run(self, input_path, output_path):
+        try:
+            # Fail before anything is read or written if a Parquet file cannot be handled
+            if input_path.endswith(".parquet") or output_path.endswith(".parquet"):
+                _import_pyarrow()
+
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+
+            config = self.config
+            writer = _ChunkWriter(output_path)
+            error_writer = _ErrorWriter(config.error_report_path or output_path + ".errors.csv")
+            n_rows = 0  # Rows written so far
+            n_submitted = 0  # Rows read so far (the row number of the next chunk's first row)
+            logging.info(f"Batch scoring {input_path} -> {output_path} (chunk_size={config.chunk_size}, workers={config.workers})")
+
+            # Write one scored chunk and its problems
+            def write(scored, errors):
+                nonlocal n_rows
+                writer.write(scored)
+                error_writer.write(errors)
+                n_rows += len(scored)
+
+            try:
+                if config.workers > 0:
+                    # Keep only a few chunks in flight so memory stays flat, and write them back in order
+                    with ProcessPoolExecutor(max_workers=config.workers) as executor:
+                        pending = deque()
+                        for chunk in _read_chunks(input_path, config.chunk_size):
+                            pending.append(executor.submit(
+                                _score_chunk, chunk, n_submitted, config.prediction_column, config.keep_columns,
+                                config.validate,
+                            ))
+                            n_submitted += len(chunk)
+                            if len(pending) >= 2 * config.workers:
+                                write(*pending.popleft().result())
+                        while pending:
+                            write(*pending.popleft().result())
+                else:
+                    for chunk in _read_chunks(input_path, config.chunk_size):
+                        write(*_score_chunk(
+                            chunk, n_submitted, config.prediction_column, config.keep_columns, config.validate
+                        ))
+                        n_submitted += len(chunk)
+            finally:
+                writer.close()
+
+            logging.info(f"Batch scoring finished: {n_rows} rows")
+            if error_writer.n_errors:
+                logging.info(
+                    f"{error_writer.rejected_rows} rows were rejected and {error_writer.n_errors} problems were "
+                    f"written to {error_writer.report_path}"
+                )
+            self.rejected_rows, self.error_report_path = error_writer.rejected_rows, error_writer.report_path
+            return n_rows
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+
+# Run this file directly to score a file from the command line, for example:
+#   python -m src.pipeline.batch_predict students.csv predictions.csv --chunk-size 50000 --workers 4
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of students in chunks.")
+    parser.add_argument("input_path", help="CSV or Parquet file with the student columns")
+    parser.add_argument("output_path", help="CSV or Parquet file to write the predictions to")
+    parser.add_argument("--chunk-size", type=int, default=BatchPredictConfig.chunk_size, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=BatchPredictConfig.workers, help="Extra processes (0 = none)")
+    parser.add_argument("--prediction-column", default=BatchPredictConfig.prediction_column)
+    parser.add_argument("--predictions-only", action="store_true", help="Write only the prediction column")
+    parser.add_argument("--no-validate", action="store_true", help="Skip the input checks (a bad row fails the job)")
+    parser.add_argument("--error-report", default=None, help="CSV for the per-row problems (default: <output>.errors.csv)")
+    args = parser.parse_args()
+
+    predictor = BatchPredictor(
+        BatchPredictConfig(
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            prediction_column=args.prediction_column,
+            keep_columns=not args.predictions_only,
+            validate=not args.no_validate,
+            error_report_path=args.error_report,
+        )
+    )
+    print(predictor.run(args.input_path, args.output_path))
+    if predictor.rejected_rows:
+        print(f"{predictor.rejected_rows} rows rejected, see {predictor.error_report_path}")
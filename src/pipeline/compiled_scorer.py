@@ -0,0 +1,377 @@
+# Import tools needed for file management, number crunching and error tracking
+import os  # Helps with file and directory management
+import sys  # Helps in handling errors and system-related operations
+from dataclasses import dataclass  # A simple way to create classes for storing settings
+
+import numpy as np  # Fast math on arrays of numbers
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.utils import save_object, load_object, hash_file  # Helpers to save, load and fingerprint files
+
+
+# Settings for where the compiled scorer is saved and how closely it must match the sklearn pipeline
+@dataclass
+class CompiledScorerConfig:
+    model_file_path: str = os.path.join("artifacts", "model.pkl")  # Path to the trained model
+    preprocessor_file_path: str = os.path.join("artifacts", "preprocessor.pkl")  # Path to the preprocessor
+    compiled_scorer_file_path: str = os.path.join("artifacts", "compiled_scorer.pkl")  # Where to save the scorer
+    parity_data_path: str = os.path.join("artifacts", "test.csv")  # Rows used to check the scorer
+    tolerance: float = 1e-3  # Largest allowed difference from the sklearn predictions
+
+
+# Return True for values that the numeric imputers treat as missing (None or NaN)
+def _is_missing(value):
+    return value is None or _is_nan(value)
+
+
+# Return True for values that the categorical imputers treat as missing: only NaN. SimpleImputer does not count
+# None in a text column as missing, so None reaches the OneHotEncoder as an unknown category.
+def _is_nan(value):
+    return isinstance(value, float) and value != value
+
+
+# This class scores students with plain NumPy, using numbers copied out of the fitted preprocessor and model
+class CompiledScorer:
+    sparse_output = False  # Scorers saved before this setting existed built dense matrices
+
+    def __init__(self, numerical, categorical, n_features, model=None, linear=None, source_digests=None,
+                 sparse_output=False):
+        # numerical: list of (column, fill value, mean, scale, feature index)
+        # categorical: list of (column, fill value, categories, scaled one-hot values, first feature index, ignore unknown)
+        self.numerical = numerical
+        self.categorical = categorical
+        self.n_features = n_features
+        self.sparse_output = sparse_output  # True when the preprocessor returns a sparse (CSR) matrix
+        self.model = model  # Set when the model is not linear and still has to be called
+        self.source_digests = source_digests or {}  # Fingerprints of the files this scorer was built from
+        self.columns = [column for column, *_ in numerical] + [column for column, *_ in categorical]
+
+        # Set when the model is linear: (intercept, weight per numeric column, contribution per category level,
+        # contribution of an unknown category per column)
+        self.intercept, self.numeric_weights, self.level_contributions, self.unknown_contributions = (
+            linear or (None, None, None, None)
+        )
+
+        # Dictionaries for the single-row path: category -> contribution to the prediction
+        self._level_lookup = None
+        if linear is not None:
+            self._level_lookup = [
+                dict(zip(entry[2].tolist(), contributions.tolist()))
+                for entry, contributions in zip(categorical, self.level_contributions)
+            ]
+
+    # True when the whole prediction is one dot product plus table lookups
+    @property
+    def is_linear(self):
+        return self.model is None
+
+    # Look up each category's position in the fitted categories, returning -1 for unknown ones
+    @staticmethod
+    def _category_codes(values, fill, categories, ignore_unknown, column):
+        values = np.asarray(values, dtype=object)
+        missing = np.array([_is_nan(value) for value in values], dtype=bool)
+        none = np.equal(values, None)
+        if missing.any() or none.any():
+            values = values.copy()
+            values[missing] = fill
+            values[none] = categories[0]  # Only so the text can be sorted; marked unknown below
+
+        codes = np.searchsorted(categories, values)
+        codes[codes >= len(categories)] = 0
+        unknown = (categories[codes] != values) | none
+        if unknown.any():
+            if not ignore_unknown:
+                raise ValueError(
+                    f"Found unknown categories {sorted(set(values[unknown].tolist()))} in column {column!r} during transform"
+                )
+            codes[unknown] = -1
+        return codes
+
+    # Turn numeric columns into filled float arrays
+    @staticmethod
+    def _numeric_values(values, fill):
+        values = np.asarray(values, dtype=float)
+        missing = np.isnan(values)
+        if missing.any():
+            values = values.copy()
+            values[missing] = fill
+        return values
+
+    # Build the same feature matrix as preprocessor.transform, without pandas or ColumnTransformer.
+    # When the preprocessor returns CSR, so does this, with the zeros left out exactly as ColumnTransformer
+    # leaves them out: tree models like XGBoost treat a left-out entry as missing, not as 0, so a dense
+    # matrix with the same numbers would give them different predictions.
+    def transform_columns(self, columns):
+        n_rows = len(columns[self.columns[0]])
+
+        # Every row has one value per numeric column and one per categorical column (its one-hot level),
+        # so the matrix is built as a (rows x slots) table of feature indices and values
+        n_slots = len(self.numerical) + len(self.categorical)
+        indices = np.zeros((n_rows, n_slots), dtype=np.int32)
+        data = np.zeros((n_rows, n_slots))
+        slot_starts = []
+
+        for slot, (column, fill, mean, scale, index) in enumerate(self.numerical):
+            indices[:, slot] = index
+            data[:, slot] = (self._numeric_values(columns[column], fill) - mean) / scale
+            slot_starts.append(index)
+
+        for slot, (column, fill, categories, values, start, ignore_unknown) in enumerate(
+            self.categorical, start=len(self.numerical)
+        ):
+            codes = self._category_codes(columns[column], fill, categories, ignore_unknown, column)
+            known = codes >= 0
+            indices[:, slot] = start + np.where(known, codes, 0)
+            data[:, slot] = np.where(known, values[codes], 0.0)  # An unknown category has no one-hot value
+            slot_starts.append(start)
+
+        # Put the slots in feature order, so every row's indices are sorted like sklearn's
+        order = np.argsort(slot_starts, kind="stable")
+        indices, data = indices[:, order], data[:, order]
+
+        if not self.sparse_output:
+            X = np.zeros((n_rows, self.n_features))
+            np.put_along_axis(X, indices, data, axis=1)
+            return X
+
+        from scipy import sparse  # Only needed for preprocessors that return sparse matrices
+
+        keep = data != 0
+        indptr = np.concatenate([[0], np.cumsum(keep.sum(axis=1))])
+        return sparse.csr_matrix((data[keep], indices[keep], indptr), shape=(n_rows, self.n_features))
+
+    # Predict for many rows given as a mapping of column name -> values (a DataFrame works too)
+    def predict_columns(self, columns):
+        try:
+            if not self.is_linear:
+                return self.model.predict(self.transform_columns(columns))
+
+            n_rows = len(columns[self.columns[0]])
+            preds = np.full(n_rows, self.intercept)
+
+            # Numeric columns: centred value times the model weight (already divided by the scale)
+            for (column, fill, mean, _, _), weight in zip(self.numerical, self.numeric_weights):
+                preds += (self._numeric_values(columns[column], fill) - mean) * weight
+
+            # Categorical columns: every level's contribution was worked out ahead of time
+            for (column, fill, categories, _, _, ignore_unknown), contributions, unknown in zip(
+                self.categorical, self.level_contributions, self.unknown_contributions
+            ):
+                codes = self._category_codes(columns[column], fill, categories, ignore_unknown, column)
+                preds += np.where(codes >= 0, contributions[codes], unknown)
+
+            return preds
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Predict for one student given as a dictionary, using plain Python numbers (the fastest path)
+    def predict_one(self, record):
+        try:
+            if not self.is_linear:
+                return float(self.predict_columns({column: [record[column]] for column in self.columns})[0])
+
+            pred = self.intercept
+            for (column, fill, mean, _, _), weight in zip(self.numerical, self.numeric_weights):
+                value = record[column]
+                if _is_missing(value):
+                    value = fill
+                pred += (float(value) - mean) * weight
+
+            for (column, fill, _, _, _, ignore_unknown), lookup, unknown in zip(
+                self.categorical, self._level_lookup, self.unknown_contributions
+            ):
+                value = record[column]
+                if _is_nan(value):
+                    value = fill
+                contribution = lookup.get(value)
+                if contribution is None:
+                    if not ignore_unknown:
+                        raise ValueError(f"Found unknown category {value!r} in column {column!r} during transform")
+                    contribution = unknown
+                pred += contribution
+
+            return pred
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+
+# Return the fitted steps of a Pipeline by type name, checking nothing unexpected is in it
+def _pipeline_steps(pipeline, allowed):
+    steps = {}
+    for name, step in pipeline.steps:
+        kind = type(step).__name__
+        if kind not in allowed:
+            raise ValueError(f"Cannot compile pipeline step {name!r} of type {kind}")
+        steps[kind] = step
+    return steps
+
+
+# Return a scaler's mean and scale as arrays, treating switched-off options as 0 and 1
+def _scaler_values(scaler, n_values):
+    if scaler is None:
+        return np.zeros(n_values), np.ones(n_values)
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_values)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_values)
+    return np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)
+
+
+# Turn a fitted preprocessor (and model) into a CompiledScorer, or raise ValueError if that is not possible
+def compile_scorer(preprocessor, model, source_digests=None):
+    if getattr(preprocessor, "remainder", "drop") != "drop":
+        raise ValueError("Cannot compile a ColumnTransformer that passes through remainder columns")
+
+    # A linear model's weights can be folded into the tables; anything else is called on the feature matrix
+    coef = getattr(model, "coef_", None)
+    is_linear = (
+        type(model).__module__.startswith("sklearn.linear_model")
+        and coef is not None
+        and np.ndim(coef) == 1
+    )
+
+    numerical, categorical = [], []
+    index = 0
+    for name, pipeline, columns in preprocessor.transformers_:
+        if name == "remainder" or pipeline == "drop":
+            continue
+        steps = _pipeline_steps(pipeline, {"SimpleImputer", "StandardScaler", "OneHotEncoder"})
+        imputer = steps.get("SimpleImputer")
+        encoder = steps.get("OneHotEncoder")
+        scaler = steps.get("StandardScaler")
+
+        if encoder is None:
+            # Numeric branch: fill missing values, then standardize
+            fills = imputer.statistics_ if imputer is not None else np.zeros(len(columns))
+            mean, scale = _scaler_values(scaler, len(columns))
+            for i, column in enumerate(columns):
+                numerical.append((column, float(fills[i]), float(mean[i]), float(scale[i]), index))
+                index += 1
+        else:
+            # Categorical branch: fill missing values, one-hot encode, then scale each one-hot column
+            if encoder.drop is not None or getattr(encoder, "infrequent_categories_", None) is not None:
+                raise ValueError("Cannot compile a OneHotEncoder that drops or groups categories")
+            ignore_unknown = encoder.handle_unknown != "error"
+            n_levels = sum(len(categories) for categories in encoder.categories_)
+            mean, scale = _scaler_values(scaler, n_levels)
+            if scaler is not None and scaler.with_mean:
+                raise ValueError("Cannot compile a centred scaler after a OneHotEncoder")
+            offset = 0
+            for i, column in enumerate(columns):
+                categories = np.asarray(encoder.categories_[i], dtype=object)
+                values = 1.0 / scale[offset:offset + len(categories)]
+                fill = imputer.statistics_[i] if imputer is not None else None
+                categorical.append((column, fill, categories, values, index, ignore_unknown))
+                index += len(categories)
+                offset += len(categories)
+
+    sparse_output = bool(getattr(preprocessor, "sparse_output_", False))  # Whether transform returns CSR
+    if is_linear:
+        if len(coef) != index:
+            raise ValueError("Model weights do not match the number of preprocessed features")
+        # Work in extended precision while folding, because a full one-hot encoding makes the linear
+        # weights collinear: the fitted intercept and category weights can be huge and cancel each other
+        coef = np.asarray(coef, dtype=np.longdouble)
+        intercept = np.longdouble(np.asarray(model.intercept_, dtype=float).reshape(-1)[0])
+
+        # Fold the numeric scaling into the weights: (x - mean) / scale * w == (x - mean) * (w / scale)
+        numeric_weights = [float(coef[position] / scale) for _, _, _, scale, position in numerical]
+
+        # Fold each category's scaled one-hot value into its weight, so a category is one table lookup.
+        # Every row has exactly one level per column, so moving each column's average contribution into
+        # the intercept keeps the answer the same while keeping the numbers small.
+        level_contributions, unknown_contributions = [], []
+        for _, _, _, values, start, _ in categorical:
+            contributions = values.astype(np.longdouble) * coef[start:start + len(values)]
+            shift = contributions.mean()
+            intercept += shift
+            level_contributions.append((contributions - shift).astype(float))
+            unknown_contributions.append(float(-shift))  # An unknown category adds nothing before the shift
+
+        linear = (float(intercept), numeric_weights, level_contributions, unknown_contributions)
+        return CompiledScorer(
+            numerical, categorical, index, linear=linear, source_digests=source_digests, sparse_output=sparse_output
+        )
+
+    return CompiledScorer(
+        numerical, categorical, index, model=model, source_digests=source_digests, sparse_output=sparse_output
+    )
+
+
+# Compare the compiled scorer with the sklearn pipeline (model.predict on preprocessor.transform) and return
+# (largest difference, allowed difference).
+# A full one-hot encoding makes a linear model's weights collinear, so its intercept and category weights can be
+# as large as 1e14 and cancel each other, and model.predict then rounds by about sqrt(number of terms) * eps *
+# (sum of the sizes of the terms). For linear models that rounding is added to the tolerance, so an ill-conditioned
+# model is still checked against sklearn, only as closely as sklearn itself can compute it.
+def check_parity(scorer, preprocessor, model, features, tolerance=1e-3):
+    X = preprocessor.transform(features)
+    expected = model.predict(X)
+    actual = scorer.predict_columns(features)
+    if not len(expected):
+        return 0.0, tolerance
+
+    allowed = tolerance
+    if scorer.is_linear:
+        X = np.abs(X.toarray() if hasattr(X, "toarray") else np.asarray(X, dtype=float))
+        intercept = abs(float(np.asarray(model.intercept_, dtype=float).reshape(-1)[0]))
+        magnitude = float(np.max(intercept + X @ np.abs(np.asarray(model.coef_, dtype=float))))
+        allowed += np.sqrt(X.shape[1] + 1) * np.finfo(float).eps * magnitude
+    return float(np.max(np.abs(expected - actual))), allowed
+
+
+# Make a small table of inputs that covers every known category and a spread of numbers around each
+# numeric column's mean (including the mean itself, which scales to exactly 0), for checking a scorer
+# when no saved rows are at hand
+def parity_rows(scorer, n_rows=32):
+    import pandas as pd  # Only needed to build the rows for preprocessor.transform
+
+    positions = np.arange(n_rows)
+    table = {}
+    for column, _, mean, scale, _ in scorer.numerical:
+        table[column] = mean + scale * np.linspace(-2.0, 2.0, n_rows)
+        table[column][n_rows // 2] = mean
+    for column, _, categories, _, _, _ in scorer.categorical:
+        table[column] = categories[positions % len(categories)]
+    return pd.DataFrame(table)[scorer.columns]
+
+
+# Build the compiled scorer from the saved artifacts, check it against sklearn, and save it next to them
+def export_compiled_scorer(config: CompiledScorerConfig = None):
+    try:
+        import pandas as pd  # Only needed to read the rows used for the parity check
+
+        config = config or CompiledScorerConfig()
+        model = load_object(file_path=config.model_file_path)
+        preprocessor = load_object(file_path=config.preprocessor_file_path)
+        source_digests = {
+            config.model_file_path: hash_file(config.model_file_path),
+            config.preprocessor_file_path: hash_file(config.preprocessor_file_path),
+        }
+        scorer = compile_scorer(preprocessor, model, source_digests=source_digests)
+
+        # Make sure the compiled scorer gives the same answers as the sklearn pipeline
+        if os.path.exists(config.parity_data_path):
+            features = pd.read_csv(config.parity_data_path)[scorer.columns]
+            max_diff, allowed = check_parity(scorer, preprocessor, model, features, config.tolerance)
+            logging.info(f"Compiled scorer max difference from sklearn: {max_diff} (allowed {allowed})")
+            if allowed > 2 * config.tolerance:
+                logging.info("The linear model is ill-conditioned, so sklearn's own rounding widens the allowed difference")
+            if max_diff > allowed:
+                raise ValueError(f"Compiled scorer differs from sklearn by {max_diff} (allowed {allowed})")
+
+        save_object(file_path=config.compiled_scorer_file_path, obj=scorer)
+        logging.info(f"Saved compiled scorer (linear={scorer.is_linear}) to {config.compiled_scorer_file_path}")
+        return config.compiled_scorer_file_path
+
+    except Exception as e:
+        # Raise a custom error if something goes wrong
+        raise CustomException(e, sys)
+
+
+# Run this file directly to export the compiled scorer for the current artifacts
+if __name__ == "__main__":
+    print(export_compiled_scorer())
@@ -0,0 +1,263 @@
+# Import tools needed for file management, number crunching and error tracking.
+# Only NumPy is used here, so checking requests never loads pandas or scikit-learn.
+import os  # Helps with file and directory management
+import sys  # Helps in handling errors and system-related operations
+import json  # The schema is saved as a small, readable JSON file
+from dataclasses import dataclass, field  # A simple way to create classes for storing settings and results
+
+import numpy as np  # Fast math on arrays of numbers
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.utils import hash_file  # Fingerprints the preprocessor the schema was built from
+from src.pipeline.records import count_rows  # Works with DataFrames or plain columns
+
+# Marks a field that a record did not have at all (different from a field sent as null)
+MISSING_FIELD = object()
+
+
+# Settings for where the schema is saved and how strictly rows are checked
+@dataclass
+class InputSchemaConfig:
+    schema_file_path: str = os.path.join("artifacts", "input_schema.json")  # Where the schema is saved
+    preprocessor_file_path: str = os.path.join("artifacts", "preprocessor.pkl")  # The preprocessor it describes
+    allow_missing: bool = True  # Accept null/empty values (the preprocessor fills them in)
+    reject_out_of_range: bool = False  # Reject numbers outside the training range (otherwise only flag them)
+
+
+# The outcome of checking a batch: which rows can be scored, and one entry per problem found
+@dataclass
+class ValidationResult:
+    columns: dict  # Column name -> array of values (numbers already converted to floats)
+    valid: np.ndarray  # True for every row that can be scored
+    errors: list = field(default_factory=list)  # {"row", "column", "value", "error", "severity"} per problem
+
+    # Number of rows that were rejected
+    @property
+    def n_rejected(self):
+        return int(len(self.valid) - np.count_nonzero(self.valid))
+
+
+# Convert one value to a float, returning None when it is not a number
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Convert a whole object array to floats, with None for the values that are not numbers
+_to_float_array = np.frompyfunc(_to_float, 1, 1)
+
+
+# True for every value that is in the given set (NumPy runs the loop, so it is much faster than a Python loop)
+def _is_in(values, allowed):
+    try:
+        return np.frompyfunc(allowed.__contains__, 1, 1)(values).astype(bool)
+    except TypeError:
+        # An unhashable value (like a list sent in JSON) is never in the set
+        return np.array([isinstance(value, str) and value in allowed for value in values], dtype=bool)
+
+
+# Short, safe text version of a value for the error report
+def _describe(value):
+    if value is MISSING_FIELD:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()  # Show NumPy numbers as plain numbers
+    text = repr(value)
+    return text if len(text) <= 50 else text[:47] + "..."
+
+
+# Turn a list of records (dictionaries) into columns without failing on bad records:
+# a field a record does not have becomes MISSING_FIELD, which the schema reports for that row only
+def records_to_columns(records, columns):
+    return {
+        column: [record.get(column, MISSING_FIELD) if isinstance(record, dict) else MISSING_FIELD for record in records]
+        for column in columns
+    }
+
+
+# This class describes the inputs the fitted preprocessor can handle, and checks whole batches against it
+class InputSchema:
+    def __init__(self, numerical, categorical, source_digest=None, allow_missing=True, reject_out_of_range=False):
+        # numerical: column -> [lowest, highest] value seen in training (None when unknown)
+        # categorical: column -> list of the categories the encoder learned
+        self.numerical = numerical
+        self.categorical = categorical
+        self.source_digest = source_digest  # Fingerprint of the preprocessor file this schema belongs to
+        self.allow_missing = allow_missing
+        self.reject_out_of_range = reject_out_of_range
+        self.columns = list(numerical) + list(categorical)
+        # Sets of the learned categories, for quick lookups
+        self._category_sets = {column: frozenset(levels) for column, levels in categorical.items()}
+
+    # Build the schema from a fitted preprocessor: the categories come from its encoders and the numeric
+    # ranges from the training data (when given)
+    @classmethod
+    def from_preprocessor(cls, preprocessor, train_df=None, source_digest=None):
+        numerical, categorical = {}, {}
+        for name, pipeline, columns in preprocessor.transformers_:
+            if name == "remainder" or pipeline == "drop":
+                continue
+            encoder = dict(pipeline.steps).get("one_hot_encoder")
+            for i, column in enumerate(columns):
+                if encoder is not None:
+                    categorical[column] = [str(level) for level in encoder.categories_[i]]
+                elif train_df is not None:
+                    values = train_df[column].to_numpy(dtype=float)
+                    numerical[column] = [float(np.nanmin(values)), float(np.nanmax(values))]
+                else:
+                    numerical[column] = None
+        return cls(numerical, categorical, source_digest=source_digest)
+
+    # Save the schema as JSON
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "w") as file_obj:
+            json.dump(
+                {"numerical": self.numerical, "categorical": self.categorical, "source_digest": self.source_digest},
+                file_obj,
+                indent=2,
+            )
+
+    # Load a schema saved with save()
+    @classmethod
+    def load(cls, file_path, allow_missing=True, reject_out_of_range=False):
+        with open(file_path) as file_obj:
+            data = json.load(file_obj)
+        return cls(
+            data["numerical"], data["categorical"], source_digest=data.get("source_digest"),
+            allow_missing=allow_missing, reject_out_of_range=reject_out_of_range,
+        )
+
+    # Mark values that count as missing (None, NaN and empty text) and fields a record did not have at all,
+    # using NumPy's element-wise comparisons rather than a Python loop
+    @staticmethod
+    def _missing_masks(values):
+        absent = np.equal(values, MISSING_FIELD)
+        missing = (np.equal(values, None) | (values != values) | (values == "")) & ~absent
+        return missing, absent
+
+    # Report fields a record did not have, and missing values when they are not allowed
+    def _check_missing(self, column, values, missing, absent, problems):
+        problems.append((absent, column, "missing field", "error", values))
+        if not self.allow_missing:
+            problems.append((missing, column, "missing value", "error", values))
+
+    # Check a numeric column and return it as floats (NaN where missing or not a number)
+    def _check_numbers(self, column, values, problems):
+        try:
+            # Fast path: every value is a number, a numeric string or None, so NumPy converts them all at once
+            numbers = np.asarray(values, dtype=float)
+            missing, absent = np.isnan(numbers), np.zeros(len(numbers), dtype=bool)
+        except (TypeError, ValueError):
+            # Some value is not a number: find which ones (one value at a time, but only on this slow path)
+            values = np.asarray(values, dtype=object)
+            missing, absent = self._missing_masks(values)
+            converted = _to_float_array(values)
+            not_number = np.equal(converted, None) & ~(missing | absent)
+            problems.append((not_number, column, "not a number", "error", values))
+            converted[np.equal(converted, None)] = np.nan
+            numbers = converted.astype(float)
+        self._check_missing(column, values, missing, absent, problems)
+        problems.append((np.isinf(numbers), column, "not a finite number", "error", values))
+
+        value_range = self.numerical[column]
+        if value_range is not None:
+            with np.errstate(invalid="ignore"):
+                outside = ((numbers < value_range[0]) | (numbers > value_range[1])) & ~np.isinf(numbers)
+            problems.append((
+                outside, column, f"outside the training range [{value_range[0]:g}, {value_range[1]:g}]",
+                "error" if self.reject_out_of_range else "warning", values,
+            ))
+        return numbers
+
+    # Check a categorical column and return it with missing values set to NaN (which the imputer fills)
+    def _check_categories(self, column, values, problems):
+        values = np.asarray(values, dtype=object)
+        known = _is_in(values, self._category_sets[column])
+
+        # Only the values that are not a learned category need a closer look: missing, or truly unknown
+        others = np.flatnonzero(~known)
+        missing, absent = np.zeros(len(values), dtype=bool), np.zeros(len(values), dtype=bool)
+        missing[others], absent[others] = self._missing_masks(values[others])
+        self._check_missing(column, values, missing, absent, problems)
+        problems.append((~(known | missing | absent), column, "unknown category", "error", values))
+
+        if len(others):
+            values = values.copy()
+            values[missing | absent] = np.nan  # The imputer treats NaN (not None) as missing
+        return values
+
+    # Check every row of a batch (a DataFrame or a dictionary of columns) and return a ValidationResult.
+    # Nothing is raised for bad rows: each problem is reported with its row number (counted from row_offset).
+    def validate(self, features, row_offset=0):
+        try:
+            n_rows = count_rows(features)
+            present = set(features.columns) if hasattr(features, "columns") else set(features)
+            valid = np.ones(n_rows, dtype=bool)
+            problems = []  # (row positions, column, error, severity, values)
+            columns = {}
+
+            for column in self.columns:
+                if column not in present:
+                    # The whole column is absent, so every row is missing this field
+                    values = np.full(n_rows, MISSING_FIELD, dtype=object)
+                else:
+                    values = features[column]
+                    values = values.to_numpy() if hasattr(values, "to_numpy") else values  # A DataFrame column
+
+                if column in self.numerical:
+                    columns[column] = self._check_numbers(column, values, problems)
+                else:
+                    columns[column] = self._check_categories(column, values, problems)
+
+            # Rows with an error are rejected; warnings are reported but the row is still scored
+            errors = []
+            for mask, column, error, severity, values in problems:
+                if not mask.any():
+                    continue
+                if severity == "error":
+                    valid &= ~mask
+                for row in np.flatnonzero(mask).tolist():
+                    errors.append({
+                        "row": row + row_offset, "column": column, "value": _describe(values[row]),
+                        "error": error, "severity": severity,
+                    })
+            errors.sort(key=lambda entry: entry["row"])
+            return ValidationResult(columns=columns, valid=valid, errors=errors)
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+
+# Build the schema for the current preprocessor and save it next to it (run after the preprocessor is saved)
+def export_input_schema(preprocessor, train_df, config: InputSchemaConfig = None):
+    try:
+        config = config or InputSchemaConfig()
+        schema = InputSchema.from_preprocessor(
+            preprocessor, train_df, source_digest=hash_file(config.preprocessor_file_path)
+        )
+        schema.save(config.schema_file_path)
+        logging.info(f"Saved input schema to {config.schema_file_path}")
+        return config.schema_file_path
+
+    except Exception as e:
+        # Raise a custom error if something goes wrong
+        raise CustomException(e, sys)
+
+
+# Load the saved schema if it was built from exactly this preprocessor; otherwise build one from the
+# preprocessor alone (categories are still checked, numeric ranges are not)
+def load_input_schema(preprocessor, source_digest, config: InputSchemaConfig = None):
+    config = config or InputSchemaConfig()
+    if os.path.exists(config.schema_file_path):
+        schema = InputSchema.load(config.schema_file_path, config.allow_missing, config.reject_out_of_range)
+        if schema.source_digest == source_digest:
+            return schema
+        logging.info("Input schema is out of date, building one from the preprocessor")
+    schema = InputSchema.from_preprocessor(preprocessor, source_digest=source_digest)
+    schema.allow_missing, schema.reject_out_of_range = config.allow_missing, config.reject_out_of_range
+    return schema
@@ -0,0 +1,120 @@
+# Import tools needed for background work, waiting and error tracking
+import sys  # Helps in handling errors and system-related operations
+import queue  # A thread-safe waiting line for incoming requests
+import threading  # Runs the batching loop in the background
+import time  # Measures the batching time window
+from concurrent.futures import Future  # Lets each request wait for its own result
+from dataclasses import dataclass  # A simple way to create classes for storing settings
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.pipeline.records import count_rows, concat_features  # Work with DataFrames or plain columns
+from src.tracing import tracer, current_span  # Opt-in spans for each phase of a request
+
+
+# Settings for how requests are grouped together
+@dataclass
+class MicroBatcherConfig:
+    max_wait: float = 0.005  # Seconds to wait for more requests before scoring a batch
+    max_batch_size: int = 256  # Largest number of rows scored in one call
+
+
+# This class groups rows from requests that arrive at the same time and scores them in one call
+class MicroBatcher:
+    def __init__(self, predict_pipeline, config: MicroBatcherConfig = None):
+        self.predict_pipeline = predict_pipeline  # The pipeline that makes the predictions
+        self.config = config or MicroBatcherConfig()
+        self._queue = queue.Queue()  # Waiting line of (rows, Future) pairs
+        self._thread = None  # Background thread that does the scoring
+        self._start_lock = threading.Lock()
+
+        # Counters that show how much grouping is happening
+        self.batches = 0  # Number of scoring calls made
+        self.rows = 0  # Number of rows scored
+
+    # Start the background thread the first time it is needed
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._thread.start()
+
+    # Add rows (a DataFrame or a dictionary of columns) to the waiting line
+    # and return a Future for their predictions
+    def submit(self, features):
+        self._ensure_started()
+        future = Future()
+        # Remember which request the rows came from, so the batch's span can point back to it
+        future.parent_span = current_span()
+        self._queue.put((features, future))
+        return future
+
+    # Score rows together with any other requests waiting at the same time
+    def predict(self, features, timeout=None):
+        try:
+            return self.submit(features).result(timeout=timeout)
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Collect requests for up to max_wait seconds (or max_batch_size rows)
+    def _collect(self):
+        items = [self._queue.get()]  # Wait for the first request
+        n_rows = count_rows(items[0][0])
+        deadline = time.monotonic() + self.config.max_wait
+
+        while n_rows < self.config.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            n_rows += count_rows(item[0])
+
+        return items
+
+    # Background loop: collect a batch, score it once, and hand each request its own rows back
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                # Join all rows into one table so the preprocessor and model run only once
+                if len(items) == 1:
+                    batch = items[0][0]
+                else:
+                    batch = concat_features([features for features, _ in items])
+
+                # The batch is scored in this thread for several requests at once, so its span starts a trace
+                # of its own that lists the spans of the requests it served
+                links = None
+                if tracer.enabled:
+                    parents = [future.parent_span for _, future in items if future.parent_span is not None]
+                    links = [f"{span.trace_id}/{span.span_id}" for span in parents]
+                with tracer.span("micro_batch", requests=len(items), links=links):
+                    preds = self.predict_pipeline.predict(batch)
+
+                self.batches += 1
+                self.rows += count_rows(batch)
+
+                # Split the predictions back up in the same order the rows were added
+                start = 0
+                for features, future in items:
+                    end = start + count_rows(features)
+                    future.set_result(preds[start:end])
+                    start = end
+
+            except Exception as e:
+                logging.info(f"Micro-batch of {len(items)} requests failed: {e}")
+                if len(items) == 1:
+                    items[0][1].set_exception(e)
+                else:
+                    # Score each request on its own so one bad request does not fail the others
+                    for features, future in items:
+                        try:
+                            future.set_result(self.predict_pipeline.predict(features))
+                        except Exception as item_error:
+                            future.set_exception(item_error)
@@ -1,39 +1,236 @@
-# Import tools needed for file management, data handling, and error tracking
+# Import tools needed for file management, data handling, and error tracking.
+# pandas is imported only where a DataFrame is built, so serving plain columns never loads it.
 import sys  # Helps in handling errors and system-related operations
-import pandas as pd  # Useful for working with data in tables (like spreadsheets)
-from src.exception import CustomException  # Custom error handling to display clear error messages
-from src.utils import load_object  # Helper function to load saved models or objects from files
 import os  # Helps with file and directory management
+import time  # Times each phase of a prediction
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.instrumentation import metrics  # In-memory timing histograms for the /metrics endpoint
+from src.tracing import tracer  # Opt-in spans for each phase of a request
+from src.pipeline.artifact_registry import get_artifact_registry  # Shares loaded models across requests
+from src.pipeline.compiled_scorer import compile_scorer, check_parity, parity_rows  # Fast NumPy scorer built from the fitted artifacts
+from src.pipeline.prediction_cache import PredictionCache  # Remembers predictions for repeated inputs
+from src.pipeline.records import count_rows, take_rows  # Works with DataFrames or plain columns
+from src.pipeline.input_schema import InputSchemaConfig, load_input_schema, records_to_columns  # Checks inputs before scoring
 
 # This class handles making predictions with a trained model
 class PredictPipeline:
-    def __init__(self):
-        pass  # Nothing needed to set up when we create this object
+    def __init__(self, registry=None, use_compiled_scorer=True, cache=None, schema_config: InputSchemaConfig = None):
+        # Use the registry shared by the whole process unless a different one is given
+        self.registry = registry or get_artifact_registry()
+        self.use_compiled_scorer = use_compiled_scorer  # Score with plain NumPy when possible
+        self._scorer = None  # The compiled scorer for the currently loaded artifacts (if any)
+        self._scorer_version = None  # Registry version the compiled scorer was built for
+        self.cache = cache if cache is not None else PredictionCache()  # Cache of recent predictions
+        self._cache_version = None  # Registry version the cache and lookup table belong to
+        self.schema_config = schema_config or InputSchemaConfig()  # Where the input schema is and how strict it is
+        self._schema = None  # The input schema for the currently loaded preprocessor
+        self._schema_version = None  # Registry version the input schema was loaded for
+
+    # Empty the cache when the artifacts change, and pick up a lookup table built from exactly these artifacts
+    def refresh_cache(self):
+        if self._cache_version == self.registry.version:
+            return
+
+        config = self.registry.config
+        source_digests = {
+            config.model_file_path: self.registry.digest(config.model_file_path),
+            config.preprocessor_file_path: self.registry.digest(config.preprocessor_file_path),
+        }
+        table = None
+        if os.path.exists(self.cache.config.table_file_path):
+            table = self.registry.get(self.cache.config.table_file_path)
+            if table.source_digests != source_digests:
+                logging.info("Prediction lookup table is out of date, not using it")
+                table = None
+
+        self.cache.table = table
+        self.cache.check_version(self.registry.version)
+        self._cache_version = self.registry.version
+
+    # The cache and artifact registry counters as (name, type, labels, value) for the /metrics endpoint
+    # (see Metrics.add_collector). The cache counters are read directly: cache.stats() also measures every entry,
+    # too slow for each scrape.
+    def collect_metrics(self):
+        cache = self.cache
+        registry = self.registry.stats()
+        return [
+            ("artifact_registry_cache_hits_total", "counter", {}, registry["cache_hits"]),
+            ("artifact_registry_cache_misses_total", "counter", {}, registry["cache_misses"]),
+            ("artifact_registry_reloads_total", "counter", {}, registry["reloads"]),
+            ("artifact_registry_load_seconds_total", "counter", {}, registry["load_time"]),
+            ("artifact_registry_loaded_artifacts", "gauge", {}, len(registry["loaded"])),
+            ("prediction_cache_hits_total", "counter", {"source": "cache"}, cache.hits),
+            ("prediction_cache_hits_total", "counter", {"source": "table"}, cache.table_hits),
+            ("prediction_cache_misses_total", "counter", {}, cache.misses),
+            ("prediction_cache_entries", "gauge", {}, len(cache)),
+        ]
+
+    # Return the compiled scorer that matches the loaded model and preprocessor, or None if there is none
+    def get_compiled_scorer(self, model, preprocessor):
+        if self._scorer_version == self.registry.version:
+            return self._scorer
+
+        config = self.registry.config
+        source_digests = {
+            config.model_file_path: self.registry.digest(config.model_file_path),
+            config.preprocessor_file_path: self.registry.digest(config.preprocessor_file_path),
+        }
+        scorer = None
+        try:
+            # Prefer the exported scorer, but only if it was built from exactly these artifacts
+            scorer = self.registry.get_compiled_scorer()
+            if scorer is not None and scorer.source_digests != source_digests:
+                logging.info("Exported compiled scorer is out of date, compiling a new one in memory")
+                scorer = None
+            if scorer is None:
+                scorer = compile_scorer(preprocessor, model, source_digests=source_digests)
+                # Unlike an exported scorer, this one has not been checked against sklearn yet
+                max_diff, allowed = check_parity(scorer, preprocessor, model, parity_rows(scorer))
+                if max_diff > allowed:
+                    raise ValueError(f"it differs from sklearn by {max_diff} (allowed {allowed})")
+        except Exception as e:
+            # The artifacts use steps the compiler does not understand (or it does not match sklearn), so keep using sklearn
+            logging.info(f"Compiled scorer not available, using the sklearn pipeline: {e}")
+            scorer = None
+
+        self._scorer, self._scorer_version = scorer, self.registry.version
+        return scorer
+
+    # Return the input schema that matches the loaded preprocessor
+    def get_input_schema(self):
+        preprocessor = self.registry.get_preprocessor()
+        if self._schema_version != self.registry.version:
+            digest = self.registry.digest(self.registry.config.preprocessor_file_path)
+            self._schema = load_input_schema(preprocessor, digest, self.schema_config)
+            self._schema_version = self.registry.version
+        return self._schema
+
+    # Check a batch against the input schema without scoring it (see InputSchema.validate)
+    def validate(self, features, row_offset=0):
+        return self.get_input_schema().validate(features, row_offset)
 
-    # Method to make predictions based on input features
-    def predict(self, features):
+    # Check a batch and score only the rows that pass, so one bad record never fails the whole batch.
+    # Returns the predictions (NaN for rejected rows) and the per-row error report.
+    # score can be another function that takes columns, for example a micro-batcher's predict.
+    # features can be anything predict() accepts; in a list of dictionaries a record with a missing field
+    # is reported for its own row instead of failing the batch.
+    def predict_with_report(self, features, score=None, row_offset=0):
         try:
-            # Paths to the model and data transformer (preprocessor) files
-            model_path = os.path.join("artifacts", "model.pkl")  # Path to the trained model
-            preprocessor_path = os.path.join('artifacts', 'preprocessor.pkl')  # Path to the preprocessor (data transformer)
+            import numpy as np  # Fast math on arrays of numbers
 
-            # Load the model and preprocessor that were saved earlier
-            print("Before Loading")
-            model = load_object(file_path=model_path)  # Load the saved model
-            preprocessor = load_object(file_path=preprocessor_path)  # Load the preprocessor
-            print("After Loading")
+            if isinstance(features, list):
+                if all(isinstance(record, CustomData) for record in features):
+                    features = CustomData.get_records_as_columns(features)
+                else:
+                    features = records_to_columns(features, FEATURE_COLUMNS)
+
+            with tracer.span("validate", rows=count_rows(features)) as span:
+                result = self.validate(features, row_offset)
+                span.set(rejected=result.n_rejected)
+            score = score or self.predict
+            preds = np.full(len(result.valid), np.nan)
+            if result.valid.all():
+                if len(preds):
+                    preds[:] = score(result.columns)
+            elif result.valid.any():
+                rows = np.flatnonzero(result.valid)
+                preds[rows] = score(take_rows(result.columns, rows))
+            return preds, result.errors
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Method to make predictions based on input features: a DataFrame, a dictionary of columns,
+    # or a list of CustomData records (the last two skip building a DataFrame when the compiled scorer is used)
+    def predict(self, features, use_cache=True):
+        try:
+            if isinstance(features, list):
+                features = CustomData.get_records_as_columns(features)
+
+            # Get the model and preprocessor (loaded from disk only once, or again if the files change)
+            with tracer.span("load_artifacts"):
+                model = self.registry.get_model()  # The trained model
+                preprocessor = self.registry.get_preprocessor()  # The preprocessor (data transformer)
+
+            # Small requests first look in the cache (and the lookup table) for inputs seen before
+            if use_cache and self.cache is not None and count_rows(features) <= self.cache.config.max_batch_rows:
+                self.refresh_cache()
+                return self.cache.predict(features, lambda rows: self.predict_uncached(rows, model, preprocessor))
+
+            return self.predict_uncached(features, model, preprocessor)
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Method to make predictions without the cache
+    def predict_uncached(self, features, model, preprocessor):
+        try:
+            # Use the compiled NumPy scorer when there is one: no ColumnTransformer, no extra copies.
+            # Its predictions are not byte-identical to the sklearn pipeline's (a linear model's terms are added
+            # up in another order), only within the parity tolerance (see check_parity and benchmarks/record_path.py);
+            # PredictPipeline(use_compiled_scorer=False) gives exactly the sklearn answers.
+            if self.use_compiled_scorer:
+                scorer = self.get_compiled_scorer(model, preprocessor)
+                if scorer is not None:
+                    start = time.perf_counter()
+                    with tracer.span("compiled_score", rows=count_rows(features)):
+                        preds = scorer.predict_columns(features)
+                    metrics.observe("prediction_phase_seconds", time.perf_counter() - start, phase="compiled_score")
+                    metrics.inc("prediction_rows_total", len(preds), path="compiled")
+                    return preds
+
+            # The sklearn preprocessor selects columns by name, so it needs a DataFrame
+            if isinstance(features, dict):
+                import pandas as pd  # Only the sklearn path needs pandas
+                features = pd.DataFrame(features, columns=FEATURE_COLUMNS)
 
             # Preprocess the input features before making predictions
-            data_scaled = preprocessor.transform(features)  # Transform input data to fit the model
-            preds = model.predict(data_scaled)  # Predict results using the model
+            start = time.perf_counter()
+            with tracer.span("transform", rows=len(features)):
+                data_scaled = preprocessor.transform(features)  # Transform input data to fit the model
+            transformed = time.perf_counter()
+            with tracer.span("model_predict", model=type(model).__name__):
+                preds = model.predict(data_scaled)  # Predict results using the model
+            metrics.observe("prediction_phase_seconds", transformed - start, phase="transform")
+            metrics.observe("prediction_phase_seconds", time.perf_counter() - transformed, phase="predict")
+            metrics.inc("prediction_rows_total", len(preds), path="sklearn")
             return preds  # Return the predictions
         
         except Exception as e:
             # Raise a custom error if something goes wrong
             raise CustomException(e, sys)
 
-# This class is for organizing and converting user input data into a format suitable for prediction
+# The input columns the model expects, in the same order as CustomData.get_data_as_data_frame
+FEATURE_COLUMNS = [
+    "gender",
+    "race_ethnicity",
+    "parental_level_of_education",
+    "lunch",
+    "test_preparation_course",
+    "reading_score",
+    "writing_score",
+]
+
+# Get the list of student records from a JSON request body: a list, {"records": [...]}, or a single record
+def get_records_from_json(payload):
+    if isinstance(payload, dict) and "records" in payload:
+        records = payload["records"]
+    elif isinstance(payload, dict):
+        records = [payload]
+    else:
+        records = payload
+    if not isinstance(records, list) or not records:
+        raise ValueError("Expected a JSON list of student records.")
+    return records
+
+# This class is for organizing and converting user input data into a format suitable for prediction.
+# __slots__ keeps each record small and quick to create (no per-object dictionary).
 class CustomData:
+    __slots__ = tuple(FEATURE_COLUMNS)
+
     def __init__(
         self,
         gender: str,
@@ -53,8 +250,32 @@ class CustomData:
         self.reading_score = reading_score
         self.writing_score = writing_score
 
+    # Method to build CustomData from the fields of the web form (any mapping with a .get method)
+    @classmethod
+    def from_form(cls, form):
+        record = cls.get_form_as_record(form)
+        record["reading_score"] = float(record["reading_score"])  # Ensures 'reading_score' is a number
+        record["writing_score"] = float(record["writing_score"])  # Ensures 'writing_score' is a number
+        return cls(**record)
+
+    # Method to read the web form fields into a record exactly as typed (nothing converted yet),
+    # so the input schema can report a bad field instead of the conversion failing
+    @staticmethod
+    def get_form_as_record(form):
+        return {
+            "gender": form.get('gender'),  # Fetches 'gender' data
+            "race_ethnicity": form.get('ethnicity'),  # Fetches 'ethnicity' data
+            "parental_level_of_education": form.get('parental_level_of_education'),  # Fetches parent's education level
+            "lunch": form.get('lunch'),  # Fetches 'lunch' data
+            "test_preparation_course": form.get('test_preparation_course'),  # Fetches 'test preparation' data
+            "reading_score": form.get('reading_score'),  # Fetches 'reading_score' data
+            "writing_score": form.get('writing_score'),  # Fetches 'writing_score' data
+        }
+
     # Method to convert the input data into a DataFrame (table format)
     def get_data_as_data_frame(self):
+        import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+
         try:
             # Organize the data into a dictionary
             custom_data_input_dict = {
@@ -68,7 +289,53 @@ class CustomData:
             }
 
             # Convert the dictionary into a DataFrame
-            return pd.DataFrame(custom_data_input_dict)
+            with tracer.span("build_data_frame"):
+                return pd.DataFrame(custom_data_input_dict)
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Method to convert a list of records (dictionaries) into one DataFrame with the same columns
+    @staticmethod
+    def get_records_as_data_frame(records):
+        import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+
+        try:
+            # Check every record has all the columns the model needs
+            for i, record in enumerate(records):
+                missing = [column for column in FEATURE_COLUMNS if column not in record]
+                if missing:
+                    raise ValueError(f"Record {i} is missing fields: {missing}")
+
+            # Build the DataFrame column by column, keeping the same order as a single record
+            df = pd.DataFrame({column: [record[column] for record in records] for column in FEATURE_COLUMNS})
+            df["reading_score"] = df["reading_score"].astype(float)  # Scores must be numbers
+            df["writing_score"] = df["writing_score"].astype(float)
+            return df
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Method to convert a list of records (CustomData objects or dictionaries) into plain columns
+    # (a dictionary of column name -> list), which PredictPipeline.predict accepts without a DataFrame
+    @staticmethod
+    def get_records_as_columns(records):
+        try:
+            if all(isinstance(record, CustomData) for record in records):
+                return {column: [getattr(record, column) for record in records] for column in FEATURE_COLUMNS}
+
+            # Dictionaries are checked and converted the same way as get_records_as_data_frame
+            for i, record in enumerate(records):
+                missing = [column for column in FEATURE_COLUMNS if column not in record]
+                if missing:
+                    raise ValueError(f"Record {i} is missing fields: {missing}")
+            columns = {column: [record[column] for record in records] for column in FEATURE_COLUMNS}
+            for column in ("reading_score", "writing_score"):
+                # Scores must be numbers (a missing score becomes NaN, as in the DataFrame)
+                columns[column] = [float("nan") if value is None else float(value) for value in columns[column]]
+            return columns
 
         except Exception as e:
             # Raise a custom error if something goes wrong
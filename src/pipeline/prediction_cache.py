@@ -0,0 +1,222 @@
+# Import tools needed for file management, thread safety, timing and error tracking
+import os  # Helps with file and directory management
+import sys  # Helps in handling errors and system-related operations
+import itertools  # Builds every combination of categories for the lookup table
+import threading  # Lets many requests share the cache safely at the same time
+import time  # Used for the time-to-live of cached predictions
+from collections import OrderedDict  # Remembers the order entries were used in (for LRU eviction)
+from dataclasses import dataclass  # A simple way to create classes for storing settings
+
+import numpy as np  # Fast math on arrays of numbers
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.utils import save_object  # Helper to save the lookup table
+from src.pipeline.records import column_values, take_rows  # Work with DataFrames or plain columns
+
+
+# The categorical and numeric input columns, in the order used for cache keys and the lookup table
+CATEGORICAL_COLUMNS = ["gender", "race_ethnicity", "parental_level_of_education", "lunch", "test_preparation_course"]
+NUMERICAL_COLUMNS = ["reading_score", "writing_score"]
+KEY_COLUMNS = CATEGORICAL_COLUMNS + NUMERICAL_COLUMNS
+
+
+# Settings for the prediction cache and the precomputed lookup table
+@dataclass
+class PredictionCacheConfig:
+    max_entries: int = 100_000  # Most predictions kept in memory (least recently used ones are dropped)
+    ttl: float = None  # Seconds a cached prediction stays valid (None = until the model changes)
+    max_batch_rows: int = 64  # Bigger requests skip the cache (building keys would cost more than it saves)
+    table_file_path: str = os.path.join("artifacts", "prediction_table.pkl")  # Precomputed lookup table
+    score_min: int = 0  # Smallest reading/writing score in the lookup table
+    score_max: int = 100  # Largest reading/writing score in the lookup table
+
+
+# Turn one row of inputs into a hashable key; numbers become floats so 72 and 72.0 share an entry
+def make_key(values):
+    n_categorical = len(CATEGORICAL_COLUMNS)
+    return tuple(values[:n_categorical]) + tuple(
+        float(value) if value is not None else None for value in values[n_categorical:]
+    )
+
+
+# A prediction for every combination of categories and whole-number scores, stored as one NumPy array
+class PredictionTable:
+    def __init__(self, categories, score_min, score_max, values, source_digests=None):
+        self.categories = categories  # List of category labels for each categorical column
+        self.score_min = score_min
+        self.score_max = score_max
+        self.values = values  # Array indexed by [category code per column..., reading, writing]
+        self.source_digests = source_digests or {}  # Fingerprints of the model/preprocessor it was built from
+        self._codes = [{label: code for code, label in enumerate(labels)} for labels in categories]
+
+    # Return the prediction for a key, or None if the key is outside the table
+    def lookup(self, key):
+        index = []
+        for codes, value in zip(self._codes, key):
+            code = codes.get(value)
+            if code is None:
+                return None
+            index.append(code)
+        for score in key[len(self._codes):]:
+            if score is None or score != score or score != int(score) or not self.score_min <= score <= self.score_max:
+                return None
+            index.append(int(score) - self.score_min)
+        return float(self.values[tuple(index)])
+
+    # Memory used by the table in bytes
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+
+# This class remembers recent predictions so repeated inputs skip the model
+class PredictionCache:
+    def __init__(self, config: PredictionCacheConfig = None):
+        self.config = config or PredictionCacheConfig()
+        self._entries = OrderedDict()  # key -> (prediction, time it expires)
+        self._lock = threading.Lock()
+        self._version = None  # Artifact version the cached predictions belong to
+        self.table = None  # Optional precomputed lookup table
+
+        # Counters that show how well the cache is working
+        self.hits = 0
+        self.table_hits = 0
+        self.misses = 0
+
+    # Forget every cached prediction if the model or preprocessor has changed
+    def check_version(self, version):
+        if version != self._version:
+            with self._lock:
+                self._entries.clear()
+                self._version = version
+
+    # Predict for a DataFrame (or dictionary of columns), using cached answers where possible
+    # and predict_function for the rest
+    def predict(self, features, predict_function):
+        try:
+            keys = [make_key(values) for values in zip(*(column_values(features, column) for column in KEY_COLUMNS))]
+            results = np.empty(len(keys))
+            missing = []
+            now = time.monotonic()
+
+            with self._lock:
+                for i, key in enumerate(keys):
+                    entry = self._entries.get(key)
+                    if entry is not None and (entry[1] is None or entry[1] > now):
+                        self._entries.move_to_end(key)
+                        results[i] = entry[0]
+                        self.hits += 1
+                        continue
+                    value = self.table.lookup(key) if self.table is not None else None
+                    if value is not None:
+                        results[i] = value
+                        self.table_hits += 1
+                        continue
+                    missing.append(i)
+                self.misses += len(missing)
+
+            if missing:
+                # Score only the rows that were not found, all in one call
+                rows = take_rows(features, missing) if len(missing) < len(keys) else features
+                preds = predict_function(rows)
+                expires = now + self.config.ttl if self.config.ttl is not None else None
+                with self._lock:
+                    for i, pred in zip(missing, preds):
+                        results[i] = pred
+                        self._entries[keys[i]] = (float(pred), expires)
+                        self._entries.move_to_end(keys[i])
+                    while len(self._entries) > self.config.max_entries:
+                        self._entries.popitem(last=False)
+
+            return results
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+    # Number of predictions kept in memory
+    def __len__(self):
+        return len(self._entries)
+
+    # Return the counters and memory use as a dictionary
+    def stats(self):
+        total = self.hits + self.table_hits + self.misses
+        with self._lock:
+            entries = len(self._entries)
+            # Rough size: the dictionary itself plus one key tuple and one value tuple per entry
+            entry_bytes = sys.getsizeof(self._entries) + sum(
+                sys.getsizeof(key) + sys.getsizeof(value) for key, value in self._entries.items()
+            )
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "table_hits": self.table_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.table_hits) / total if total else 0.0,
+            "cache_bytes": entry_bytes,
+            "table_bytes": self.table.nbytes if self.table is not None else 0,
+        }
+
+
+# Build the full lookup table by scoring every combination of categories and whole-number scores
+def build_prediction_table(predict_pipeline, config: PredictionCacheConfig = None, chunk_size=500_000):
+    import pandas as pd  # Builds the tables of inputs to score
+
+    try:
+        config = config or PredictionCacheConfig()
+        registry = predict_pipeline.registry
+        preprocessor = registry.get_preprocessor()
+
+        # The categories the one-hot encoder learned, for each categorical column
+        categories = {}
+        for name, pipeline, columns in preprocessor.transformers_:
+            if hasattr(pipeline, "named_steps") and "one_hot_encoder" in pipeline.named_steps:
+                for column, labels in zip(columns, pipeline.named_steps["one_hot_encoder"].categories_):
+                    categories[column] = list(labels)
+        categories = [categories[column] for column in CATEGORICAL_COLUMNS]
+        scores = list(range(config.score_min, config.score_max + 1))
+
+        # Score every combination in chunks so memory stays small
+        combos = itertools.product(*categories, scores, scores)
+        shape = [len(labels) for labels in categories] + [len(scores), len(scores)]
+        values = np.empty(int(np.prod(shape)))
+        start = 0
+        while True:
+            chunk = list(itertools.islice(combos, chunk_size))
+            if not chunk:
+                break
+            features = pd.DataFrame(chunk, columns=KEY_COLUMNS)
+            values[start:start + len(chunk)] = predict_pipeline.predict(features, use_cache=False)
+            start += len(chunk)
+
+        source_digests = {
+            registry.config.model_file_path: registry.digest(registry.config.model_file_path),
+            registry.config.preprocessor_file_path: registry.digest(registry.config.preprocessor_file_path),
+        }
+        logging.info(f"Built prediction table with {values.size} entries ({values.nbytes / 1e6:.1f} MB)")
+        return PredictionTable(categories, config.score_min, config.score_max, values.reshape(shape), source_digests)
+
+    except Exception as e:
+        # Raise a custom error if something goes wrong
+        raise CustomException(e, sys)
+
+
+# Build the lookup table for the current artifacts and save it next to them
+def export_prediction_table(config: PredictionCacheConfig = None):
+    try:
+        from src.pipeline.predict_pipeline import PredictPipeline
+
+        config = config or PredictionCacheConfig()
+        table = build_prediction_table(PredictPipeline(), config)
+        save_object(config.table_file_path, table, file_format="joblib")
+        return config.table_file_path
+
+    except Exception as e:
+        # Raise a custom error if something goes wrong
+        raise CustomException(e, sys)
+
+
+# Run this file directly to export the lookup table for the current artifacts
+if __name__ == "__main__":
+    print(export_prediction_table())
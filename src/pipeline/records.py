@@ -0,0 +1,36 @@
+# Helpers that let the serving code work with either a pandas DataFrame or plain columns
+# (a dictionary of column name -> list of values), so single requests can skip building a DataFrame
+
+
+# Number of rows in a DataFrame or in a dictionary of columns
+def count_rows(features):
+    if isinstance(features, dict):
+        return len(next(iter(features.values()))) if features else 0
+    return len(features)
+
+
+# The values of one column as a plain Python list
+def column_values(features, column):
+    values = features[column]
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+# Only the given rows (by position), in the same form as the input
+def take_rows(features, rows):
+    if isinstance(features, dict):
+        # NumPy arrays are indexed all at once; lists one row at a time
+        return {
+            column: values.take(rows) if hasattr(values, "take") else [values[i] for i in rows]
+            for column, values in features.items()
+        }
+    return features.iloc[rows]
+
+
+# Join several inputs into one, keeping the row order
+def concat_features(items):
+    if all(isinstance(features, dict) for features in items):
+        return {column: [value for features in items for value in features[column]] for column in items[0]}
+
+    import pandas as pd  # Only needed when some of the inputs are DataFrames
+    items = [pd.DataFrame(features) if isinstance(features, dict) else features for features in items]
+    return pd.concat(items, ignore_index=True)
@@ -0,0 +1,239 @@
+# Import tools needed for file management, reading arguments and error tracking
+import os  # Helps with file and directory management
+import sys  # Helps in handling errors and system-related operations
+import json  # Prints the retraining report
+import shutil  # Copies the original dataset the first time
+import argparse  # Reads the options given on the command line
+from dataclasses import dataclass  # A simple way to create classes for storing settings
+
+import numpy as np  # Fast math on arrays of numbers
+import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.utils import save_object, load_object, save_matrix, save_table  # Helpers to save and load artifacts
+
+from src.components.data_ingestion import DataIngestion, DataIngestionConfig  # Stores the data splits
+from src.components.data_transformation import DataTransformation  # Updates the preprocessor
+from src.components.model_trainer import ModelTrainer, ModelTrainerConfig  # Continues training the model
+from src.pipeline.predict_pipeline import FEATURE_COLUMNS  # The input columns the model expects
+from src.pipeline.input_schema import InputSchemaConfig, export_input_schema  # Describes the inputs serving accepts
+from src.pipeline.train_pipeline import TrainPipeline, TrainPipelineConfig  # The full rebuild
+
+TARGET_COLUMN = "math_score"
+
+
+# Settings for incremental retraining
+@dataclass
+class RetrainPipelineConfig:
+    dataset_path: str = DataIngestionConfig.dataset_path  # All records so far (original + every new batch)
+    drift_threshold: float = 0.2  # Largest population stability index (PSI) allowed before a full rebuild
+    drift_bins: int = 10  # Number of bins used to compare numeric columns
+    extra_rounds: int = 20  # Boosting rounds (or trees) added by a warm start
+    r2_tolerance: float = 0.01  # Most test r2 an incremental update may lose before a full rebuild is done
+    export_compiled_scorer: bool = True  # Also export the fast NumPy scorer after an incremental update
+
+
+# Population stability index of one column: how different the new values are from the reference values
+# (below 0.1 is usually read as no change, above 0.2 as a real shift).
+# Small samples differ by chance, so the PSI expected from sampling alone, (bins - 1) * (1/n_new + 1/n_reference),
+# is subtracted; otherwise a batch of a few dozen records would always look like drift.
+def population_stability_index(reference, new, bins=10, numeric=True):
+    if numeric:
+        reference = np.asarray(reference, dtype=float)
+        new = np.asarray(new, dtype=float)
+        edges = np.unique(np.nanquantile(reference, np.linspace(0, 1, bins + 1)[1:-1]))
+        reference_share = np.bincount(np.searchsorted(edges, reference), minlength=len(edges) + 1) / len(reference)
+        new_share = np.bincount(np.searchsorted(edges, new), minlength=len(edges) + 1) / len(new)
+    else:
+        reference = pd.Series(reference).astype(object).value_counts(normalize=True)
+        new = pd.Series(new).astype(object).value_counts(normalize=True)
+        levels = reference.index.union(new.index)
+        reference_share = reference.reindex(levels, fill_value=0).to_numpy()
+        new_share = new.reindex(levels, fill_value=0).to_numpy()
+
+    # A small floor keeps empty bins from dividing by zero
+    reference_share = np.clip(reference_share, 1e-4, None)
+    new_share = np.clip(new_share, 1e-4, None)
+    psi = float(np.sum((new_share - reference_share) * np.log(new_share / reference_share)))
+    sampling_noise = (len(new_share) - 1) * (1 / len(new) + 1 / len(reference))
+    return max(psi - sampling_noise, 0.0)
+
+
+# This class adds newly arrived records to the model without retraining everything,
+# unless the new data has drifted too far (or the update makes the model worse)
+class RetrainPipeline:
+    def __init__(self, config: RetrainPipelineConfig = None, trainer_config: ModelTrainerConfig = None):
+        self.config = config or RetrainPipelineConfig()
+        self.trainer_config = trainer_config or ModelTrainerConfig()
+        self.ingestion_config = DataIngestionConfig()
+
+    # Read new records and check they have every column the model needs
+    @staticmethod
+    def read_new_records(path):
+        new_df = pd.read_csv(path)
+        missing = [column for column in FEATURE_COLUMNS + [TARGET_COLUMN] if column not in new_df.columns]
+        if missing:
+            raise ValueError(f"New records are missing columns: {missing}")
+        return new_df[FEATURE_COLUMNS + [TARGET_COLUMN]]
+
+    # Drift of every input column between the current training data and the new records
+    def measure_drift(self, train_df, new_df, preprocessor):
+        drift = {}
+        for name, pipeline, columns in preprocessor.transformers_:
+            if name not in ("num_pipeline", "cat_pipeline"):
+                continue
+            for column in columns:
+                drift[column] = population_stability_index(
+                    train_df[column], new_df[column], self.config.drift_bins, numeric=name == "num_pipeline"
+                )
+                # A category the encoder has never seen needs a new column, which only a rebuild can add
+                if name == "cat_pipeline":
+                    known = set(pipeline.named_steps["one_hot_encoder"].categories_[columns.index(column)])
+                    if not set(new_df[column].dropna()) <= known:
+                        drift[column] = float("inf")
+        return drift
+
+    # Retrain everything (ingestion, transformation, model search) on the records in dataset_path
+    def full_rebuild(self, report, reason, dataset_path):
+        logging.info(f"Full rebuild: {reason}")
+        pipeline = TrainPipeline(
+            config=TrainPipelineConfig(export_compiled_scorer=self.config.export_compiled_scorer),
+            trainer_config=self.trainer_config,
+            ingestion_config=DataIngestionConfig(source_data_path=dataset_path),
+        )
+        report.update(mode="full_rebuild", reason=reason, test_r2=float(pipeline.run(force=True)))
+        return report
+
+    # Record the artifacts as up to date in the training pipeline's state, with dataset_path as their source,
+    # so the next TrainPipeline run neither redoes this work nor goes back to the original dataset
+    def record_pipeline_state(self):
+        TrainPipeline(
+            config=TrainPipelineConfig(export_compiled_scorer=self.config.export_compiled_scorer),
+            trainer_config=self.trainer_config,
+            ingestion_config=DataIngestionConfig(source_data_path=self.config.dataset_path),
+        ).run(record_only=True)
+
+    # Add the new records in a file and update the model, returning a report of what was done.
+    # The records are added to dataset_path only once the updated artifacts are saved, so a run that fails
+    # can simply be repeated with the same file.
+    def run(self, new_data_path):
+        config = self.config
+        pending_path = f"{config.dataset_path}.tmp"  # Every record so far plus the new ones, until they are saved
+        try:
+            # Keep one file with every record so far, starting from the original dataset
+            new_df = self.read_new_records(new_data_path)
+            base_path = config.dataset_path
+            if not os.path.exists(base_path):
+                base_path = self.ingestion_config.source_data_path
+            os.makedirs(os.path.dirname(pending_path) or ".", exist_ok=True)
+            shutil.copyfile(base_path, pending_path)
+            dataset_columns = pd.read_csv(pending_path, nrows=0).columns
+            new_df[dataset_columns].to_csv(pending_path, mode="a", header=False, index=False)
+
+            report = self.update(new_df, pending_path)
+
+            # Everything is saved: the new records are now part of the dataset
+            os.replace(pending_path, config.dataset_path)
+            self.record_pipeline_state()
+            logging.info(f"Retraining finished: {report}")
+            return report
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+        finally:
+            if os.path.exists(pending_path):
+                os.remove(pending_path)
+
+    # Update the model with the new records (pending_path holds every record so far plus the new ones)
+    def update(self, new_df, pending_path):
+        config = self.config
+        transformation = DataTransformation()
+        transformation_config = transformation.data_transformation_config
+        trainer = ModelTrainer(self.trainer_config)
+        trainer_config = trainer.model_trainer_config
+        report = {"new_records": len(new_df)}
+
+        # Without saved artifacts there is nothing to update
+        if not os.path.exists(transformation_config.preprocessor_obj_file_path) or not os.path.exists(
+            trainer_config.trained_model_file_path
+        ):
+            return self.full_rebuild(report, "no trained model to update", pending_path)
+
+        # Compare the new records with the current training data
+        preprocessor = load_object(transformation_config.preprocessor_obj_file_path, mmap=False)
+        model = load_object(trainer_config.trained_model_file_path, mmap=False)
+        train_df = transformation.read_data(self.ingestion_config.train_table_path)
+        report["drift"] = self.measure_drift(train_df, new_df, preprocessor)
+        max_drift = max(report["drift"].values())
+        if max_drift > config.drift_threshold:
+            return self.full_rebuild(report, f"drift {max_drift:.3f} is above {config.drift_threshold}", pending_path)
+
+        # Add the new records to the splits (saved at the end), and score the current model on the larger test split
+        ingestion = DataIngestion(self.ingestion_config)
+        new_train, _, train_df, test_df = ingestion.append_new_data(new_df, save=False)
+        X_test_old = preprocessor.transform(test_df.drop(columns=[TARGET_COLUMN]))
+        report["test_r2_before"] = float(_r2(test_df[TARGET_COLUMN], model.predict(X_test_old)))
+
+        # Update the preprocessor from running statistics and transform the data with it
+        preprocessor = transformation.update_transformation_object(preprocessor, train_df, new_train)
+        X_train = preprocessor.transform(train_df.drop(columns=[TARGET_COLUMN]))
+        X_test = preprocessor.transform(test_df.drop(columns=[TARGET_COLUMN]))
+        X_new = preprocessor.transform(new_train.drop(columns=[TARGET_COLUMN]))
+        y_train, y_test = train_df[TARGET_COLUMN].to_numpy(float), test_df[TARGET_COLUMN].to_numpy(float)
+
+        # Continue training the saved model
+        model, method = trainer.warm_start_model(
+            model, X_train, y_train, X_new, new_train[TARGET_COLUMN].to_numpy(float), config.extra_rounds
+        )
+        report.update(method=method, test_r2=float(_r2(y_test, model.predict(X_test))))
+        if report["test_r2"] < report["test_r2_before"] - config.r2_tolerance:
+            return self.full_rebuild(report, "the incremental update made the test score worse", pending_path)
+
+        # Save the updated preprocessor, model and transformed data, and last the splits with the new records
+        save_object(
+            transformation_config.preprocessor_obj_file_path, preprocessor,
+            file_format=transformation_config.preprocessor_file_format,
+        )
+        export_input_schema(
+            preprocessor,
+            train_df,
+            InputSchemaConfig(preprocessor_file_path=transformation_config.preprocessor_obj_file_path),
+        )  # The number ranges now include the new records
+        save_object(trainer_config.trained_model_file_path, model, file_format=trainer_config.model_file_format)
+        save_matrix(transformation_config.train_matrix_path, X_train, y_train)
+        save_matrix(transformation_config.test_matrix_path, X_test, y_test)
+        if config.export_compiled_scorer:
+            from src.pipeline.compiled_scorer import export_compiled_scorer
+            export_compiled_scorer()
+        save_table(train_df, self.ingestion_config.train_table_path)
+        save_table(test_df, self.ingestion_config.test_table_path)
+
+        report["mode"] = "incremental"
+        return report
+
+
+# r2 score, imported only when needed (scikit-learn is slow to import)
+def _r2(y_true, y_pred):
+    from sklearn.metrics import r2_score
+    return r2_score(y_true, y_pred)
+
+
+# Run this file directly to add a file of new records, for example:
+#   python -m src.pipeline.retrain_pipeline new_records.csv --drift-threshold 0.2
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the model with new records, rebuilding only on drift.")
+    parser.add_argument("new_data", help="CSV file of new records (with math_score)")
+    parser.add_argument("--drift-threshold", type=float, default=RetrainPipelineConfig.drift_threshold)
+    parser.add_argument("--extra-rounds", type=int, default=RetrainPipelineConfig.extra_rounds)
+    parser.add_argument("--strategy", default=ModelTrainerConfig.search_strategy, choices=["grid", "halving", "random"],
+                        help="Search strategy for a full rebuild")
+    args = parser.parse_args()
+
+    pipeline = RetrainPipeline(
+        config=RetrainPipelineConfig(drift_threshold=args.drift_threshold, extra_rounds=args.extra_rounds),
+        trainer_config=ModelTrainerConfig(search_strategy=args.strategy),
+    )
+    print(json.dumps(pipeline.run(args.new_data), indent=2))
@@ -0,0 +1,251 @@
+# Import tools needed for file management, reading arguments, saving state and error tracking
+import os  # Helps with file and directory management
+import sys  # Helps in handling errors and system-related operations
+import json  # Saves which inputs each stage was last run with
+import importlib.util  # Finds the source file of each module a stage uses, so code changes also rerun it
+import argparse  # Reads the options given on the command line
+from dataclasses import dataclass, asdict  # A simple way to create classes for storing settings
+
+from src.exception import CustomException  # Custom error handling to display clear error messages
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.utils import hash_file  # Fingerprints files to tell if they have changed
+
+from src.components.data_ingestion import DataIngestion, DataIngestionConfig  # Loads and splits the data
+from src.components.data_transformation import DataTransformation  # Prepares the data for training
+from src.components.model_trainer import ModelTrainer, ModelTrainerConfig  # Finds and saves the best model
+from src.pipeline.input_schema import InputSchemaConfig  # Where the input schema is saved
+
+
+# Settings for the training pipeline
+@dataclass
+class TrainPipelineConfig:
+    state_file_path: str = os.path.join("artifacts", "pipeline_state.json")  # What each stage was last run with
+    export_compiled_scorer: bool = True  # Also export the fast NumPy scorer after training
+    export_prediction_table: bool = False  # Also precompute a prediction for every possible input
+
+
+# The source modules each stage's outputs depend on: the stage itself and the src modules it calls.
+# A change to any of them reruns the stage (add a module here when a stage starts using it).
+STAGE_CODE = {
+    "data_ingestion": ["src.components.data_ingestion", "src.utils"],
+    "data_transformation": [
+        "src.components.data_transformation", "src.pipeline.input_schema", "src.pipeline.records", "src.utils",
+    ],
+    "model_trainer": [
+        "src.components.model_trainer", "src.components.model_ensemble", "src.fold_manager", "src.utils",
+    ],
+    "compiled_scorer": ["src.pipeline.compiled_scorer", "src.utils"],
+    "prediction_table": [
+        "src.pipeline.prediction_cache", "src.pipeline.predict_pipeline", "src.pipeline.compiled_scorer",
+        "src.pipeline.input_schema", "src.pipeline.artifact_registry", "src.pipeline.records", "src.utils",
+    ],
+}
+
+
+# This class runs ingestion -> transformation -> training -> scorer export, skipping stages whose inputs are unchanged
+class TrainPipeline:
+    def __init__(self, config: TrainPipelineConfig = None, trainer_config: ModelTrainerConfig = None,
+                 ingestion_config: DataIngestionConfig = None):
+        self.config = config or TrainPipelineConfig()
+        self.trainer_config = trainer_config or ModelTrainerConfig()
+        self.ingestion_config = ingestion_config or DataIngestionConfig()
+        if ingestion_config is None and os.path.exists(self.ingestion_config.dataset_path):
+            # RetrainPipeline has added records since the first run: train on every record so far
+            self.ingestion_config.source_data_path = self.ingestion_config.dataset_path
+        self.state = self._load_state()
+        self.stages_run = []  # Names of the stages that actually ran (the rest were up to date)
+
+    # Read the saved state from the last run (empty if there was none)
+    def _load_state(self):
+        if os.path.exists(self.config.state_file_path):
+            with open(self.config.state_file_path) as file_obj:
+                return json.load(file_obj)
+        return {}
+
+    # Write the state so the next run can skip up-to-date stages
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.config.state_file_path), exist_ok=True)
+        with open(self.config.state_file_path, "w") as file_obj:
+            json.dump(self.state, file_obj, indent=2, sort_keys=True)
+
+    # Fingerprints of the given files, or None for a file that does not exist
+    @staticmethod
+    def _hash_files(paths):
+        return {path: hash_file(path) if os.path.exists(path) else None for path in paths}
+
+    # Fingerprints of the source files of the modules a stage depends on (see STAGE_CODE)
+    @staticmethod
+    def _code_hash(stage):
+        return {module: hash_file(importlib.util.find_spec(module).origin) for module in STAGE_CODE[stage]}
+
+    # Run a stage unless its inputs and outputs are exactly what they were after the last run.
+    # With record_only=True the stage is not run: its current inputs and outputs are recorded as up to date
+    # (used after RetrainPipeline has updated the outputs itself).
+    def _run_stage(self, name, inputs, outputs, run, force=False, record_only=False):
+        previous = self.state.get(name)
+        if record_only:
+            result = previous.get("result") if previous is not None else None
+            self.state[name] = {"inputs": inputs, "outputs": self._hash_files(outputs), "result": result}
+            self._save_state()
+            return result
+        if (
+            not force
+            and previous is not None
+            and previous["inputs"] == inputs
+            and previous["outputs"] == self._hash_files(outputs)
+        ):
+            logging.info(f"Stage {name} is up to date, skipping it")
+            return previous.get("result")
+
+        logging.info(f"Running stage {name}")
+        result = run()
+        self.stages_run.append(name)
+        self.state[name] = {"inputs": inputs, "outputs": self._hash_files(outputs), "result": result}
+        self._save_state()
+        return result
+
+    # Run the whole pipeline and return the test r2 score of the saved model.
+    # With record_only=True nothing is run; every stage's current inputs and outputs are saved as up to date.
+    def run(self, force=False, record_only=False):
+        try:
+            config = self.config
+            ingestion = DataIngestion(self.ingestion_config)
+            ingestion_config = ingestion.ingestion_config
+            transformation = DataTransformation()
+            transformation_config = transformation.data_transformation_config
+            preprocessor_path = transformation_config.preprocessor_obj_file_path
+            trainer = ModelTrainer(self.trainer_config)
+            model_path = trainer.model_trainer_config.trained_model_file_path
+
+            # Stage 1: copy the raw data and split it into train and test files
+            self._run_stage(
+                "data_ingestion",
+                inputs={
+                    "source": hash_file(ingestion_config.source_data_path),
+                    "config": asdict(ingestion_config),
+                    "code": self._code_hash("data_ingestion"),
+                },
+                outputs=[ingestion_config.train_table_path, ingestion_config.test_table_path],
+                run=lambda: list(ingestion.initiate_data_ingestion()),
+                force=force,
+                record_only=record_only,
+            )
+
+            # Stage 2: fit the preprocessor and save the transformed matrices
+            self._run_stage(
+                "data_transformation",
+                inputs={
+                    **self._hash_files([ingestion_config.train_table_path, ingestion_config.test_table_path]),
+                    "code": self._code_hash("data_transformation"),
+                },
+                outputs=[
+                    preprocessor_path,
+                    transformation_config.train_matrix_path,
+                    transformation_config.test_matrix_path,
+                    InputSchemaConfig().schema_file_path,
+                ],
+                run=lambda: transformation.initiate_data_transformation(
+                    ingestion_config.train_table_path, ingestion_config.test_table_path
+                )[2],
+                force=force,
+                record_only=record_only,
+            )
+
+            # Stage 3: search the models and save the best one
+            r2_square = self._run_stage(
+                "model_trainer",
+                inputs={
+                    **self._hash_files([transformation_config.train_matrix_path, transformation_config.test_matrix_path]),
+                    "config": asdict(trainer.model_trainer_config),
+                    "code": self._code_hash("model_trainer"),
+                },
+                outputs=[
+                    model_path,
+                    trainer.model_trainer_config.training_report_file_path,
+                    trainer.model_trainer_config.tradeoff_table_file_path,
+                    trainer.model_trainer_config.oof_predictions_file_path,
+                ],
+                run=lambda: float(trainer.initiate_model_trainer_from_files(
+                    transformation_config.train_matrix_path, transformation_config.test_matrix_path
+                )),
+                force=force,
+                record_only=record_only,
+            )
+
+            # Stage 4: export the fast NumPy scorer for the saved model and preprocessor
+            if config.export_compiled_scorer:
+                from src.pipeline.compiled_scorer import CompiledScorerConfig, export_compiled_scorer
+
+                scorer_config = CompiledScorerConfig()
+                self._run_stage(
+                    "compiled_scorer",
+                    inputs={
+                        **self._hash_files([model_path, preprocessor_path]),
+                        "code": self._code_hash("compiled_scorer"),
+                    },
+                    outputs=[scorer_config.compiled_scorer_file_path],
+                    run=lambda: export_compiled_scorer(scorer_config),
+                    force=force,
+                    record_only=record_only,
+                )
+
+            # Stage 5: precompute the prediction lookup table for the saved model and preprocessor
+            if config.export_prediction_table:
+                from src.pipeline.prediction_cache import PredictionCacheConfig, export_prediction_table
+
+                table_config = PredictionCacheConfig()
+                self._run_stage(
+                    "prediction_table",
+                    inputs={
+                        **self._hash_files([model_path, preprocessor_path]),
+                        "config": asdict(table_config),
+                        "code": self._code_hash("prediction_table"),
+                    },
+                    outputs=[table_config.table_file_path],
+                    run=lambda: export_prediction_table(table_config),
+                    force=force,
+                    record_only=record_only,
+                )
+
+            logging.info(f"Training pipeline finished, stages run: {self.stages_run}")
+            return r2_square
+
+        except Exception as e:
+            # Raise a custom error if something goes wrong
+            raise CustomException(e, sys)
+
+
+# Run this file directly to train, for example:
+#   python -m src.pipeline.train_pipeline --strategy random --time-budget 60
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the training pipeline, skipping stages that are up to date.")
+    parser.add_argument("--strategy", default=ModelTrainerConfig.search_strategy, choices=["grid", "halving", "random"])
+    parser.add_argument("--time-budget", type=float, default=None, help="Seconds for the random search")
+    parser.add_argument("--selection-policy", default=ModelTrainerConfig.selection_policy,
+                        choices=["best_r2", "smallest_within_epsilon"])
+    parser.add_argument("--r2-epsilon", type=float, default=ModelTrainerConfig.r2_epsilon,
+                        help="r2 the smallest_within_epsilon policy may give up")
+    parser.add_argument("--max-single-row-ms", type=float, default=None, help="Latency limit for one row")
+    parser.add_argument("--max-size-bytes", type=int, default=None, help="Size limit for the saved model")
+    parser.add_argument("--ensemble", action="store_true", help="Also try a blend of the searched models")
+    parser.add_argument("--ensemble-max-single-row-ms", type=float, default=None,
+                        help="Latency budget for the ensemble's members")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage")
+    parser.add_argument("--prediction-table", action="store_true", help="Precompute the prediction lookup table")
+    args = parser.parse_args()
+
+    pipeline = TrainPipeline(
+        config=TrainPipelineConfig(export_prediction_table=args.prediction_table),
+        trainer_config=ModelTrainerConfig(
+            search_strategy=args.strategy,
+            time_budget=args.time_budget,
+            selection_policy=args.selection_policy,
+            r2_epsilon=args.r2_epsilon,
+            max_single_row_ms=args.max_single_row_ms,
+            max_size_bytes=args.max_size_bytes,
+            build_ensemble=args.ensemble,
+            ensemble_max_single_row_ms=args.ensemble_max_single_row_ms,
+        ),
+    )
+    print(pipeline.run(force=args.force))
+    print(f"Stages run: {pipeline.stages_run}")
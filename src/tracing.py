@@ -0,0 +1,385 @@
+# Opt-in request tracing and slow-request profiling for the web apps.
+#
+# Tracing: every request becomes a trace made of spans (form parsing, building the columns, checking the input,
+# loading the artifacts, transform, model predict, page rendering, ...). Finished spans are written by a background
+# thread as JSON lines to a local file, or POSTed as JSON lists to a collector, so a request never waits for them.
+#   TRACE_EXPORT_PATH=logs/traces.jsonl          write spans to this file
+#   TRACE_COLLECTOR_URL=http://localhost:9411/x  or send them to this HTTP endpoint
+#   TRACE_SAMPLE_RATE=0.1                        trace only this part of the requests (default: all of them)
+#
+# Slow-request profiling: while a request is running, a background thread takes a snapshot of every thread's
+# stack every few milliseconds (starting once the request has run for half the threshold, so fast requests cost
+# nothing). If the request ends up slower than the threshold, the snapshots are saved as a "collapsed stacks"
+# profile (one "stack count" line per stack; flamegraph.pl and speedscope read it). It is cheap enough to leave
+# on in production, so tail latency can be diagnosed when it happens without redeploying.
+#   SLOW_REQUEST_PROFILE_MS=200                  profile requests slower than this (off when not set)
+#   SLOW_REQUEST_PROFILE_DIR=logs/profiles       where the profiles are saved
+#   PROFILE_INTERVAL_MS=5                        time between two snapshots
+#   SLOW_REQUEST_MAX_PROFILES=100                most profiles saved by one process
+#
+# When both are off, a span is one function call that returns a shared do-nothing object.
+import os  # Used to read settings from environment variables
+import sys  # Reads the stacks of the running threads
+import json  # Writes the spans as JSON
+import time  # Measures how long each span and request takes
+import queue  # Hands finished spans to the background thread
+import atexit  # Writes the remaining spans when the program ends
+import random  # Decides which requests are traced (sampling)
+import threading  # Runs the exporter and the profiler in the background
+import contextvars  # Remembers the current span, per thread and per asyncio task
+import urllib.request  # Sends spans to a collector
+from collections import Counter  # Counts how often each stack was seen
+from contextlib import contextmanager  # Lets a whole request be wrapped with "with"
+from datetime import datetime  # Names the profile files
+from functools import wraps  # Keeps the name of a wrapped view function
+from inspect import iscoroutinefunction  # Tells the ASGI handlers from the Flask views
+
+from src.logger import logging  # For logging messages (keeping track of actions and errors)
+from src.instrumentation import metrics, after_fork  # Counts the profiles saved; restarts threads after fork()
+
+# Settings, read from environment variables (everything is off unless set)
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH")
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "1"))
+SLOW_REQUEST_PROFILE_MS = os.environ.get("SLOW_REQUEST_PROFILE_MS")
+SLOW_REQUEST_PROFILE_DIR = os.environ.get("SLOW_REQUEST_PROFILE_DIR", os.path.join("logs", "profiles"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+SLOW_REQUEST_MAX_PROFILES = int(os.environ.get("SLOW_REQUEST_MAX_PROFILES", "100"))
+
+# The span the running code is inside of (or _UNSAMPLED inside a request that is not traced)
+_current_span = contextvars.ContextVar("current_span", default=None)
+_UNSAMPLED = object()
+
+
+# One timed phase of a request. Used with "with"; when it ends it is handed to the exporter.
+class Span:
+    __slots__ = ("exporter", "name", "trace_id", "span_id", "parent_id", "attributes", "_start", "_start_unix", "_token")
+
+    def __init__(self, exporter, name, trace_id, parent_id, attributes):
+        self.exporter = exporter
+        self.name = name
+        self.trace_id = trace_id  # Shared by every span of the same request
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id  # The span this one is inside of (None for the request itself)
+        self.attributes = attributes  # Extra details, for example the number of rows
+
+    # Add details to the span while it runs
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self._start_unix = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self._start_unix,
+            "duration_ms": duration * 1000,
+            "thread": threading.current_thread().name,
+            "attributes": self.attributes,
+        }
+        if exc_type is not None:
+            record["error"] = repr(exc)
+        self.exporter.export(record)
+        return False
+
+
+# Stands in for a span when tracing is off: does nothing
+class _NoSpan:
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+# Stands in for the first span of a request that was not picked by the sampling, so its inner spans are skipped too
+class _UnsampledSpan(_NoSpan):
+    __slots__ = ("_token",)
+
+    def __enter__(self):
+        self._token = _current_span.set(_UNSAMPLED)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        _current_span.reset(self._token)
+        return False
+
+
+# Writes finished spans from a background thread, as JSON lines to a file and/or as a JSON list to a collector
+class SpanExporter:
+    def __init__(self, file_path=None, collector_url=None, max_batch=512):
+        self.file_path = file_path
+        self.collector_url = collector_url
+        self.max_batch = max_batch  # Most spans written at once
+        self._export_failed = False  # Set after the first failure to write or send spans
+        self._start()
+        atexit.register(self.close)
+        # Spans queued in the parent before the fork are left behind: a worker only exports its own
+        after_fork(self._start)
+
+    def _start(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    # Queue a finished span (called by Span)
+    def export(self, record):
+        self._queue.put(record)
+
+    # Background loop: wait for a span, take every other span already waiting, and write them together
+    def _run(self):
+        while True:
+            records = [self._queue.get()]
+            while len(records) < self.max_batch:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(record is None for record in records)  # close() was called
+            self._write([record for record in records if record is not None])
+            if stop:
+                return
+
+    def _write(self, records):
+        if not records:
+            return
+        try:
+            if self.file_path:
+                os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+                with open(self.file_path, "a") as file_obj:
+                    file_obj.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+            if self.collector_url:
+                request = urllib.request.Request(
+                    self.collector_url, data=json.dumps(records, default=str).encode("utf-8"),
+                    headers={"Content-Type": "application/json"}, method="POST",
+                )
+                urllib.request.urlopen(request, timeout=2).close()
+        except Exception as e:
+            # Losing spans must never break the service; the first failure is logged, not every one
+            if not self._export_failed:
+                logging.info(f"Could not export spans: {e}")
+                self._export_failed = True
+
+    # Write the spans still in the queue and stop the background thread
+    def close(self, timeout=2.0):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+# Makes spans; without an exporter every span is the do-nothing one
+class Tracer:
+    def __init__(self, exporter=None, sample_rate=1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate  # Part of the requests that are traced
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    # A span for a phase of the current request, for example: with tracer.span("transform", rows=10): ...
+    # A span outside of any request starts a new trace of its own.
+    def span(self, name, **attributes):
+        if self.exporter is None:
+            return _NO_SPAN
+        parent = _current_span.get()
+        if parent is _UNSAMPLED:
+            return _NO_SPAN
+        if parent is None:
+            if self.sample_rate < 1 and random.random() >= self.sample_rate:
+                return _UnsampledSpan()
+            return Span(self.exporter, name, os.urandom(16).hex(), None, attributes)
+        return Span(self.exporter, name, parent.trace_id, parent.span_id, attributes)
+
+
+# The span the running code is inside of (None when there is none or tracing is off)
+def current_span():
+    span = _current_span.get()
+    return span if isinstance(span, Span) else None
+
+
+# A request being watched by the profiler
+class _ActiveRequest:
+    __slots__ = ("endpoint", "start", "samples")
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.samples = Counter()  # Collapsed stack -> number of snapshots it was seen in
+
+
+# Saves a stack profile of every request slower than threshold_ms.
+# Each function in hooks is called with the profile of a slow request ({"endpoint", "duration_ms", "samples"})
+# and may return a path; the default hook saves it as a collapsed-stacks file in output_dir.
+class SlowRequestProfiler:
+    def __init__(self, threshold_ms, output_dir=SLOW_REQUEST_PROFILE_DIR, interval_ms=PROFILE_INTERVAL_MS,
+                 max_profiles=SLOW_REQUEST_MAX_PROFILES, start_after_ms=None):
+        self.threshold = threshold_ms / 1000
+        self.output_dir = output_dir
+        self.interval = interval_ms / 1000
+        self.max_profiles = max_profiles
+        # Snapshots start once a request has run this long, so fast requests are never sampled
+        self.start_after = (threshold_ms / 2 if start_after_ms is None else start_after_ms) / 1000
+        self.hooks = [self.save_profile]
+        self.profiles_saved = 0
+        self._active = {}  # id -> _ActiveRequest
+        self._lock = threading.Lock()
+        self._wake = threading.Event()  # Set when a request starts, so the idle thread wakes up
+        self._thread = None
+        after_fork(self._reset)  # The sampling thread is started again by a worker's first request
+
+    # In a forked worker the parent's thread and requests do not exist
+    def _reset(self):
+        self._active, self._thread = {}, None
+        self._lock, self._wake = threading.Lock(), threading.Event()
+
+    # Start watching a request; returns the id to give to stop()
+    def start(self, endpoint):
+        request = _ActiveRequest(endpoint)
+        with self._lock:
+            self._active[id(request)] = request
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return id(request)
+
+    # Stop watching a request; if it was slow, run the hooks and return the path of the saved profile (or None)
+    def stop(self, request_id):
+        with self._lock:
+            request = self._active.pop(request_id)
+            samples = Counter(request.samples)
+        duration = time.perf_counter() - request.start
+        if duration < self.threshold or not samples:
+            return None
+
+        profile = {"endpoint": request.endpoint, "duration_ms": duration * 1000, "samples": samples}
+        path = None
+        for hook in self.hooks:
+            try:
+                path = hook(profile) or path
+            except Exception as e:
+                logging.info(f"Slow-request profile hook failed: {e}")
+        metrics.inc("slow_requests_profiled_total", endpoint=request.endpoint)
+        return path
+
+    # Default hook: save the profile as a collapsed-stacks file (up to max_profiles files per process)
+    def save_profile(self, profile):
+        if self.profiles_saved >= self.max_profiles:
+            return None
+        self.profiles_saved += 1
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = profile["endpoint"].strip("/").replace("/", "_") or "root"
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.output_dir, f"{stamp}_{os.getpid()}_{name}_{profile['duration_ms']:.0f}ms.collapsed")
+        with open(path, "w") as file_obj:
+            for stack, count in profile["samples"].most_common():
+                file_obj.write(f"{stack} {count}\n")
+        logging.info(f"Slow request to {profile['endpoint']} ({profile['duration_ms']:.0f} ms), profile saved to {path}")
+        return path
+
+    # The stack of every thread except this one, as "thread;outer function;...;inner function" strings
+    def _snapshot(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own_id = threading.get_ident()
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            parts.append(names.get(thread_id, str(thread_id)))
+            stacks.append(";".join(reversed(parts)))
+        return stacks
+
+    # Background loop: sleep while no request is running, otherwise take a snapshot every interval
+    # and add it to every request that has run longer than start_after
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self._lock:
+                due = [request for request in self._active.values() if now - request.start >= self.start_after]
+            if not due:
+                continue
+            stacks = self._snapshot()
+            with self._lock:
+                for request in due:
+                    request.samples.update(stacks)
+
+
+# The tracer and profiler shared by the whole process, set up from the environment variables
+tracer = Tracer(
+    SpanExporter(TRACE_EXPORT_PATH, TRACE_COLLECTOR_URL) if TRACE_EXPORT_PATH or TRACE_COLLECTOR_URL else None,
+    TRACE_SAMPLE_RATE,
+)
+profiler = SlowRequestProfiler(float(SLOW_REQUEST_PROFILE_MS)) if SLOW_REQUEST_PROFILE_MS else None
+
+
+# Turn tracing on from code (for example in a benchmark) instead of with environment variables
+def enable_tracing(file_path=None, collector_url=None, sample_rate=1.0):
+    tracer.exporter = SpanExporter(file_path, collector_url)
+    tracer.sample_rate = sample_rate
+    return tracer
+
+
+# Turn the slow-request profiler on from code instead of with environment variables
+def enable_slow_request_profiler(threshold_ms, **options):
+    global profiler
+    profiler = SlowRequestProfiler(threshold_ms, **options)
+    return profiler
+
+
+# Wrap a whole request: its first span, and the profiler watching it
+@contextmanager
+def request_scope(endpoint):
+    request_id = profiler.start(endpoint) if profiler is not None else None
+    active_profiler = profiler
+    with tracer.span("request", endpoint=endpoint) as span:
+        try:
+            yield span
+        finally:
+            if request_id is not None:
+                path = active_profiler.stop(request_id)
+                if path:
+                    span.set(profile=path)
+
+
+# Decorator for a request handler (a Flask view or an async ASGI handler) that wraps it in request_scope
+def traced_request(endpoint):
+    def decorator(handler):
+        if iscoroutinefunction(handler):
+            @wraps(handler)
+            async def async_wrapper(*args, **kwargs):
+                with request_scope(endpoint):
+                    return await handler(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            with request_scope(endpoint):
+                return handler(*args, **kwargs)
+        return wrapper
+    return decorator
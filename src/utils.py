@@ -1,17 +1,53 @@
 # Import tools for working with files, data, and handling errors
 import os  # Manages file and folder paths
 import sys  # Handles system-related errors
+import hashlib  # Creates fingerprints (hashes) of data to find cached results
+import json  # Saves small descriptions (metadata) next to binary files
+import shutil  # Removes folders of old files
+import tempfile  # A scratch folder to measure how big a saved model is
+import time  # Measures how long searches take (for the time budget)
 import numpy as np  # Helps with math operations on data (arrays)
-import pandas as pd  # Organizes data in tables (like spreadsheets)
-import dill  # Alternative to pickle for saving objects
 import pickle  # Saves and loads objects to/from files
-from sklearn.metrics import r2_score  # Measures how well a model predicts results
-from sklearn.model_selection import GridSearchCV  # Helps to find the best settings for a model
+
+# pandas and the scikit-learn search tools are imported inside the functions that use them,
+# so the web app (which only needs load_object) starts without loading the training libraries
 
 from src.exception import CustomException  # Custom error messages to understand issues
+from src.logger import logging  # Keeps a record of important actions
+
+# Function to return the path of the small JSON file that describes a saved object
+def artifact_meta_path(file_path):
+    return f"{file_path}.meta.json"
+
+# Function to pick the file format for an object: native files for XGBoost/CatBoost models,
+# joblib (numpy arrays stored so they can be memory-mapped and shared between processes) for the rest.
+# This is a fixed rule by model type, not a measurement: the native files are the formats those libraries
+# promise to load across versions, whether or not they are faster than joblib for a given model.
+# Pass file_format explicitly to save_object to use another format.
+def choose_artifact_format(obj):
+    module = type(obj).__module__
+    if module.startswith("xgboost"):
+        return "xgboost"
+    if module.startswith("catboost"):
+        return "catboost"
+    return "joblib"
+
+# Function to collect the library versions an object was saved with
+def _library_versions(file_format):
+    import platform
+    import sklearn
+
+    versions = {"python": platform.python_version(), "numpy": np.__version__, "sklearn": sklearn.__version__}
+    if file_format == "joblib":
+        import joblib
+        versions["joblib"] = joblib.__version__
+    elif file_format in ("xgboost", "catboost"):
+        versions[file_format] = __import__(file_format).__version__
+    return versions
 
-# Function to save an object (such as a model) to a file
-def save_object(file_path, obj):
+# Function to save an object (such as a model) to a file.
+# file_format is "pickle" (default), "joblib", "xgboost", "catboost" or "auto" (see choose_artifact_format).
+def save_object(file_path, obj, file_format="pickle"):
     try:
         # Get the folder path from the file path
         dir_path = os.path.dirname(file_path)
@@ -19,32 +55,270 @@ def save_object(file_path, obj):
         # Create the folder if it doesn't already exist
         os.makedirs(dir_path, exist_ok=True)
 
-        # Open the file in "write binary" mode and save the object
-        with open(file_path, "wb") as file_obj:
-            pickle.dump(obj, file_obj)  # Save the object in the file
+        if file_format == "auto":
+            file_format = choose_artifact_format(obj)
+
+        # Write to a temporary file first and then swap it in, so a running server never reads half a file
+        tmp_path = f"{file_path}.tmp"
+        if file_format == "pickle":
+            # Open the file in "write binary" mode and save the object
+            with open(tmp_path, "wb") as file_obj:
+                pickle.dump(obj, file_obj)  # Save the object in the file
+        elif file_format == "joblib":
+            import joblib
+            joblib.dump(obj, tmp_path)  # Not compressed, so the arrays can be memory-mapped when loading
+        elif file_format == "xgboost":
+            tmp_path = f"{file_path}.tmp.ubj"  # XGBoost chooses its binary format from the file extension
+            obj.save_model(tmp_path)
+        elif file_format == "catboost":
+            obj.save_model(tmp_path, format="cbm")
+        else:
+            raise ValueError(f"Unknown artifact format: {file_format}")
+
+        # Record how the object was saved, so load_object knows how to read it back. The description is swapped
+        # in before the file and records the file's size, so a reader that gets the new description with the
+        # old file (a reload in between the two swaps) can tell they do not belong together.
+        meta = {
+            "format": file_format,
+            "class": f"{type(obj).__module__}.{type(obj).__qualname__}",
+            "versions": _library_versions(file_format),
+            "size_bytes": os.path.getsize(tmp_path),
+        }
+        with open(f"{artifact_meta_path(file_path)}.tmp", "w") as file_obj:
+            json.dump(meta, file_obj, indent=2)
+        os.replace(f"{artifact_meta_path(file_path)}.tmp", artifact_meta_path(file_path))
+        os.replace(tmp_path, file_path)
 
     except Exception as e:
         # Show a custom error message if something goes wrong
         raise CustomException(e, sys)
 
-# Function to test different models and find out how well they predict results
-def evaluate_models(X_train, y_train, X_test, y_test, models, param):
+# Function to create a fingerprint (SHA-256 hash) of a file's contents (or of every file in a folder)
+def hash_file(file_path):
+    digest = hashlib.sha256()
+    if os.path.isdir(file_path):
+        for name in sorted(os.listdir(file_path)):
+            digest.update(name.encode())
+            digest.update(hash_file(os.path.join(file_path, name)).encode())
+        return digest.hexdigest()
+
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to create a fingerprint (hash) of one or more arrays, used to tell if the data has changed
+def hash_arrays(*arrays):
+    digest = hashlib.sha256()
+    for array in arrays:
+        if hasattr(array, "tocsr"):
+            # Sparse matrix: hash its shape and the three arrays that describe it
+            array = array.tocsr()
+            digest.update(str(("csr", array.shape)).encode())
+            parts = (array.data, array.indices, array.indptr)
+        else:
+            parts = (array,)
+        for part in parts:
+            part = np.ascontiguousarray(part)
+            digest.update(str((part.shape, part.dtype.str)).encode())
+            digest.update(part.tobytes())
+    return digest.hexdigest()
+
+# Function to create the cache key for one search: the data, the model, its settings and how it is searched
+def search_cache_key(data_hash, model, para, cv, search_options=()):
+    model_params = sorted((key, repr(value)) for key, value in model.get_params().items())
+    grid = sorted((key, repr(values)) for key, values in para.items())
+    description = repr((data_hash, type(model).__module__, type(model).__name__, model_params, grid, cv, search_options))
+    return hashlib.sha256(description.encode()).hexdigest()
+
+# Function to try random settings one at a time until n_iter settings are tried or the deadline passes.
+# The settings are scored on the shared folds (see src/fold_manager.py) and the best one is trained on all data.
+def budgeted_random_search(model, para, X_train, y_train, folds, n_jobs, n_iter, deadline, fit_params, search_stats=None,
+                           keep_oof=False):
+    from sklearn.base import clone  # Makes a fresh, untrained copy of a model
+    from sklearn.model_selection import ParameterSampler  # Picks random settings
+
+    candidates = list(ParameterSampler(para, n_iter=n_iter, random_state=42)) if para else [{}]
+    best_params, report = folds.search(
+        model, candidates, fit_params=fit_params, n_jobs=n_jobs, deadline=deadline, keep_oof=keep_oof,
+    )
+
+    # Train the best settings on all training data
+    best_model = clone(model).set_params(**best_params)
+    best_model.fit(X_train, y_train, **fit_params)
+    if search_stats is not None:
+        search_stats.update(report)
+    return best_model
+
+# Function to find the best settings for one model with the chosen search strategy.
+# Every strategy uses the same cross-validation folds (folds, a FoldManager; made from cv if not given),
+# so the scores of different models are directly comparable.
+# If search_stats is a dictionary, it is filled with the number of fits, their average time and the
+# cross-validation score, plus the best setting's out-of-fold predictions ("oof_predictions") with keep_oof=True.
+def search_model(model, para, X_train, y_train, search="grid", cv=3, n_jobs=-1, n_iter=10,
+                 deadline=None, fit_params=None, search_stats=None, folds=None, keep_oof=False):
+    from sklearn.base import clone  # Makes a fresh, untrained copy of a model
+    from sklearn.model_selection import GridSearchCV, ParameterGrid  # Helps to find the best settings for a model
+    from src.fold_manager import FoldManager  # Shared cross-validation folds
+
+    fit_params = fit_params or {}
+    folds = folds or FoldManager(X_train, y_train, n_splits=cv)
+
+    if search == "grid" or (search == "halving" and not para):
+        # Try every combination of settings on the shared fold views, then train the best on all data
+        best_params, report = folds.search(
+            model, ParameterGrid(para), fit_params=fit_params, n_jobs=n_jobs, keep_oof=keep_oof,
+        )
+        if search_stats is not None:
+            search_stats.update(report)
+        return clone(model).set_params(**best_params).fit(X_train, y_train, **fit_params)
+    elif search == "halving":
+        # Successive halving: try every combination on a little data, keep the best third, and repeat.
+        # It picks its own subsets of rows, so it gets the shared folds as row numbers (which it copies).
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (switches on the halving search)
+        from sklearn.model_selection import HalvingGridSearchCV
+
+        gs = HalvingGridSearchCV(model, para, cv=folds.splits(), n_jobs=n_jobs, factor=3, random_state=42)
+    elif search == "random":
+        # Random search that stops when this model's share of the time budget is used up
+        return budgeted_random_search(
+            model, para, X_train, y_train, folds, n_jobs, n_iter, deadline, fit_params, search_stats, keep_oof
+        )
+    else:
+        raise ValueError(f"Unknown search strategy: {search}")
+
+    gs.fit(X_train, y_train, **fit_params)
+    if search_stats is not None:
+        fit_times = gs.cv_results_["mean_fit_time"]
+        search_stats.update(
+            n_candidates=len(fit_times), n_fits=len(fit_times) * folds.n_splits,
+            mean_fit_time_s=float(np.mean(fit_times)), cv_r2=float(gs.best_score_),
+        )
+        if keep_oof:
+            search_stats["oof_predictions"] = folds.out_of_fold_predict(gs.best_estimator_, fit_params, n_jobs)
+
+    # The search already retrains the best settings on all training data, so reuse that model
+    return gs.best_estimator_
+
+# Function to measure how big a model is when saved in the format save_object would choose for it
+def model_size_bytes(model):
+    with tempfile.TemporaryDirectory() as folder:
+        file_path = os.path.join(folder, "model")
+        save_object(file_path, model, file_format="auto")
+        return os.path.getsize(file_path)
+
+# Function to measure how long a model takes to predict one row, and a whole batch (per row)
+def measure_predict_latency(model, X, single_row_repeats=20, batch_repeats=3):
+    single_times = []
+    for i in range(single_row_repeats):
+        row = X[i % X.shape[0]:i % X.shape[0] + 1]
+        start = time.perf_counter()
+        model.predict(row)
+        single_times.append(time.perf_counter() - start)
+
+    batch_times = []
+    for _ in range(batch_repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        batch_times.append(time.perf_counter() - start)
+
+    return {
+        "single_row_ms": float(np.median(single_times) * 1000),
+        "batch_ms_per_row": float(min(batch_times) * 1000 / X.shape[0]),
+    }
+
+# Function to read the highest memory use of this process so far, in MB (None where it is not available)
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Linux reports kilobytes, macOS reports bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+# Function to test different models and find out how well they predict results.
+# If details is a dictionary, it is filled with timings, sizes and scores for each model.
+# Every model is searched on the same cross-validation folds, made once (see src/fold_manager.py).
+# If oof_predictions is a dictionary, it is filled with each model's out-of-fold predictions on X_train.
+def evaluate_models(X_train, y_train, X_test, y_test, models, param, n_jobs=-1, cache_dir=None, cv=3,
+                    search="grid", n_iter=10, time_budget=None, fit_params=None, details=None, oof_predictions=None):
+    from sklearn.metrics import r2_score  # Measures how well a model predicts results
+    from src.fold_manager import FoldManager  # Shared cross-validation folds
+
     try:
         # Dictionary to store each model's performance score
         report = {}
 
+        # Extra arguments for fit() per model (for example a validation set for early stopping)
+        fit_params = fit_params or {}
+
+        # When there is a time budget, each model gets an equal share of the time that is left
+        start = time.monotonic()
+
+        # Fingerprint of the training data, so cached searches are only reused for the same data
+        data_hash = hash_arrays(X_train, y_train) if cache_dir else None
+
+        # Split the training data into folds once; every model is searched on these same folds
+        folds = FoldManager(X_train, y_train, n_splits=cv)
+        keep_oof = oof_predictions is not None
+
         # Loop through each model in the models list
         for i in range(len(list(models))):
+            model_name = list(models.keys())[i]  # Get the model's name
             model = list(models.values())[i]  # Get the model
-            para = param[list(models.keys())[i]]  # Get the model's settings (parameters)
+            para = param[model_name]  # Get the model's settings (parameters)
+            model_fit_params = fit_params.get(model_name, {})
 
-            # Use GridSearchCV to find the best settings for the model
-            gs = GridSearchCV(model, para, cv=3)  # Test each combination of settings
-            gs.fit(X_train, y_train)  # Train with the best settings
+            deadline = None
+            if time_budget is not None:
+                remaining = time_budget - (time.monotonic() - start)
+                deadline = time.monotonic() + max(remaining, 0) / (len(models) - i)
 
-            # Update the model with the best settings and train it on all training data
-            model.set_params(**gs.best_params_)  # Set model with the best settings
-            model.fit(X_train, y_train)  # Train the model with the best settings
+            # Reuse a finished search from the cache if the data, model and settings are unchanged
+            cache_path = None
+            if cache_dir:
+                search_options = (search, n_iter, time_budget, sorted(model_fit_params), folds.description)
+                key = search_cache_key(data_hash, model, para, cv, search_options)
+                cache_path = os.path.join(cache_dir, f"{key}.pkl")
+            search_start = time.monotonic()
+            search_stats = {}
+            if cache_path and os.path.exists(cache_path):
+                best_model = load_object(cache_path)
+                logging.info(f"Loaded cached {search} search for {model_name}")
+                # The timings of the original search are kept next to the cached model
+                if os.path.exists(f"{cache_path}.stats.json"):
+                    with open(f"{cache_path}.stats.json") as file_obj:
+                        search_stats = json.load(file_obj)
+                search_stats["cached"] = True
+                if keep_oof:
+                    # Out-of-fold predictions are kept next to the cached model too (made again if missing)
+                    if os.path.exists(f"{cache_path}.oof.npy"):
+                        oof_predictions[model_name] = np.load(f"{cache_path}.oof.npy")
+                    else:
+                        oof_predictions[model_name] = folds.out_of_fold_predict(best_model, model_fit_params, n_jobs)
+            else:
+                # Find the best settings for the model, using all CPU cores
+                best_model = search_model(
+                    model, para, X_train, y_train, search=search, cv=cv, n_jobs=n_jobs,
+                    n_iter=n_iter, deadline=deadline, fit_params=model_fit_params, search_stats=search_stats,
+                    folds=folds, keep_oof=keep_oof,
+                )
+                search_stats["search_time_s"] = time.monotonic() - search_start
+                logging.info(f"{search} search for {model_name} took {search_stats['search_time_s']:.1f}s")
+                if keep_oof:
+                    oof_predictions[model_name] = search_stats.pop("oof_predictions")
+                if cache_path:
+                    save_object(cache_path, best_model)
+                    with open(f"{cache_path}.stats.json", "w") as file_obj:
+                        json.dump(search_stats, file_obj)
+                    if keep_oof:
+                        np.save(f"{cache_path}.oof.npy", oof_predictions[model_name])
+                search_stats["cached"] = False
+
+            # Replace the untrained model with the trained one so the caller can use it directly
+            models[model_name] = best_model
+            model = best_model
 
             # Make predictions on the training and test data
             y_train_pred = model.predict(X_train)  # Predict for training data
@@ -55,7 +329,21 @@ def evaluate_models(X_train, y_train, X_test, y_test, models, param):
             test_model_score = r2_score(y_test, y_test_pred)  # Score for test data
 
             # Store the test score of the model in the report dictionary
-            report[list(models.keys())[i]] = test_model_score
+            report[model_name] = test_model_score
+
+            # Record how long the model took to find and how fast and big it is
+            if details is not None:
+                details[model_name] = {
+                    **search_stats,
+                    "best_params": {
+                        key: value for key, value in best_model.get_params().items() if key in para
+                    },
+                    "train_r2": float(train_model_score),
+                    "test_r2": float(test_model_score),
+                    **measure_predict_latency(model, X_test),
+                    "size_bytes": model_size_bytes(model),
+                    "peak_memory_mb": peak_memory_mb(),
+                }
 
         # Return the report with each model's test score
         return report
@@ -64,12 +352,161 @@ def evaluate_models(X_train, y_train, X_test, y_test, models, param):
         # Show a custom error message if something goes wrong
         raise CustomException(e, sys)
 
-# Function to load a saved object (such as a model) from a file
-def load_object(file_path):
+# Function to tell a saved file's format from its first bytes (used when its description is from another save).
+# A pickle stream may be plain pickle or joblib; joblib reads both.
+def _detect_format(file_path):
+    with open(file_path, "rb") as file_obj:
+        head = file_obj.read(4)
+    if head == b"CBM1":
+        return "catboost"
+    if head[:1] == b"{":
+        return "xgboost"  # Universal Binary JSON starts with an object marker
+    return "joblib"
+
+# Function to load a saved object (such as a model) from a file.
+# With mmap=True, joblib files memory-map their numpy arrays, so worker processes share one copy in memory.
+def load_object(file_path, mmap=True):
     try:
-        # Open the file in "read binary" mode and load the object
-        with open(file_path, "rb") as file_obj:
-            return pickle.load(file_obj)  # Load the object from the file
+        # Files without a description were saved with plain pickle
+        meta = {"format": "pickle"}
+        if os.path.exists(artifact_meta_path(file_path)):
+            with open(artifact_meta_path(file_path)) as file_obj:
+                meta = json.load(file_obj)
+
+        file_format = meta["format"]
+        if meta.get("size_bytes", os.path.getsize(file_path)) != os.path.getsize(file_path):
+            # The description belongs to a save that has not swapped its file in yet: read the file as what it is
+            file_format = _detect_format(file_path)
+            logging.info(f"{file_path} does not match its description, reading it as {file_format}")
+        if meta.get("versions", {}).get("sklearn") not in (None, _library_versions("pickle")["sklearn"]):
+            logging.info(f"{file_path} was saved with scikit-learn {meta['versions']['sklearn']}")
+
+        if file_format == "pickle":
+            # Open the file in "read binary" mode and load the object
+            with open(file_path, "rb") as file_obj:
+                return pickle.load(file_obj)  # Load the object from the file
+        if file_format == "joblib":
+            import joblib
+            return joblib.load(file_path, mmap_mode="r" if mmap else None)
+        if file_format == "xgboost":
+            from xgboost import XGBRegressor
+            model = XGBRegressor()
+            with open(file_path, "rb") as file_obj:
+                model.load_model(bytearray(file_obj.read()))
+            return model
+        if file_format == "catboost":
+            from catboost import CatBoostRegressor
+            model = CatBoostRegressor()
+            model.load_model(file_path, format="cbm")
+            return model
+        raise ValueError(f"Unknown artifact format: {file_format}")
+
+    except Exception as e:
+        # Show a custom error message if something goes wrong
+        raise CustomException(e, sys)
+
+# Function to save a table as a folder of binary columns: one .npy file per column plus a meta.json.
+# Text columns are stored as categories (small integer codes plus the list of labels), so the types survive
+# and every column can be memory-mapped instead of parsed again like a CSV file.
+def save_table(df, dir_path):
+    import pandas as pd  # Organizes data in tables (like spreadsheets)
+
+    try:
+        os.makedirs(dir_path, exist_ok=True)
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            if series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+                # Text column: keep the integer codes (-1 for missing) and the labels
+                categorical = series.astype("category")
+                np.save(os.path.join(dir_path, f"{i}.npy"), np.asarray(categorical.cat.codes))
+                columns.append({"name": name, "kind": "categorical",
+                                "categories": categorical.cat.categories.tolist()})
+            else:
+                np.save(os.path.join(dir_path, f"{i}.npy"), series.to_numpy())
+                columns.append({"name": name, "kind": "numeric"})
+
+        with open(os.path.join(dir_path, "meta.json"), "w") as file_obj:
+            json.dump({"n_rows": len(df), "columns": columns}, file_obj, indent=2)
+        return dir_path
+
+    except Exception as e:
+        # Show a custom error message if something goes wrong
+        raise CustomException(e, sys)
+
+# Function to load a table saved by save_table (only the given columns, if any), memory-mapping each column
+def load_table(dir_path, columns=None, mmap=True):
+    import pandas as pd  # Organizes data in tables (like spreadsheets)
+
+    try:
+        with open(os.path.join(dir_path, "meta.json")) as file_obj:
+            meta = json.load(file_obj)
+
+        data = {}
+        for i, column in enumerate(meta["columns"]):
+            if columns is not None and column["name"] not in columns:
+                continue
+            values = np.load(os.path.join(dir_path, f"{i}.npy"), mmap_mode="r" if mmap else None)
+            if column["kind"] == "categorical":
+                values = pd.Categorical.from_codes(values, categories=column["categories"])
+            data[column["name"]] = values
+        return pd.DataFrame(data)
+
+    except Exception as e:
+        # Show a custom error message if something goes wrong
+        raise CustomException(e, sys)
+
+# Function to save a feature matrix X (dense or sparse CSR) and its target y as .npy files in a folder
+def save_matrix(dir_path, X, y):
+    try:
+        # Start from an empty folder so files from an older dense/sparse save are not left behind
+        if os.path.isdir(dir_path):
+            shutil.rmtree(dir_path)
+        os.makedirs(dir_path, exist_ok=True)
+        if hasattr(X, "tocsr"):
+            # Sparse matrix: keep only the non-zero values and where they are
+            X = X.tocsr()
+            np.save(os.path.join(dir_path, "data.npy"), X.data)
+            np.save(os.path.join(dir_path, "indices.npy"), X.indices)
+            np.save(os.path.join(dir_path, "indptr.npy"), X.indptr)
+            meta = {"format": "csr", "shape": list(X.shape)}
+        else:
+            np.save(os.path.join(dir_path, "X.npy"), np.ascontiguousarray(X))
+            meta = {"format": "dense", "shape": list(X.shape)}
+        np.save(os.path.join(dir_path, "y.npy"), np.asarray(y))
+
+        with open(os.path.join(dir_path, "meta.json"), "w") as file_obj:
+            json.dump(meta, file_obj)
+        return dir_path
+
+    except Exception as e:
+        # Show a custom error message if something goes wrong
+        raise CustomException(e, sys)
+
+# Function to load a feature matrix and target saved by save_matrix, memory-mapped so nothing is copied.
+# The mapping is copy-on-write, because some estimators need writable arrays even though they never write to them.
+def load_matrix(dir_path, mmap=True):
+    try:
+        mmap_mode = "c" if mmap else None
+        with open(os.path.join(dir_path, "meta.json")) as file_obj:
+            meta = json.load(file_obj)
+
+        if meta["format"] == "csr":
+            from scipy.sparse import csr_matrix  # Only needed for sparse matrices
+
+            X = csr_matrix(
+                (
+                    np.load(os.path.join(dir_path, "data.npy"), mmap_mode=mmap_mode),
+                    np.load(os.path.join(dir_path, "indices.npy"), mmap_mode=mmap_mode),
+                    np.load(os.path.join(dir_path, "indptr.npy"), mmap_mode=mmap_mode),
+                ),
+                shape=tuple(meta["shape"]),
+                copy=False,
+            )
+        else:
+            X = np.load(os.path.join(dir_path, "X.npy"), mmap_mode=mmap_mode)
+        y = np.load(os.path.join(dir_path, "y.npy"), mmap_mode=mmap_mode)
+        return X, y
 
     except Exception as e:
         # Show a custom error message if something goes wrong
@@ -0,0 +1,110 @@
+# Parity tests: the compiled NumPy scorer must give the same answers as the sklearn pipeline
+# (model.predict on preprocessor.transform) for the preprocessor DataTransformation builds.
+#
+#   python -m pytest -q tests
+import os  # Helps with file and directory management
+
+import numpy as np  # Fast math on arrays of numbers
+import pandas as pd  # Useful for working with data in tables (like spreadsheets)
+import pytest  # Runs the tests
+from sklearn.linear_model import LinearRegression  # The linear model the scorer folds into tables
+from sklearn.tree import DecisionTreeRegressor  # A model the scorer has to call on the feature matrix
+
+from src.components.data_transformation import DataTransformation
+from src.pipeline.compiled_scorer import check_parity, compile_scorer
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "notebook", "data", "stud.csv")
+TOLERANCE = 1e-9
+
+
+# The student records split into features and target, plus rows the encoders never saw during fit:
+# unknown categories (handle_unknown="ignore" turns them into all-zero one-hot columns) and missing values
+@pytest.fixture(scope="module")
+def data():
+    df = pd.read_csv(DATA_PATH)
+    X, y = df.drop(columns=["math_score"]), df["math_score"].to_numpy(dtype=float)
+    unseen = X.head(6).copy()
+    unseen.loc[unseen.index[0], "gender"] = "robot"
+    unseen.loc[unseen.index[1], "race_ethnicity"] = "group Z"
+    unseen.loc[unseen.index[2], "lunch"] = None
+    unseen["reading_score"] = unseen["reading_score"].astype(float)
+    unseen.loc[unseen.index[3], "reading_score"] = np.nan
+    unseen.loc[unseen.index[4], ["gender", "lunch", "test_preparation_course"]] = ["robot", "none at all", "maybe"]
+    return X, y, unseen
+
+
+# The preprocessor with a sparse (sparse_threshold=1) or a dense (sparse_threshold=0) output
+def fitted_preprocessor(X, sparse_output):
+    return DataTransformation().get_data_transformation_object(sparse_output=sparse_output).fit(X)
+
+
+# The linear model is fitted on the sparse matrix: with a full one-hot encoding and an intercept the weights are
+# collinear, and the dense solver then returns an intercept near 1e15 that sklearn itself cannot predict with
+# to better than ~0.1, so it would not tell a folding bug from sklearn's own rounding (see test_ill_conditioned)
+@pytest.fixture(scope="module")
+def linear_model(data):
+    X, y, _ = data
+    preprocessor = fitted_preprocessor(X, sparse_output=True)
+    return LinearRegression().fit(preprocessor.transform(X), y)
+
+
+@pytest.mark.parametrize("sparse_output", [True, False])
+def test_linear_scorer_matches_sklearn(data, linear_model, sparse_output):
+    X, _, unseen = data
+    preprocessor = fitted_preprocessor(X, sparse_output)
+    scorer = compile_scorer(preprocessor, linear_model)
+    assert scorer.is_linear
+
+    for features in (X, unseen):
+        expected = linear_model.predict(preprocessor.transform(features))
+        np.testing.assert_allclose(scorer.predict_columns(features), expected, rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("sparse_output", [True, False])
+def test_single_record_matches_sklearn(data, linear_model, sparse_output):
+    X, _, unseen = data
+    preprocessor = fitted_preprocessor(X, sparse_output)
+    scorer = compile_scorer(preprocessor, linear_model)
+
+    expected = linear_model.predict(preprocessor.transform(unseen))
+    for (_, row), value in zip(unseen.iterrows(), expected):
+        record = {column: (None if pd.isna(row[column]) else row[column]) for column in scorer.columns}
+        assert scorer.predict_one(record) == pytest.approx(value, abs=TOLERANCE)
+
+
+# Models that are not linear get the feature matrix itself, which must be laid out exactly like
+# preprocessor.transform's (tree models treat an entry left out of a sparse matrix as missing, not 0)
+@pytest.mark.parametrize("sparse_output", [True, False])
+def test_feature_matrix_matches_sklearn(data, sparse_output):
+    X, y, unseen = data
+    preprocessor = fitted_preprocessor(X, sparse_output)
+    model = DecisionTreeRegressor(max_depth=6, random_state=0).fit(preprocessor.transform(X), y)
+    scorer = compile_scorer(preprocessor, model)
+    assert not scorer.is_linear
+
+    for features in (X, unseen):
+        expected = preprocessor.transform(features)
+        actual = scorer.transform_columns(features)
+        assert type(actual) is type(expected)
+        if sparse_output:
+            np.testing.assert_array_equal(actual.indptr, expected.indptr)
+            np.testing.assert_array_equal(actual.indices, expected.indices)
+            actual, expected = actual.data, expected.data
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=TOLERANCE)
+        np.testing.assert_array_equal(scorer.predict_columns(features), model.predict(preprocessor.transform(features)))
+
+
+# A linear model fitted on the dense matrix is ill-conditioned; check_parity still compares it with sklearn,
+# allowing for sklearn's own rounding, and still catches a scorer that is off
+def test_ill_conditioned_linear_model(data):
+    X, y, _ = data
+    preprocessor = fitted_preprocessor(X, sparse_output=False)
+    model = LinearRegression().fit(preprocessor.transform(X), y)
+    scorer = compile_scorer(preprocessor, model)
+
+    max_diff, allowed = check_parity(scorer, preprocessor, model, X)
+    assert max_diff <= allowed
+
+    scorer.intercept += 10 * allowed
+    max_diff, allowed = check_parity(scorer, preprocessor, model, X)
+    assert max_diff > allowed